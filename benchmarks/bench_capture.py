@@ -0,0 +1,69 @@
+"""Screen capture throughput: frames per second and milliseconds per grab for each backend and target.
+
+Grabs the primary screen, a single monitor and a fixed region repeatedly
+with the mss backend (one reused image buffer) and PIL's ImageGrab (a new
+image per grab), and reports fps and median/p95 ms per grab. The window
+target is a region too once its box is known, so it is not measured
+separately. Needs a display; on a headless Linux machine run it on an X
+virtual framebuffer (mss also needs `pip install mss`):
+
+    xvfb-run -s "-screen 0 3840x2160x24" python -m benchmarks.bench_capture [--grabs 50] [--region 800x600]
+"""
+import argparse
+import os
+import sys
+import time
+
+from src.core.capture import MSSCapture, PILCapture, clamp_box
+
+
+def measure(capture, box, grabs):
+    capture.grab(box)
+    times = []
+    start = time.perf_counter()
+    for _ in range(grabs):
+        begin = time.perf_counter()
+        image = capture.grab(box)
+        times.append(time.perf_counter() - begin)
+    total = time.perf_counter() - start
+    times.sort()
+    return image.size, grabs / total, 1000 * times[len(times) // 2], 1000 * times[int(0.95 * (len(times) - 1))]
+
+
+def backends():
+    found = {}
+    try:
+        found['mss'] = MSSCapture()
+    except ImportError:
+        print("mss is not installed; measuring PIL only")
+    found['pil'] = PILCapture()
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grabs', type=int, default=50)
+    parser.add_argument('--region', default='800x600', help="WxH of the region target, at the screen's centre")
+    args = parser.parse_args()
+
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        parser.exit(1, "No X display: run under xvfb-run (see the usage line in this module's docstring)\n")
+
+    captures = backends()
+    desktop = captures['mss'].monitors()[1] if 'mss' in captures else (0, 0) + captures['pil'].grab().size
+    width, height = (int(v) for v in args.region.lower().split('x'))
+    centre = ((desktop[0] + desktop[2]) // 2, (desktop[1] + desktop[3]) // 2)
+    region = clamp_box((centre[0] - width // 2, centre[1] - height // 2,
+                        centre[0] + width - width // 2, centre[1] + height - height // 2), desktop)
+    targets = {'screen': None, 'monitor 1': desktop, f'region {args.region}': region}
+
+    print(f"{'backend':<8} {'target':<16} {'size':>10} {'fps':>7} {'p50 grab':>9} {'p95 grab':>9}")
+    for name, capture in captures.items():
+        for label, box in targets.items():
+            size, fps, p50, p95 = measure(capture, box, args.grabs)
+            print(f"{name:<8} {label:<16} {size[0]:>5}x{size[1]:<4} {fps:>7.1f} {p50:>7.1f}ms {p95:>7.1f}ms")
+    print("\nms per grab includes the conversion to a PIL image the encoder takes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Payload and latency per turn over a simulated hour, with and without the context budget.
+
+Builds a synthetic interview session (a question every ~30 s, some of
+them screenshots) and, for every turn, measures the request an unbounded
+chat would send against the one sent after ``ContextManager.compact``:
+input tokens, bytes on the wire (images base64-encoded, as the API sends
+them) and the time compaction itself takes. Time to first token is
+modelled as fixed overhead plus upload time plus prefill time; pass
+your own numbers to match your link and model.
+
+    python -m benchmarks.bench_context [--minutes 60] [--max-tokens 12000] [--keep-turns 6]
+"""
+import argparse
+import os
+import random
+import time
+
+from google.genai import types
+
+from src.core.context import ContextManager
+
+WORDS = ("the service keeps a queue of requests and a worker pool drains it while a cache in front "
+         "absorbs repeated reads so latency stays flat under load and failures retry with backoff").split()
+
+
+def words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def message_contents(rng, screenshot):
+    parts = []
+    if screenshot:
+        # Screenshots do not compress much further; random bytes stand in for the PNG
+        parts.append(types.Part.from_bytes(data=os.urandom(rng.randint(150_000, 400_000)), mime_type='image/png'))
+        parts.append(types.Part.from_text(text="What do you see in this screenshot?"))
+    else:
+        parts.append(types.Part.from_text(text=words(rng, rng.randint(10, 40)) + "?"))
+    return types.Content(role='user', parts=parts)
+
+
+def payload_bytes(contents):
+    total = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.inline_data is not None:
+                total += 4 * ((len(part.inline_data.data) + 2) // 3)
+            elif part.text:
+                total += len(part.text.encode('utf-8'))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--turn-every', type=float, default=30, help="mean seconds between questions")
+    parser.add_argument('--screenshot-share', type=float, default=0.2)
+    parser.add_argument('--max-tokens', type=int, default=12000)
+    parser.add_argument('--keep-turns', type=int, default=6)
+    parser.add_argument('--overhead-ms', type=float, default=400, help="fixed request overhead")
+    parser.add_argument('--uplink-mbps', type=float, default=20)
+    parser.add_argument('--prefill-tps', type=float, default=20000, help="input tokens processed per second")
+    parser.add_argument('--every', type=int, default=10, help="print a row every N minutes")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    manager = ContextManager(max_tokens=args.max_tokens, keep_turns=args.keep_turns)
+
+    def ttft_ms(tokens, nbytes):
+        return args.overhead_ms + 1000 * nbytes * 8 / (args.uplink_mbps * 1e6) + 1000 * tokens / args.prefill_tps
+
+    full, bounded = [], []
+    rows = []
+    compact_s = []
+    t = 0.0
+    next_row = 0.0
+    while t < 60 * args.minutes:
+        message = message_contents(rng, rng.random() < args.screenshot_share)
+        answer = types.Content(role='model', parts=[types.Part.from_text(text=words(rng, rng.randint(150, 400)))])
+
+        start = time.perf_counter()
+        bounded = manager.compact(bounded)
+        compact_s.append(time.perf_counter() - start)
+
+        sent = {}
+        for name, history in (('full', full), ('bounded', bounded)):
+            request = history + [message]
+            tokens, nbytes = manager.tokens(request), payload_bytes(request)
+            sent[name] = (tokens, nbytes, ttft_ms(tokens, nbytes))
+        rows.append((t, sent))
+
+        if t >= next_row:
+            print_row(t, sent, header=not next_row)
+            next_row += 60 * args.every
+
+        full = full + [message, answer]
+        bounded = bounded + [message, answer]
+        t += rng.expovariate(1 / args.turn_every)
+
+    print()
+    for name in ('full', 'bounded'):
+        tokens = [r[1][name][0] for r in rows]
+        nbytes = [r[1][name][1] for r in rows]
+        ttft = sorted(r[1][name][2] for r in rows)
+        print(f"{name:<8} turns={len(rows)}  mean tokens={sum(tokens) / len(tokens):>8.0f}  "
+              f"mean payload={sum(nbytes) / len(nbytes) / 1024:>8.0f} KB  "
+              f"total upload={sum(nbytes) / 1024 ** 2:>7.1f} MB  "
+              f"ttft p50={ttft[len(ttft) // 2]:>6.0f} ms p95={ttft[int(0.95 * (len(ttft) - 1))]:>6.0f} ms")
+    compact_s.sort()
+    print(f"compaction: {manager.folded_turns} turns folded, {manager.images_replaced} screenshots replaced, "
+          f"p50 {1000 * compact_s[len(compact_s) // 2]:.2f} ms, max {1000 * compact_s[-1]:.2f} ms per turn")
+
+
+def print_row(t, sent, header):
+    if header:
+        print(f"{'minute':>6} | {'full tokens':>11} {'KB':>8} {'ttft ms':>8} | "
+              f"{'bounded tokens':>14} {'KB':>8} {'ttft ms':>8}")
+    full, bounded = sent['full'], sent['bounded']
+    print(f"{t / 60:>6.0f} | {full[0]:>11} {full[1] / 1024:>8.0f} {full[2]:>8.0f} | "
+          f"{bounded[0]:>14} {bounded[1] / 1024:>8.0f} {bounded[2]:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Allocation and throughput of FrameConverter versus the legacy per-chunk path.
+
+Runs synthetic interleaved int16 input for stereo, 5.1 and 7.1 layouts and
+reports frames/sec plus the peak temporary heap used per chunk (tracemalloc).
+
+    python -m benchmarks.bench_converter [--seconds 20] [--rate 48000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.core.converter import FrameConverter
+from src.utils.helpers import resample_audio
+
+CHUNK = 1024
+
+
+def synthetic_input(channels, rate, seconds):
+    n = int(rate * seconds) // CHUNK * CHUNK
+    rng = np.random.default_rng(channels)
+    t = np.arange(n) / rate
+    frames = np.empty((n, channels), dtype=np.int16)
+    for ch in range(channels):
+        tone = 9000 * np.sin(2 * np.pi * (220 + 110 * ch) * t) + rng.normal(0, 500, n)
+        frames[:, ch] = np.clip(tone, -32768, 32767)
+    return frames.reshape(-1)
+
+
+def legacy_convert(channels, rate):
+    def convert(samples):
+        audio_data = np.frombuffer(samples.tobytes(), dtype=np.int16)
+        audio_data = audio_data.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return resample_audio(audio_data, rate, 16000).tobytes()
+    return convert
+
+
+def converter_convert(channels, rate):
+    converter = FrameConverter(channels, rate, 16000, max_frames=CHUNK)
+    return converter.convert
+
+
+def throughput(convert, audio, channels):
+    """Frames converted per second."""
+    step = CHUNK * channels
+    convert(audio[:step])
+    start = time.perf_counter()
+    for i in range(0, len(audio), step):
+        convert(audio[i:i + step])
+    return len(audio) // channels / (time.perf_counter() - start)
+
+
+def peak_bytes_per_chunk(convert, audio, channels, n=200):
+    """Peak traced heap growth while converting n chunks after warm-up."""
+    step = CHUNK * channels
+    convert(audio[:step])
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        convert(audio[i * step:(i + 1) * step])
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--rate', type=int, default=48000)
+    args = parser.parse_args()
+
+    print(f"{'channels':>8} {'method':>10} {'Mframes/s':>10} {'realtime x':>11} {'peak KiB/chunk':>15}")
+    for channels in (2, 6, 8):
+        audio = synthetic_input(channels, args.rate, args.seconds)
+        for name, factory in (('legacy', legacy_convert), ('converter', converter_convert)):
+            fps = throughput(factory(channels, args.rate), audio, channels)
+            peak = peak_bytes_per_chunk(factory(channels, args.rate), audio, channels)
+            print(f"{channels:>8} {name:>10} {fps / 1e6:>10.2f} {fps / args.rate:>11.0f} {peak / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Time to first token, chunk rate and retry overhead of the Gemini streaming path, offline.
+
+Starts the local stand-in API (benchmarks/fake_gemini.py), points a real
+GeminiClient at it and drives ``send_message_stream`` and
+``send_screenshot_stream`` through a clean run and runs with injected 429
+and 503 errors. Time to first token is measured from the call to the
+first chunk in the caller, so key selection, retries and cooldown waits
+are included; retry overhead is the extra first-token time of requests
+that needed more than one attempt.
+
+    python -m benchmarks.bench_gemini_stream [--requests 40] [--first-token-ms 300] [--keys 3]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+
+
+def run(client, server, kind, count, image_bytes):
+    """Send ``count`` requests; return one record per request."""
+    records = []
+    for i in range(count):
+        before = server.stats()['requests']
+        start = time.perf_counter()
+        first = None
+        chunks = 0
+        error = None
+        try:
+            if kind == 'text':
+                stream = client.send_message_stream(f"Question {i}: how does a hash map work?")
+            else:
+                stream = client.send_screenshot_stream(image_bytes)
+            for chunk in stream:
+                if chunk.text:
+                    if first is None:
+                        first = time.perf_counter()
+                    chunks += 1
+        except Exception as e:
+            error = e
+        end = time.perf_counter()
+        records.append({
+            'ttft': (first or end) - start,
+            'stream': end - (first or end),
+            'chunks': chunks,
+            'attempts': server.stats()['requests'] - before,
+            'error': error,
+        })
+    return records
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+def report(label, kind, records):
+    ok = [r for r in records if r['error'] is None]
+    ttft = [r['ttft'] for r in ok]
+    rates = [(r['chunks'] - 1) / r['stream'] for r in ok if r['chunks'] > 1 and r['stream'] > 0]
+    clean = [r['ttft'] for r in ok if r['attempts'] == 1]
+    retried = [r['ttft'] for r in ok if r['attempts'] > 1]
+    overhead = (sum(retried) / len(retried) - sum(clean) / len(clean)) if retried and clean else 0.0
+    print(f"{label:<10} {kind:<11} {len(ok):>3}/{len(records):<3} "
+          f"{1000 * percentile(ttft, 0.5):>8.0f} {1000 * percentile(ttft, 0.95):>8.0f} "
+          f"{sum(rates) / len(rates) if rates else 0:>10.1f} "
+          f"{sum(r['attempts'] for r in records) - len(records):>8} {len(retried):>8} {1000 * overhead:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=40, help="requests per kind and scenario")
+    parser.add_argument('--keys', type=int, default=3)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--chunk-interval-ms', type=float, default=30)
+    parser.add_argument('--chunk-chars', type=int, default=40)
+    parser.add_argument('--retry-delay-s', type=int, default=1)
+    parser.add_argument('--image-kb', type=int, default=250)
+    args = parser.parse_args()
+
+    # The stand-in has no quota of its own; keep the pool from pacing requests
+    Config.GEMINI_API_KEYS = [f"fake-key-{i + 1}" for i in range(args.keys)]
+    Config.GEMINI_KEY_RPM = 100000
+    Config.RESPONSE_CACHE = False
+    Config.GEMINI_USAGE_FILE = ''
+    Config.GEMINI_WARM_CLIENTS = True
+    image_bytes = os.urandom(1024 * args.image_kb)
+
+    scenarios = [('clean', 0.0, 0.0), ('429 20%', 0.2, 0.0), ('503 10%', 0.0, 0.1)]
+    print(f"{'scenario':<10} {'kind':<11} {'ok':>7} {'p50 ttft':>8} {'p95 ttft':>8} {'chunks/s':>10} "
+          f"{'retries':>8} {'retried':>8} {'overhead':>10}")
+    for label, rate_429, rate_5xx in scenarios:
+        with FakeGeminiServer(first_token_ms=args.first_token_ms, chunk_interval_ms=args.chunk_interval_ms,
+                              chunk_chars=args.chunk_chars, rate_429=rate_429, rate_5xx=rate_5xx,
+                              retry_delay_s=args.retry_delay_s) as server:
+            Config.GEMINI_BASE_URL = server.base_url
+            client = GeminiClient()
+            for kind in ('text', 'screenshot'):
+                report(label, kind, run(client, server, kind, args.requests, image_bytes))
+    print("\nttft and overhead in ms; overhead = mean ttft of retried requests minus single-attempt ones")
+
+
+if __name__ == "__main__":
+    main()
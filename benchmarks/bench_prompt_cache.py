@@ -0,0 +1,70 @@
+"""Time to first token and billed input tokens with the system prompt inline versus cached, offline.
+
+Starts the local stand-in API (benchmarks/fake_gemini.py) with a prefill
+delay per uncached input token, sets a long SYSTEM_PROMPT (a stand-in
+resume and job description) and sends the same questions through a
+GeminiClient with GEMINI_PROMPT_CACHE off and on. Input tokens are split
+into those sent with each request and those served from cached content,
+as reported in the responses' usage metadata.
+
+    python -m benchmarks.bench_prompt_cache [--requests 20] [--prompt-tokens 6000] [--prefill-ms-per-1k 60]
+"""
+import argparse
+import time
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+
+RESUME_LINE = ("Led the migration of a payments platform from a monolith to event-driven services on Kafka, "
+               "cutting p99 latency by 40% and on-call pages by half. ")
+
+
+def run(client, count):
+    ttft = []
+    for i in range(count):
+        start = time.perf_counter()
+        first = None
+        for chunk in client.send_message_stream(f"Question {i}: walk me through a system you scaled."):
+            if first is None and chunk.text:
+                first = time.perf_counter()
+        ttft.append((first or time.perf_counter()) - start)
+    return ttft
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--prompt-tokens', type=int, default=6000, help="approximate size of SYSTEM_PROMPT")
+    parser.add_argument('--first-token-ms', type=float, default=200)
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=60)
+    parser.add_argument('--keys', type=int, default=2)
+    args = parser.parse_args()
+
+    Config.GEMINI_API_KEYS = [f"fake-key-{i + 1}" for i in range(args.keys)]
+    Config.GEMINI_KEY_RPM = 100000
+    Config.RESPONSE_CACHE = False
+    Config.GEMINI_USAGE_FILE = ''
+    Config.SYSTEM_PROMPT = RESUME_LINE * (4 * args.prompt_tokens // len(RESUME_LINE) + 1)
+
+    print(f"{'system prompt':<14} {'p50 ttft':>9} {'p95 ttft':>9} {'sent tok/req':>13} {'cached tok/req':>15} {'caches':>7}")
+    for label, cached in (('inline', False), ('cached', True)):
+        Config.GEMINI_PROMPT_CACHE = cached
+        with FakeGeminiServer(first_token_ms=args.first_token_ms, chunk_interval_ms=5,
+                              prefill_ms_per_1k=args.prefill_ms_per_1k) as server:
+            Config.GEMINI_BASE_URL = server.base_url
+            client = GeminiClient()
+            for index in range(args.keys):
+                client.chat_config(index, wait=True)
+            ttft = sorted(run(client, args.requests))
+            totals = [client.usage.totals(key) for key in Config.GEMINI_API_KEYS]
+            requests = sum(t['requests'] for t in totals) or 1
+            cached_tokens = sum(t['cached'] for t in totals)
+            sent = sum(t['prompt'] for t in totals) - cached_tokens
+            print(f"{label:<14} {1000 * ttft[len(ttft) // 2]:>7.0f}ms {1000 * ttft[int(0.95 * (len(ttft) - 1))]:>7.0f}ms "
+                  f"{sent / requests:>13.0f} {cached_tokens / requests:>15.0f} {server.stats()['caches_created']:>7}")
+    print("\nttft includes the stand-in's prefill delay for uncached input tokens; caches are uploaded once per key")
+
+
+if __name__ == "__main__":
+    main()
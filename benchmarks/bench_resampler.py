@@ -0,0 +1,72 @@
+"""Compare StreamingResampler against the per-chunk FFT resample_audio.
+
+Run from the repository root:
+    python -m benchmarks.bench_resampler [--seconds 60] [--chunk 1024]
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import signal
+
+from src.core.resampler import StreamingResampler
+from src.utils.helpers import resample_audio
+
+TARGET_RATE = 16000
+
+
+def make_signal(rate, seconds):
+    """Speech-band test signal: a few tones plus light noise, as int16."""
+    t = np.arange(int(rate * seconds)) / rate
+    x = 6000 * np.sin(2 * np.pi * 440 * t) + 3000 * np.sin(2 * np.pi * 1870 * t)
+    x += np.random.default_rng(0).normal(0, 300, len(t))
+    return np.clip(x, -32768, 32767).astype(np.int16)
+
+
+def run_fft(audio, rate, chunk):
+    out = []
+    start = time.perf_counter()
+    for i in range(0, len(audio), chunk):
+        out.append(resample_audio(audio[i:i + chunk], rate, TARGET_RATE))
+    return time.perf_counter() - start, np.concatenate(out)
+
+
+def run_streaming(audio, rate, chunk):
+    resampler = StreamingResampler(rate, TARGET_RATE, max_chunk=chunk)
+    out = []
+    start = time.perf_counter()
+    for i in range(0, len(audio), chunk):
+        out.append(resampler.process_int16(audio[i:i + chunk]))
+    return time.perf_counter() - start, np.concatenate(out)
+
+
+def snr_db(output, reference, max_lag=64):
+    """SNR of output against a one-shot reference, aligned on the best lag."""
+    n = min(len(output), len(reference)) - max_lag
+    lag = min(range(max_lag), key=lambda d: np.abs(output[d:d + n] - reference[:n]).mean())
+    error = output[lag:lag + n].astype(np.float64) - reference[:n]
+    return 10 * np.log10(np.sum(reference[:n] ** 2) / max(np.sum(error ** 2), 1e-12))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--chunk', type=int, default=1024)
+    args = parser.parse_args()
+
+    # drift: output duration minus input duration. Rounding the length of
+    # every chunk separately makes the FFT path slowly run ahead/behind.
+    print(f"{'rate':>6} {'method':>10} {'ms/audio-s':>11} {'realtime x':>11} {'SNR dB':>8} {'drift ms':>9}")
+    for rate in (44100, 48000):
+        audio = make_signal(rate, args.seconds)
+        ratio = StreamingResampler(rate, TARGET_RATE)
+        reference = signal.resample_poly(audio.astype(np.float64), ratio.up, ratio.down)
+        for name, runner in (('fft', run_fft), ('polyphase', run_streaming)):
+            elapsed, output = runner(audio, rate, args.chunk)
+            drift_ms = 1000 * (len(output) - len(audio) * TARGET_RATE / rate) / TARGET_RATE
+            print(f"{rate:>6} {name:>10} {1000 * elapsed / args.seconds:>11.3f} "
+                  f"{args.seconds / elapsed:>11.0f} {snr_db(output, reference):>8.1f} {drift_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Encode time and payload size of screenshots: the old full-size PNG path against ScreenshotEncoder.
+
+Runs every encoder configuration over sample captures and reports the
+median encode time (resize included), the payload on the wire (base64,
+as the API receives inline images) and the output size. Without image
+paths it uses synthetic 4K captures: a code editor, a document, a video
+call and a mixed desktop; pass your own screenshots to measure those.
+
+A simulated session then repeats Alt+X over a mostly unchanged screen
+(the same problem again, an edit in one place, a new screen) and
+compares the bytes sent with and without ScreenshotDiffer.
+
+    python -m benchmarks.bench_screenshot_encode [shot1.png ...] [--repeat 5] [--max-side 2048]
+"""
+import argparse
+import io
+import random
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from src.core.screenshot import ScreenshotDiffer, ScreenshotEncoder
+
+CODE = "    for i, n in enumerate(nums):  # O(n) lookups in the seen map\n"
+
+
+def text_capture(size, background, foreground, line):
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    for y in range(10, size[1], 18):
+        draw.text((20, y), line * (size[0] // 400), fill=foreground)
+    return image
+
+
+def photo_capture(size, seed=0):
+    rng = random.Random(seed)
+    small = (size[0] // 16, size[1] // 16)
+    noise = Image.frombytes('RGB', small, bytes(rng.randrange(256) for _ in range(small[0] * small[1] * 3)))
+    return noise.resize(size, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(3))
+
+
+def samples(size=(3840, 2160)):
+    mixed = text_capture(size, (245, 245, 245), (20, 20, 20), "Design a rate limiter for a public API. ")
+    mixed.paste(photo_capture((size[0] // 2, size[1] // 2), seed=1), (size[0] // 2, 0))
+    return {
+        'code editor': text_capture(size, (30, 30, 30), (220, 220, 150), CODE.strip() + "  "),
+        'document': text_capture(size, (255, 255, 255), (0, 0, 0), "Tell me about a time you disagreed. "),
+        'video call': photo_capture(size),
+        'mixed desktop': mixed,
+    }
+
+
+def legacy_png(image):
+    """The capture path before ScreenshotEncoder: full size, default PNG settings."""
+    start = time.perf_counter()
+    out = io.BytesIO()
+    image.save(out, format='PNG')
+    return out.getvalue(), 'image/png', image.size, time.perf_counter() - start
+
+
+def session(encoder, base, other):
+    """Bytes sent for a sequence of captures with and without change detection."""
+    edited = base.copy()
+    ImageDraw.Draw(edited).rectangle((base.width // 3, base.height // 2, base.width // 2, base.height // 2 + 80),
+                                     fill=(180, 40, 40))
+    frames = [base, base.copy(), base.copy(), edited, edited.copy(), other, other.copy()]
+    differ = ScreenshotDiffer()
+    full_bytes = 0
+    diff_ms = []
+    for frame in frames:
+        full_bytes += len(encoder.encode(frame).data)
+        start = time.perf_counter()
+        change = differ.compare(frame)
+        diff_ms.append(1000 * (time.perf_counter() - start))
+        sent = 0
+        if change.kind != 'same':
+            sent = len(encoder.encode(frame.crop(change.box) if change.kind == 'region' else frame).data)
+        differ.submitted(frame, change, sent)
+    stats = differ.stats()
+    print(f"\nsession of {len(frames)} captures: {full_bytes / 1024:.0f} KB without change detection, "
+          f"{stats['bytes_sent'] / 1024:.0f} KB with it ({stats['skipped']} unchanged, {stats['cropped']} cropped, "
+          f"{stats['bytes_saved'] / 1024:.0f} KB saved); compare p50 {sorted(diff_ms)[len(diff_ms) // 2]:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='*', help="screenshots to encode (default: synthetic 4K captures)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-side', type=int, default=2048)
+    parser.add_argument('--quality', type=int, default=80)
+    args = parser.parse_args()
+
+    images = {path: Image.open(path).convert('RGB') for path in args.images} or samples()
+    encoders = {
+        'auto': ScreenshotEncoder(args.max_side, 'auto', quality=args.quality),
+        'auto+webp': ScreenshotEncoder(args.max_side, 'auto', 'webp', quality=args.quality),
+        'png': ScreenshotEncoder(args.max_side, 'png'),
+        'jpeg': ScreenshotEncoder(args.max_side, 'jpeg', quality=args.quality),
+        'webp': ScreenshotEncoder(args.max_side, 'webp', quality=args.quality),
+    }
+
+    print(f"{'image':<16} {'encoder':<12} {'format':<6} {'size':>10} {'encode':>9} {'payload':>10} {'vs old':>7}")
+    for name, image in images.items():
+        runs = [legacy_png(image) for _ in range(args.repeat)]
+        data, mime_type, size, _ = runs[0]
+        legacy_ms = 1000 * sorted(r[3] for r in runs)[len(runs) // 2]
+        legacy_kb = 4 * ((len(data) + 2) // 3) / 1024
+        print(f"{name:<16} {'old png':<12} {'png':<6} {size[0]:>5}x{size[1]:<4} {legacy_ms:>7.0f}ms {legacy_kb:>8.0f}KB {'':>7}")
+        for label, encoder in encoders.items():
+            results = [encoder.encode(image) for _ in range(args.repeat)]
+            encoded = results[0]
+            ms = 1000 * sorted(r.encode_s for r in results)[len(results) // 2]
+            kb = 4 * ((len(encoded.data) + 2) // 3) / 1024
+            print(f"{'':<16} {label:<12} {encoded.mime_type.split('/')[1]:<6} "
+                  f"{encoded.size[0]:>5}x{encoded.size[1]:<4} {ms:>7.0f}ms {kb:>8.0f}KB {kb / legacy_kb:>6.0%}")
+
+    first, second = list(images.values())[0], list(images.values())[-1]
+    if first.size == second.size and first is not second:
+        session(encoders['auto'], first, second)
+
+
+if __name__ == "__main__":
+    main()
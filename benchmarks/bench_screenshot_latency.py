@@ -0,0 +1,101 @@
+"""Hotkey-to-request latency of a screenshot, before and after the non-blocking capture path.
+
+Simulates what the window does after Alt+X, without Qt or a real
+window: the old path sleeps 300 ms on the GUI thread (where it hid the
+window), the new one schedules the capture on a timer (the
+display-affinity settle time, or the hide delay). Both then grab,
+encode with the same ScreenshotEncoder and send on a worker thread, so
+only the hide/sleep versus exclude/timer sequence differs. Requests go
+to the local stand-in API (benchmarks/fake_gemini.py) and latency runs
+from the hotkey to the request arriving there. "GUI blocked" is the
+time the hotkey handler itself holds the GUI thread. The numbers are
+simulated: they compare the two sequences, not real window managers.
+
+The screen is grabbed with PIL's ImageGrab when a display is available,
+otherwise a synthetic 4K capture stands in for it.
+
+    python -m benchmarks.bench_screenshot_latency [--shots 10] [--hide-delay-ms 100] [--settle-ms 35]
+"""
+import argparse
+import threading
+import time
+
+from PIL import ImageGrab
+
+from benchmarks.bench_screenshot_encode import samples
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.screenshot import ScreenshotEncoder
+
+
+def screen_grabber():
+    """ImageGrab.grab if this machine has a screen to grab, else a copy of a synthetic capture."""
+    try:
+        ImageGrab.grab()
+        return ImageGrab.grab, 'screen'
+    except Exception:
+        capture = samples()['code editor']
+        return capture.copy, 'synthetic 4K'
+
+
+def worker(grab, client, encoder, done):
+    encoded = encoder.encode(grab())
+    for _ in client.send_screenshot_stream(encoded.data, mime_type=encoded.mime_type):
+        pass
+    done.set()
+
+
+def shoot(path, grab, client, encoder, args):
+    """Run one screenshot; returns (GUI blocked seconds, done event)."""
+    done = threading.Event()
+    start = time.perf_counter()
+    if path == 'before':
+        # hide(); time.sleep(0.3) on the GUI thread, then the capture thread
+        time.sleep(0.3)
+        threading.Thread(target=worker, args=(grab, client, encoder, done), daemon=True).start()
+    else:
+        delay = args.settle_ms if path == 'after (exclude)' else args.hide_delay_ms
+        # QTimer.singleShot(delay, ...) returns at once; the timer starts the capture thread
+        threading.Timer(delay / 1000, lambda: threading.Thread(
+            target=worker, args=(grab, client, encoder, done), daemon=True).start()).start()
+    return time.perf_counter() - start, done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shots', type=int, default=10)
+    parser.add_argument('--hide-delay-ms', type=float, default=Config.SCREENSHOT_HIDE_DELAY_MS)
+    parser.add_argument('--settle-ms', type=float, default=35, help="display affinity settle time")
+    args = parser.parse_args()
+
+    Config.GEMINI_API_KEYS = ['fake-key-1']
+    Config.GEMINI_KEY_RPM = 100000
+    Config.RESPONSE_CACHE = False
+    Config.GEMINI_USAGE_FILE = ''
+    grab, source = screen_grabber()
+    encoder = ScreenshotEncoder(Config.SCREENSHOT_MAX_SIDE, Config.SCREENSHOT_FORMAT,
+                                Config.SCREENSHOT_LOSSY_FORMAT, Config.SCREENSHOT_QUALITY)
+
+    print(f"capture source: {source}")
+    print(f"{'path':<18} {'p50 hotkey->request':>20} {'p95':>8} {'GUI blocked':>12}")
+    with FakeGeminiServer(first_token_ms=20, chunk_interval_ms=1) as server:
+        Config.GEMINI_BASE_URL = server.base_url
+        client = GeminiClient()
+        for path in ('before', 'after (exclude)', 'after (hide)'):
+            latencies, blocked = [], []
+            for _ in range(args.shots):
+                arrived = len(server.arrivals)
+                hotkey = time.perf_counter()
+                gui, done = shoot(path, grab, client, encoder, args)
+                done.wait(60)
+                latencies.append(server.arrivals[arrived] - hotkey)
+                blocked.append(gui)
+            latencies.sort()
+            print(f"{path:<18} {1000 * latencies[len(latencies) // 2]:>18.0f}ms "
+                  f"{1000 * latencies[int(0.95 * (len(latencies) - 1))]:>6.0f}ms {1000 * max(blocked):>10.0f}ms")
+    print("\nsimulated: both paths encode the same way; only the GUI-thread sleep versus the timer differs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""OCR time, payload and end-to-end latency of screenshots sent as OCR text versus as images.
+
+Each capture goes through the image-only path (ScreenshotEncoder) and
+the OCR path (ScreenshotOCR, sending text alone or text plus a
+thumbnail as its confidence decides), and both are sent to the local
+stand-in API (benchmarks/fake_gemini.py). End-to-end latency is the
+local work (OCR or encoding), the upload of the request body at
+``--uplink-mbps`` and the measured time to the first answer chunk.
+Input tokens follow the API's image rule (258 per 768x768 tile, one
+tile for images up to 384x384) and 4 characters per text token.
+
+Without image paths it uses synthetic 4K captures (a code editor, a
+document, a video call and a mixed desktop); pass your own screenshots
+to measure those. Needs Tesseract and `pip install pytesseract`.
+
+    python -m benchmarks.bench_screenshot_ocr [shot1.png ...] [--repeat 3] [--workers 2] [--uplink-mbps 10]
+"""
+import argparse
+import math
+import time
+
+from PIL import Image
+
+from benchmarks.bench_screenshot_encode import samples
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.ocr import ScreenshotOCR
+from src.core.screenshot import ScreenshotEncoder
+
+
+def image_tokens(size):
+    if max(size) <= 384:
+        return 258
+    return 258 * math.ceil(size[0] / 768) * math.ceil(size[1] / 768)
+
+
+def first_chunk(client, data, mime_type, prompt):
+    start = time.perf_counter()
+    for chunk in client.send_screenshot_stream(data, prompt, mime_type=mime_type):
+        if chunk.text:
+            return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def image_only(encoder, image):
+    encoded = encoder.encode(image)
+    return 'image', encoded.encode_s, encoded.data, encoded.mime_type, GeminiClient.SCREENSHOT_PROMPT, encoded.size
+
+
+def with_ocr(ocr, thumbnails, encoder, image):
+    result = ocr.recognize(image)
+    plan = ocr.plan(result)
+    if plan == 'image':
+        kind, local_s, data, mime_type, prompt, size = image_only(encoder, image)
+        return 'image', result.ocr_s + local_s, data, mime_type, prompt, size
+    thumbnail = thumbnails.encode(image) if plan == 'thumbnail' else None
+    prompt = GeminiClient.ocr_prompt(result.text, thumbnail=thumbnail is not None)
+    if thumbnail:
+        return plan, result.ocr_s + thumbnail.encode_s, thumbnail.data, thumbnail.mime_type, prompt, thumbnail.size
+    return plan, result.ocr_s, None, 'text/plain', prompt, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='*', help="screenshots to send (default: synthetic 4K captures)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--min-confidence', type=float, default=80)
+    parser.add_argument('--thumbnail-side', type=int, default=768)
+    parser.add_argument('--uplink-mbps', type=float, default=10)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=60)
+    args = parser.parse_args()
+
+    try:
+        ocr = ScreenshotOCR(args.workers, min_confidence=args.min_confidence)
+    except Exception as e:
+        parser.exit(1, f"Tesseract is not available ({e}); install it and pytesseract to run this benchmark\n")
+
+    images = {path: Image.open(path).convert('RGB') for path in args.images} or samples()
+    encoder = ScreenshotEncoder(Config.SCREENSHOT_MAX_SIDE, Config.SCREENSHOT_FORMAT, Config.SCREENSHOT_LOSSY_FORMAT,
+                                Config.SCREENSHOT_QUALITY)
+    thumbnails = ScreenshotEncoder(args.thumbnail_side, Config.SCREENSHOT_FORMAT, Config.SCREENSHOT_LOSSY_FORMAT,
+                                   Config.SCREENSHOT_QUALITY)
+    Config.GEMINI_API_KEYS = ['fake-key-1']
+    Config.GEMINI_KEY_RPM = 100000
+    Config.RESPONSE_CACHE = False
+    Config.GEMINI_USAGE_FILE = ''
+
+    print(f"{'image':<16} {'mode':<10} {'sent':<10} {'local':>8} {'payload':>9} {'tokens':>7} {'upload':>8} "
+          f"{'ttft':>7} {'end-to-end':>11}")
+    with FakeGeminiServer(first_token_ms=args.first_token_ms, chunk_interval_ms=5,
+                          prefill_ms_per_1k=args.prefill_ms_per_1k) as server:
+        Config.GEMINI_BASE_URL = server.base_url
+        client = GeminiClient()
+        for name, image in images.items():
+            modes = {'image only': lambda: image_only(encoder, image),
+                     'ocr': lambda: with_ocr(ocr, thumbnails, encoder, image)}
+            for label, run in modes.items():
+                rows = []
+                for _ in range(args.repeat):
+                    client.create_chat()
+                    kind, local_s, data, mime_type, prompt, size = run()
+                    # Inline images travel base64-encoded in the JSON body
+                    payload = 4 * ((len(data) + 2) // 3) if data else 0
+                    payload += len(prompt.encode('utf-8'))
+                    tokens = len(prompt) // 4 + (image_tokens(size) if size else 0)
+                    upload_s = payload * 8 / (args.uplink_mbps * 1e6)
+                    ttft = first_chunk(client, data, mime_type, prompt)
+                    rows.append((local_s + upload_s + ttft, kind, local_s, payload, tokens, upload_s, ttft))
+                total, kind, local_s, payload, tokens, upload_s, ttft = sorted(rows)[len(rows) // 2]
+                print(f"{name:<16} {label:<10} {kind:<10} {1000 * local_s:>6.0f}ms {payload / 1024:>7.0f}KB "
+                      f"{tokens:>7} {1000 * upload_s:>6.0f}ms {1000 * ttft:>5.0f}ms {1000 * total:>9.0f}ms")
+    ocr.close()
+    print("\nlocal = OCR and/or encoding; ttft is measured against the stand-in (which prefills every image as "
+          f"258 tokens, understating large ones); upload is modelled at {args.uplink_mbps:g} Mbit/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Cost of a tracing call with tracing disabled, enabled, and writing JSONL.
+
+    python -m benchmarks.bench_tracing [--calls 200000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.utils.tracing import Tracer
+
+
+def per_call_ns(tracer, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        tracer.record('capture', start)
+    return 1e9 * (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trace.jsonl')
+        tracers = [
+            ('disabled', Tracer()),
+            ('in-memory (HUD only)', Tracer(enabled=True)),
+            ('JSONL', Tracer(path)),
+            ('JSONL, 1 in 50 written', Tracer(path, sample_every={'capture': 50})),
+        ]
+        for name, tracer in tracers:
+            print(f"{name:<24} {per_call_ns(tracer, args.calls):>8.0f} ns/call")
+            tracer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure how much audio the local VAD gate keeps away from Azure.
+
+Pass one or more recorded sessions (16-bit PCM WAV at any rate and channel
+count); each is run through the same convert + gate stages as the app.
+Without arguments a synthetic session with speech-like bursts is used.
+
+    python -m benchmarks.bench_vad [session.wav ...] [--mode energy|webrtc]
+"""
+import argparse
+import time
+import wave
+
+import numpy as np
+
+from src.config import Config
+from src.core.converter import FrameConverter
+from src.core.vad import VoiceGate, create_vad
+
+CHUNK = 1024
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        return data, f.getnchannels(), f.getframerate()
+
+
+def synthetic_session(seconds=120, rate=48000, seed=0):
+    """Stereo noise floor with speech-like harmonic bursts, about 35% talk time."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    audio = rng.normal(0, 150, n)
+    t = 0.0
+    while t < seconds - 4:
+        t += rng.uniform(1.5, 5.0)
+        length = rng.uniform(0.8, 3.0)
+        a, b = int(t * rate), min(n, int((t + length) * rate))
+        seg = np.arange(b - a) / rate
+        f0 = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * f0 * k * seg) / k for k in range(1, 8))
+        audio[a:b] += 3000 * voice * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * seg))
+        t += length
+    stereo = np.repeat(np.clip(audio, -32768, 32767).astype(np.int16), 2)
+    return stereo, 2, rate
+
+
+def run(audio, channels, rate, mode):
+    converter = FrameConverter(channels, rate, 16000, max_frames=CHUNK)
+    gate = VoiceGate(create_vad(mode, 16000, threshold_db=Config.VAD_THRESHOLD_DB),
+                     preroll_ms=Config.VAD_PREROLL_MS, hangover_ms=Config.VAD_HANGOVER_MS)
+    sent_bytes = 0
+    step = CHUNK * channels
+    start = time.perf_counter()
+    for i in range(0, len(audio) - step + 1, step):
+        sent_bytes += len(gate.process(converter.convert(audio[i:i + step])))
+    return gate.stats(), sent_bytes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sessions', nargs='*')
+    parser.add_argument('--mode', default=Config.VAD_MODE if Config.VAD_MODE != 'off' else 'energy')
+    args = parser.parse_args()
+
+    sessions = [(path, read_wav(path)) for path in args.sessions] or [('synthetic', synthetic_session())]
+    print(f"{'session':<24} {'minutes':>8} {'sent min':>9} {'suppressed':>11} {'upload KiB':>11} {'cpu ms/min':>12}")
+    for name, (audio, channels, rate) in sessions:
+        minutes = len(audio) / channels / rate / 60
+        stats, sent_bytes, elapsed = run(audio, channels, rate, args.mode)
+        sent_minutes = stats['sent_frames'] * 0.02 / 60
+        print(f"{name[-24:]:<24} {minutes:>8.2f} {sent_minutes:>9.2f} {stats['suppressed_ratio']:>11.1%} "
+              f"{sent_bytes / 1024:>11.0f} {1000 * elapsed / minutes:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Time from start() to the first Azure recognition event, cold vs warm.
+
+Needs SPEECH_KEYS and SPEECH_REGION in .env and a WAV file with speech at
+the very beginning. The file is replayed in real time in place of the
+loopback device, so the numbers include recognizer construction, the
+service connection and the first partial result.
+
+    python -m benchmarks.bench_warm_start speech.wav [--runs 3]
+"""
+import argparse
+import time
+
+from src.config import Config
+from src.core.audio import AudioTranscriber
+from src.core.sources import FileSource
+
+
+class Signal:
+    def emit(self, *args):
+        pass
+
+
+class Signals:
+    status_update = Signal()
+    transcription_update = Signal()
+
+
+def first_event_seconds(path, warm, timeout=20.0):
+    transcriber = AudioTranscriber(Signals(), lambda: FileSource(path, realtime=True))
+    if warm:
+        transcriber.prepare(Config.SPEECH_KEYS, Config.SPEECH_REGION)
+        deadline = time.monotonic() + timeout
+        while not transcriber._standby and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # Give the failover recognizer the same head start it gets in the app
+        time.sleep(1.0)
+
+    transcriber.start(Config.SPEECH_KEYS, Config.SPEECH_REGION)
+    deadline = time.monotonic() + timeout
+    result = None
+    while time.monotonic() < deadline:
+        metrics = transcriber.startup_metrics
+        if metrics and metrics['first_event_s'] is not None:
+            result = metrics['first_event_s']
+            break
+        time.sleep(0.01)
+    transcriber.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('wav')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    if not Config.SPEECH_KEYS or not Config.SPEECH_REGION:
+        raise SystemExit("Set SPEECH_KEYS and SPEECH_REGION in .env to run this benchmark")
+
+    for mode, warm in (('cold', False), ('warm', True)):
+        times = [first_event_seconds(args.wav, warm) for _ in range(args.runs)]
+        shown = ", ".join("timeout" if t is None else f"{t:.2f}s" for t in times)
+        valid = [t for t in times if t is not None]
+        best = f"{min(valid):.2f}s" if valid else "n/a"
+        print(f"{mode}: best {best}  ({shown})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""Local stand-in for the Gemini API, for offline tests and benchmarks.
+
+Serves the REST endpoints the google-genai SDK uses for chats
+(``models/{model}:streamGenerateContent`` as server-sent events,
+``:generateContent``, ``models/{model}`` and ``cachedContents``) with a
+configurable delay before the first chunk, prefill time per input token,
+chunk cadence and chunk size, and injects 429 (with a RetryInfo delay)
+and 5xx errors at a given rate or on demand.
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:8765 and any
+GEMINI_API_KEYS.
+
+    python -m benchmarks.fake_gemini [--port 8765] [--first-token-ms 300] [--rate-429 0.1]
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("a hash map stores key value pairs in buckets chosen by the hash of the key so lookups "
+         "take constant time on average while collisions are handled by chaining or probing").split()
+
+ERRORS = {
+    400: ('INVALID_ARGUMENT', "Request contains an invalid argument."),
+    403: ('PERMISSION_DENIED', "CachedContent not found (or permission denied)"),
+    404: ('NOT_FOUND', "Not found"),
+    429: ('RESOURCE_EXHAUSTED', "Resource has been exhausted (e.g. check quota)."),
+    500: ('INTERNAL', "An internal error has occurred."),
+    503: ('UNAVAILABLE', "The model is overloaded. Please try again later."),
+}
+
+
+class FakeGeminiServer:
+    """Threaded HTTP server answering like the Gemini API.
+
+    Every request waits ``first_token_ms`` before its first chunk, then
+    streams ``answer_chars`` of text in chunks of ``chunk_chars`` every
+    ``chunk_interval_ms``; ``prefill_ms_per_1k`` adds time per thousand
+    input tokens not served from cached content. A request fails with 429
+    at ``rate_429`` and with 503 at ``rate_5xx``; ``fail_next`` queues
+    specific failures and ``rate_limited_keys`` always get a 429.
+
+    Cached content is kept per API key, like the real per-project caches,
+    and must hold at least ``min_cache_tokens``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, first_token_ms=300, chunk_interval_ms=30,
+                 chunk_chars=40, answer_chars=600, rate_429=0.0, rate_5xx=0.0, retry_delay_s=1, seed=0,
+                 prefill_ms_per_1k=0.0, min_cache_tokens=1024):
+        self.first_token_ms = first_token_ms
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.min_cache_tokens = min_cache_tokens
+        # name -> {'key', 'model', 'contents', 'tokens', 'expires'}
+        self.cached_contents = {}
+        self._cache_ids = itertools.count(1)
+        self.caches_created = 0
+        self.cache_hits = 0
+        self.chunk_interval_ms = chunk_interval_ms
+        self.chunk_chars = chunk_chars
+        self.answer_chars = answer_chars
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_delay_s = retry_delay_s
+        self.rate_limited_keys = set()
+        self._failures = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.by_key = {}
+        self.by_model = {}
+        self.contents = []
+        # time.perf_counter() at which each generate request arrived
+        self.arrivals = []
+        self.errors = {}
+        self.chunks = 0
+        self.images = 0
+
+        server = self
+
+        class Handler(_Handler):
+            fake = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-gemini', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def fail_next(self, status=429, count=1):
+        """Make the next ``count`` generate requests fail with ``status``."""
+        with self._lock:
+            self._failures += [status] * count
+
+    def answer(self, seed):
+        """Deterministic filler text of ``answer_chars`` characters."""
+        rng = random.Random(seed)
+        text = []
+        while len(" ".join(text)) < self.answer_chars:
+            text.append(rng.choice(WORDS))
+        return " ".join(text)[:self.answer_chars]
+
+    def _decide(self, key, model, contents):
+        """Count a generate request and pick its injected error, if any."""
+        with self._lock:
+            self.requests += 1
+            self.by_key[key] = self.by_key.get(key, 0) + 1
+            self.by_model[model] = self.by_model.get(model, 0) + 1
+            # Number of contents sent, i.e. history plus the new message
+            self.contents.append(contents)
+            self.arrivals.append(time.perf_counter())
+            status = None
+            if self._failures:
+                status = self._failures.pop(0)
+            elif key in self.rate_limited_keys:
+                status = 429
+            else:
+                roll = self._rng.random()
+                if roll < self.rate_429:
+                    status = 429
+                elif roll < self.rate_429 + self.rate_5xx:
+                    status = 503
+            if status:
+                self.errors[status] = self.errors.get(status, 0) + 1
+            return status
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'by_key': dict(self.by_key),
+                'by_model': dict(self.by_model),
+                'errors': dict(self.errors),
+                'chunks': self.chunks,
+                'images': self.images,
+                'caches': len(self.cached_contents),
+                'caches_created': self.caches_created,
+                'cache_hits': self.cache_hits,
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message=None):
+        name, default = ERRORS.get(status, ERRORS[500])
+        message = message or default
+        error = {'code': status, 'message': message, 'status': name}
+        if status == 429:
+            error['details'] = [{'@type': 'type.googleapis.com/google.rpc.RetryInfo',
+                                 'retryDelay': f"{self.fake.retry_delay_s}s"}]
+        self._json(status, {'error': error})
+
+    def do_GET(self):
+        if '/cachedContents/' in self.path:
+            return self._cached_content('GET')
+        match = re.search(r"/models/([^/?:]+)", self.path)
+        if not match:
+            return self._json(404, {'error': {'code': 404, 'message': "Not found", 'status': 'NOT_FOUND'}})
+        self._json(200, {'name': f"models/{match.group(1)}", 'displayName': match.group(1),
+                         'inputTokenLimit': 1048576, 'outputTokenLimit': 8192})
+
+    def do_PATCH(self):
+        self._cached_content('PATCH')
+
+    def do_DELETE(self):
+        self._cached_content('DELETE')
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _cached_content(self, method):
+        """Get, update (the TTL) or delete one of this key's cached contents."""
+        body = self._body()
+        fake = self.fake
+        name = 'cachedContents/' + self.path.split('/cachedContents/', 1)[1].split('?')[0]
+        with fake._lock:
+            entry = fake.cached_contents.get(name)
+            if entry is None or entry['key'] != self.headers.get('x-goog-api-key', '') or entry['expires'] < time.time():
+                entry = None
+            elif method == 'DELETE':
+                del fake.cached_contents[name]
+            elif method == 'PATCH' and 'ttl' in body:
+                entry['expires'] = time.time() + float(body['ttl'].rstrip('s'))
+        if entry is None:
+            return self._error(403)
+        self._json(200, {} if method == 'DELETE' else self._cache_resource(name, entry))
+
+    def _create_cached_content(self, body):
+        fake = self.fake
+        contents = body.get('contents', [])
+        if body.get('systemInstruction'):
+            contents = [body['systemInstruction']] + contents
+        tokens, _ = self._prompt_tokens({'contents': contents})
+        if tokens < fake.min_cache_tokens:
+            return self._error(400, f"Cached content is too small. total_token_count={tokens}, "
+                                    f"min_total_token_count={fake.min_cache_tokens}")
+        with fake._lock:
+            name = f"cachedContents/fake-{next(fake._cache_ids)}"
+            entry = fake.cached_contents[name] = {
+                'key': self.headers.get('x-goog-api-key', ''),
+                'model': body.get('model', ''),
+                'tokens': tokens,
+                'expires': time.time() + float(body.get('ttl', '3600s').rstrip('s')),
+            }
+            fake.caches_created += 1
+        self._json(200, self._cache_resource(name, entry))
+
+    @staticmethod
+    def _cache_resource(name, entry):
+        expires = datetime.fromtimestamp(entry['expires'], timezone.utc)
+        return {'name': name, 'model': entry['model'], 'displayName': '',
+                'expireTime': expires.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                'usageMetadata': {'totalTokenCount': entry['tokens']}}
+
+    def do_POST(self):
+        body = self._body()
+        if self.path.split('?')[0].endswith('/cachedContents'):
+            return self._create_cached_content(body)
+        match = re.search(r"/models/([^/?:]+):(streamGenerateContent|generateContent)", self.path)
+        if not match:
+            return self._json(404, {'error': {'code': 404, 'message': "Not found", 'status': 'NOT_FOUND'}})
+        model, method = match.groups()
+        fake = self.fake
+
+        status = fake._decide(self.headers.get('x-goog-api-key', ''), model, len(body.get('contents', [])))
+        if status:
+            time.sleep(fake.first_token_ms / 4000)
+            return self._error(status)
+
+        cached_tokens = 0
+        if body.get('cachedContent'):
+            if body.get('systemInstruction'):
+                return self._error(400, "CachedContent can not be used with GenerateContent request "
+                                        "setting system_instruction, tools or tool_config.")
+            with fake._lock:
+                entry = fake.cached_contents.get(body['cachedContent'])
+                if entry and entry['key'] == self.headers.get('x-goog-api-key', '') and entry['expires'] >= time.time():
+                    cached_tokens = entry['tokens']
+                    fake.cache_hits += 1
+            if not cached_tokens:
+                with fake._lock:
+                    fake.errors[403] = fake.errors.get(403, 0) + 1
+                return self._error(403)
+
+        prompt_tokens, images = self._prompt_tokens(body)
+        with fake._lock:
+            fake.images += images
+        answer = fake.answer(prompt_tokens)
+        pieces = [answer[i:i + fake.chunk_chars] for i in range(0, len(answer), fake.chunk_chars)]
+        usage = {'promptTokenCount': prompt_tokens + cached_tokens, 'candidatesTokenCount': len(answer) // 4,
+                 'totalTokenCount': prompt_tokens + cached_tokens + len(answer) // 4}
+        if cached_tokens:
+            usage['cachedContentTokenCount'] = cached_tokens
+
+        time.sleep((fake.first_token_ms + fake.prefill_ms_per_1k * prompt_tokens / 1000) / 1000)
+        if method == 'generateContent':
+            return self._json(200, self._response(model, answer, usage))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(fake.chunk_interval_ms / 1000)
+                last = i == len(pieces) - 1
+                event = self._response(model, piece, usage if last else None)
+                self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8'))
+                with fake._lock:
+                    fake.chunks += 1
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early (a cancelled answer)
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    @staticmethod
+    def _prompt_tokens(body):
+        """Input tokens sent with the request itself (not from cached content)."""
+        tokens, images = 0, 0
+        contents = body.get('contents', [])
+        if body.get('systemInstruction'):
+            contents = [body['systemInstruction']] + contents
+        for content in contents:
+            for part in content.get('parts', []):
+                if 'inlineData' in part or 'inline_data' in part:
+                    images += 1
+                    tokens += 258
+                else:
+                    tokens += len(part.get('text', '')) // 4
+        return tokens, images
+
+    @staticmethod
+    def _response(model, text, usage=None):
+        candidate = {'content': {'role': 'model', 'parts': [{'text': text}]}, 'index': 0}
+        response = {'candidates': [candidate], 'modelVersion': model}
+        if usage:
+            candidate['finishReason'] = 'STOP'
+            response['usageMetadata'] = usage
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--chunk-interval-ms', type=float, default=30)
+    parser.add_argument('--chunk-chars', type=int, default=40)
+    parser.add_argument('--answer-chars', type=int, default=600)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=0.0, help="delay per 1000 uncached input tokens")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.host, args.port, args.first_token_ms, args.chunk_interval_ms,
+                              args.chunk_chars, args.answer_chars, args.rate_429, args.rate_5xx,
+                              prefill_ms_per_1k=args.prefill_ms_per_1k)
+    print(f"Fake Gemini API on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Score transcript flush policies on latency against split rate.
+
+Replays recorded transcript events through each policy exactly as the
+window does and reports the wait added after the last final of a
+question, how often one question was split across several Gemini
+requests, and how often separate questions were merged into one.
+
+Record a session by setting TRANSCRIPT_LOG=session.jsonl in .env. Each
+line is {"t": seconds, "kind": "partial"|"final", "text": ..., "silence":
+seconds}. Add "turn": n to the finals to label which question they belong
+to; unlabeled finals start a new question after --turn-gap seconds of
+silence. Without arguments a synthetic interview is generated.
+
+    python -m benchmarks.replay_batching [session.jsonl ...] [--turn-gap 4]
+"""
+import argparse
+import json
+import random
+
+from src.config import Config
+from src.core.batching import AdaptiveFlushPolicy, FixedFlushPolicy
+
+OPENERS = ["So", "Okay", "Alright", "Great"]
+CONTEXT = [
+    "I see you worked on a payments service at your last company",
+    "Let's move on to system design",
+    "You mentioned you have used Kubernetes",
+    "I'd like to talk about your current team",
+    "Looking at your resume",
+]
+LEADS = ["and I was wondering", "and", "so"]
+QUESTIONS = [
+    "How would you design a rate limiter for a public API?",
+    "What happens when you type a URL into the browser?",
+    "Can you explain the difference between a process and a thread?",
+    "Why did you choose Postgres over a document store?",
+    "Tell me about a time you disagreed with your manager.",
+    "How do you make sure a deployment can be rolled back safely?",
+    "What would you change about the architecture if traffic grew ten times?",
+    "Walk me through how you debugged the last production incident.",
+]
+
+
+def synthetic_session(turns=60, seed=0):
+    """Interviewer questions with mid-question pauses and Azure-like events."""
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    for turn in range(turns):
+        segments = []
+        if rng.random() < 0.5:
+            lead = rng.choice(LEADS)
+            segments.append(f"{rng.choice(OPENERS)}, {rng.choice(CONTEXT).lower()}, {lead}")
+        elif rng.random() < 0.4:
+            segments.append(f"{rng.choice(CONTEXT)}.")
+        segments.append(rng.choice(QUESTIONS))
+
+        for i, text in enumerate(segments):
+            words = text.split()
+            spoken = len(words) * rng.uniform(0.28, 0.4)
+            step = spoken / len(words)
+            for k in range(1, len(words) + 1):
+                partial = " ".join(words[:k]).lower().strip(",.?")
+                events.append({'t': t + k * step, 'kind': 'partial', 'text': partial})
+            # Azure finalizes after its segmentation silence
+            silence = rng.uniform(0.4, 0.7)
+            t += spoken + silence
+            events.append({'t': t, 'kind': 'final', 'text': text, 'silence': silence, 'turn': turn})
+            if i < len(segments) - 1:
+                t += rng.lognormvariate(0.0, 0.5)  # mid-question pause, median 1 s
+        t += rng.uniform(4.0, 12.0)  # candidate answers off-mic
+    return events
+
+
+def load_session(path, turn_gap):
+    with open(path, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e['t'])
+    turn, last_final = -1, None
+    for event in events:
+        if event['kind'] != 'final' or 'turn' in event:
+            continue
+        if last_final is None or event['t'] - last_final > turn_gap:
+            turn += 1
+        event['turn'] = turn
+        last_final = event['t']
+    return events
+
+
+def replay(events, policy):
+    """Run events through a policy; return the list of flushes as (time, finals)."""
+    flushes = []
+    buffer = []
+    deadline = None
+
+    def flush(at):
+        flushes.append((at, list(buffer)))
+        buffer.clear()
+        policy.on_flush(at)
+
+    for event in events:
+        now = event['t']
+        if deadline is not None and buffer and deadline <= now:
+            flush(deadline)
+            deadline = None
+        if event['kind'] == 'partial':
+            hold = policy.on_partial(now)
+            if hold is not None and buffer:
+                deadline = now + hold
+        else:
+            buffer.append(event)
+            text = " ".join(e['text'] for e in buffer)
+            deadline = now + policy.on_final(text, now, event.get('silence', 0.0))
+    if buffer:
+        flush(deadline)
+    return flushes
+
+
+def score(flushes):
+    """Latency after each question's last final, split and merge rates."""
+    flushes_per_turn = {}
+    last_final = {}
+    latencies = []
+    merged = 0
+    for at, finals in flushes:
+        turns = {e['turn'] for e in finals}
+        merged += len(turns) > 1
+        for e in finals:
+            flushes_per_turn.setdefault(e['turn'], set()).add(at)
+            last_final[e['turn']] = max(last_final.get(e['turn'], 0.0), e['t'])
+    for turn, times in flushes_per_turn.items():
+        latencies.append(max(times) - last_final[turn])
+    latencies.sort()
+    n = len(latencies)
+    return {
+        'questions': n,
+        'requests': len(flushes),
+        'mean_s': sum(latencies) / n if n else 0.0,
+        'p95_s': latencies[int(0.95 * (n - 1))] if n else 0.0,
+        'split_rate': sum(len(t) > 1 for t in flushes_per_turn.values()) / n if n else 0.0,
+        'merge_rate': merged / len(flushes) if flushes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sessions', nargs='*')
+    parser.add_argument('--turn-gap', type=float, default=4.0)
+    parser.add_argument('--turns', type=int, default=200, help="questions in the synthetic session")
+    args = parser.parse_args()
+
+    sessions = [(path, load_session(path, args.turn_gap)) for path in args.sessions]
+    if not sessions:
+        sessions = [('synthetic', synthetic_session(args.turns))]
+
+    policies = [
+        ('fixed 2.0s', lambda: FixedFlushPolicy(2.0)),
+        ('fixed 1.0s', lambda: FixedFlushPolicy(1.0)),
+        ('adaptive', lambda: AdaptiveFlushPolicy(min_wait=Config.BATCH_MIN_WAIT_MS / 1000,
+                                                 max_wait=Config.BATCH_MAX_WAIT_MS / 1000)),
+    ]
+    print(f"{'session':<20} {'policy':<12} {'questions':>9} {'requests':>9} {'mean wait':>10} "
+          f"{'p95 wait':>9} {'split':>7} {'merged':>7}")
+    for name, events in sessions:
+        for label, make in policies:
+            result = score(replay(events, make()))
+            print(f"{name[-20:]:<20} {label:<12} {result['questions']:>9} {result['requests']:>9} "
+                  f"{result['mean_s']:>9.2f}s {result['p95_s']:>8.2f}s {result['split_rate']:>7.1%} "
+                  f"{result['merge_rate']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
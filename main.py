@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QCursor
@@ -5,6 +6,8 @@ from PyQt6.QtCore import Qt
 from src.ui.main_window import MainWindow
 
 if __name__ == "__main__":
+    # The OCR process pool starts copies of the executable when frozen
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setOverrideCursor(QCursor(Qt.CursorShape.ArrowCursor))
     window = MainWindow()
@@ -15,6 +15,31 @@ env_path = os.path.join(base_path, '.env')
 # Load environment variables from exactly matching .env file
 load_dotenv(env_path)
 
+
+def _env_number(name, default, kind=float):
+    """``kind`` parsed from ``name``, or ``default`` (with a warning) when unset or malformed."""
+    raw = os.getenv(name, '')
+    if not raw.strip():
+        return default
+    try:
+        return kind(raw)
+    except ValueError:
+        print(f"Warning: ignoring {name}={raw!r}, expected a number; using {default}")
+        return default
+
+
+def _env_weights(name):
+    """Comma-separated floats from ``name``, or None (with a warning) when unset or malformed."""
+    raw = os.getenv(name, '')
+    if not raw.strip():
+        return None
+    try:
+        return [float(w) for w in raw.split(',')]
+    except ValueError:
+        print(f"Warning: ignoring {name}={raw!r}, expected comma-separated numbers; using the default downmix")
+        return None
+
+
 class Config:
     """Application configuration and environment variables."""
     
@@ -22,12 +47,103 @@ class Config:
     SPEECH_KEY_RAW = os.getenv('SPEECH_KEYS', '') or os.getenv('SPEECH_KEY', '')
     SPEECH_KEYS = [k.strip() for k in SPEECH_KEY_RAW.split(',')] if SPEECH_KEY_RAW else []
     SPEECH_REGION = os.getenv('SPEECH_REGION', '')
+    # Pre-connect recognizers and resolve the loopback device ahead of Alt+M
+    WARM_STANDBY = os.getenv('WARM_STANDBY', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Audio capture: optional per-channel downmix weights, e.g. "1,1,0.7,0,0.7,0.7" for 5.1
+    AUDIO_CHANNEL_WEIGHTS = _env_weights('AUDIO_CHANNEL_WEIGHTS')
+    
+    # Local voice-activity gate in front of the Azure push stream: energy, webrtc or off
+    VAD_MODE = os.getenv('VAD_MODE', 'energy')
+    VAD_THRESHOLD_DB = _env_number('VAD_THRESHOLD_DB', 9.0)
+    VAD_PREROLL_MS = _env_number('VAD_PREROLL_MS', 300, int)
+    VAD_HANGOVER_MS = _env_number('VAD_HANGOVER_MS', 800, int)
     
     # Google Gemini
     GEMINI_KEY_RAW = os.getenv('GEMINI_API_KEYS', '') or os.getenv('GEMINI_API_KEY', '') or os.getenv('GOOGLE_API_KEY', '')
     GEMINI_API_KEYS = [k.strip() for k in GEMINI_KEY_RAW.split(',')] if GEMINI_KEY_RAW else []
     GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-exp')
     SYSTEM_PROMPT = os.getenv('SYSTEM_PROMPT', '').replace('\\n', '\n')
+    # Alternative API endpoint, e.g. the local stand-in from python -m benchmarks.fake_gemini
+    GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')
+    # Stream answers on one asyncio loop; a newer question cancels the answer in flight
+    GEMINI_ASYNC = os.getenv('GEMINI_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+    GEMINI_MAX_CONCURRENT = _env_number('GEMINI_MAX_CONCURRENT', 2, int)
+    # Per-key quota used to spread load across GEMINI_API_KEYS before hitting 429s
+    GEMINI_KEY_RPM = _env_number('GEMINI_KEY_RPM', 15, int)
+    GEMINI_KEY_TPM = _env_number('GEMINI_KEY_TPM', 1000000, int)
+    # Requests per day per key (0 = not enforced) and where usage is kept across restarts
+    GEMINI_KEY_RPD = _env_number('GEMINI_KEY_RPD', 0, int)
+    GEMINI_USAGE_FILE = os.getenv('GEMINI_USAGE_FILE', '')
+    # Open each key's connection at startup so a switch after a 429 skips the handshake
+    GEMINI_WARM_CLIENTS = os.getenv('GEMINI_WARM_CLIENTS', 'true').lower() in ('1', 'true', 'yes')
+    # Re-send a request on a second key when its first chunk is this late (opt-in)
+    GEMINI_HEDGE = os.getenv('GEMINI_HEDGE', 'false').lower() in ('1', 'true', 'yes')
+    GEMINI_HEDGE_DELAY_MS = _env_number('GEMINI_HEDGE_DELAY_MS', 1500, int)
+    # Longest a request waits for a key to leave its cooldown before failing
+    GEMINI_MAX_KEY_WAIT_S = _env_number('GEMINI_MAX_KEY_WAIT_S', 20.0)
+    # Upload the system instruction once per key as cached content instead of sending it every request
+    GEMINI_PROMPT_CACHE = os.getenv('GEMINI_PROMPT_CACHE', 'false').lower() in ('1', 'true', 'yes')
+    GEMINI_PROMPT_CACHE_TTL_S = _env_number('GEMINI_PROMPT_CACHE_TTL_S', 3600, int)
+    # Shorter instructions are sent inline (the API rejects smaller caches)
+    GEMINI_PROMPT_CACHE_MIN_TOKENS = _env_number('GEMINI_PROMPT_CACHE_MIN_TOKENS', 1024, int)
+    # Route short/simple prompts to a fast model and complex ones or screenshots to the strong model
+    MODEL_ROUTING = os.getenv('MODEL_ROUTING', 'false').lower() in ('1', 'true', 'yes')
+    ROUTING_FAST_MODEL = os.getenv('ROUTING_FAST_MODEL', 'gemini-2.0-flash-lite')
+    # Empty: the model chosen in the settings tab
+    ROUTING_STRONG_MODEL = os.getenv('ROUTING_STRONG_MODEL', '')
+    ROUTING_FAST_MAX_WORDS = _env_number('ROUTING_FAST_MAX_WORDS', 12, int)
+    # Optional JSONL file with every routing decision and its latency
+    ROUTING_LOG = os.getenv('ROUTING_LOG', '')
+    # Screenshots: longest side in pixels (0 = full size), format auto/png/jpeg/webp and lossy settings.
+    # auto keeps text and UI captures as PNG and encodes photo-like ones with SCREENSHOT_LOSSY_FORMAT
+    SCREENSHOT_MAX_SIDE = _env_number('SCREENSHOT_MAX_SIDE', 2048, int)
+    SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'auto').lower()
+    SCREENSHOT_LOSSY_FORMAT = os.getenv('SCREENSHOT_LOSSY_FORMAT', 'jpeg').lower()
+    SCREENSHOT_QUALITY = _env_number('SCREENSHOT_QUALITY', 80, int)
+    # How our window is kept out of screenshots: auto (excluded from capture on Windows 10 2004+,
+    # otherwise hidden), exclude or hide. Hidden captures wait SCREENSHOT_HIDE_DELAY_MS on a Qt timer
+    SCREENSHOT_EXCLUDE = os.getenv('SCREENSHOT_EXCLUDE', 'auto').lower()
+    SCREENSHOT_HIDE_DELAY_MS = _env_number('SCREENSHOT_HIDE_DELAY_MS', 100, int)
+    # Skip screenshots of an unchanged screen and send only the changed region of a partly changed one
+    SCREENSHOT_DIFF = os.getenv('SCREENSHOT_DIFF', 'true').lower() in ('1', 'true', 'yes')
+    # Screen grabs: backend auto (mss when installed, else PIL), mss or pil; target screen (primary),
+    # monitor (SCREENSHOT_MONITOR, 0 = all), window (the focused one) or region (left,top,width,height;
+    # Alt+R draws one)
+    SCREENSHOT_BACKEND = os.getenv('SCREENSHOT_BACKEND', 'auto').lower()
+    SCREENSHOT_TARGET = os.getenv('SCREENSHOT_TARGET', 'screen').lower()
+    SCREENSHOT_MONITOR = _env_number('SCREENSHOT_MONITOR', 1, int)
+    SCREENSHOT_REGION = os.getenv('SCREENSHOT_REGION', '')
+    # Local OCR (tesseract, needs pytesseract and the Tesseract binary; off by default): text read at
+    # SCREENSHOT_OCR_MIN_CONFIDENCE or better is sent instead of the image, below it with a small thumbnail
+    SCREENSHOT_OCR = os.getenv('SCREENSHOT_OCR', 'off').lower()
+    SCREENSHOT_OCR_WORKERS = _env_number('SCREENSHOT_OCR_WORKERS', 2, int)
+    SCREENSHOT_OCR_MIN_CONFIDENCE = _env_number('SCREENSHOT_OCR_MIN_CONFIDENCE', 80.0)
+    SCREENSHOT_OCR_MIN_WORDS = _env_number('SCREENSHOT_OCR_MIN_WORDS', 5, int)
+    SCREENSHOT_OCR_THUMBNAIL_SIDE = _env_number('SCREENSHOT_OCR_THUMBNAIL_SIDE', 768, int)
+    # Chat context budget: older turns fold into a summary past this many tokens (0 = unbounded)
+    CONTEXT_MAX_TOKENS = _env_number('CONTEXT_MAX_TOKENS', 12000, int)
+    CONTEXT_KEEP_TURNS = _env_number('CONTEXT_KEEP_TURNS', 6, int)
+    # Replay earlier answers to repeated standalone questions (opt-in); SIMILARITY (0-1) also matches
+    # near-duplicates. Answers are kept in memory unless RESPONSE_CACHE_FILE names a file
+    RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'false').lower() in ('1', 'true', 'yes')
+    RESPONSE_CACHE_FILE = os.getenv('RESPONSE_CACHE_FILE', '')
+    RESPONSE_CACHE_MIN_WORDS = _env_number('RESPONSE_CACHE_MIN_WORDS', 4, int)
+    RESPONSE_CACHE_SIZE = _env_number('RESPONSE_CACHE_SIZE', 500, int)
+    RESPONSE_CACHE_SIMILARITY = _env_number('RESPONSE_CACHE_SIMILARITY', 0.0)
+    # Start answering from stable partial transcripts before Azure finalizes them
+    SPECULATIVE_ANSWERS = os.getenv('SPECULATIVE_ANSWERS', 'false').lower() in ('1', 'true', 'yes')
+    SPECULATION_STABLE_MS = _env_number('SPECULATION_STABLE_MS', 400, int)
+    SPECULATION_MIN_WORDS = _env_number('SPECULATION_MIN_WORDS', 3, int)
+    # Bounds on how long transcripts are held for more speech before sending
+    BATCH_MIN_WAIT_MS = _env_number('BATCH_MIN_WAIT_MS', 300, int)
+    BATCH_MAX_WAIT_MS = _env_number('BATCH_MAX_WAIT_MS', 3000, int)
+    # Optional JSONL file that records partial/final transcripts for the replay harness
+    TRANSCRIPT_LOG = os.getenv('TRANSCRIPT_LOG', '')
+    
+    # Latency tracing: JSONL span log and an in-app p50/p95 overlay (both off by default)
+    TRACE_LOG = os.getenv('TRACE_LOG', '')
+    LATENCY_HUD = os.getenv('LATENCY_HUD', 'false').lower() in ('1', 'true', 'yes')
     
     # App Settings
     APP_TITLE = "AI Assistant with Live Transcription"
@@ -1,20 +1,120 @@
 import threading
-import numpy as np
-import pyaudiowpatch as pyaudio
+import time
+from collections import deque
 import azure.cognitiveservices.speech as speechsdk
 from azure.cognitiveservices.speech.audio import AudioStreamFormat, PushAudioInputStream
 from src.config import Config
-from src.utils.helpers import resample_audio
+from src.core.converter import FrameConverter
+from src.core.pipeline import AudioPipeline
+from src.core.sources import LoopbackSource
+from src.core.vad import VoiceGate, create_vad
+from src.utils.tracing import tracer
 
 class AudioTranscriber:
     """Handles audio capture and Azure Speech transcription."""
     
-    def __init__(self, signals):
+    BYTES_PER_SECOND = 16000 * 2
+    # Upper bound on audio kept for replay into a new recognizer on rotation
+    REPLAY_LIMIT_BYTES = 30 * BYTES_PER_SECOND
+    
+    def __init__(self, signals, source_factory=LoopbackSource):
         self.signals = signals
+        self.source_factory = source_factory
         self.is_transcribing = False
         self.transcription_thread = None
         self.audio_stream = None
         self.speech_recognizer = None
+        self.pipeline = None
+        self.voice_gate = None
+        
+        # Warm standby: pre-connected recognizers keyed by (api_key, region)
+        # and a loopback source whose device is already resolved
+        self._standby = {}
+        self._standby_lock = threading.Lock()
+        self._standby_source = None
+        self.startup_metrics = None
+        # Silence already heard after the last final, used by the flush policy
+        self.trailing_silence_s = 0.0
+        # (trace id, perf_counter time speech ended) of the last final, for tracing
+        self.last_utterance = (0, 0.0)
+
+    @staticmethod
+    def _parse_keys(api_keys):
+        # Parse string if necessary, though it should be a list based on new Config
+        if isinstance(api_keys, str):
+            api_keys = [k.strip() for k in api_keys.split(',')]
+        return [k for k in api_keys if k]
+
+    def prepare(self, api_keys, region):
+        """Warm up for an instant start.
+        
+        Resolves the loopback device and pre-connects a recognizer for the
+        first key plus a failover recognizer for the second, in the
+        background. start() falls back to a cold start for anything that
+        is not ready yet.
+        """
+        api_keys = self._parse_keys(api_keys or [])
+        if not api_keys or not region or self.is_transcribing:
+            return False
+        
+        self.api_keys = api_keys
+        self.current_key_idx = 0
+        with self._standby_lock:
+            stale = [k for k in self._standby if k[0] not in api_keys or k[1] != region]
+            for k in stale:
+                audio_stream, _, connection = self._standby.pop(k)
+                connection.close()
+                audio_stream.close()
+        threading.Thread(target=self._prepare_worker, args=(api_keys, region), daemon=True).start()
+        return True
+
+    def _prepare_worker(self, api_keys, region):
+        if not self._standby_source:
+            try:
+                source = self.source_factory()
+                if hasattr(source, 'resolve_device'):
+                    source.resolve_device()
+                self._standby_source = source
+            except Exception as e:
+                print(f"Warm standby: could not resolve audio device: {e}")
+        
+        for key in api_keys[:2]:
+            self._prepare_standby(key, region)
+
+    def _prepare_standby(self, api_key, region):
+        """Build a recognizer for one key and open its service connection."""
+        with self._standby_lock:
+            if (api_key, region) in self._standby:
+                return
+        try:
+            audio_stream, recognizer = self._create_recognizer(api_key, region)
+            connection = self._open_connection(recognizer)
+        except Exception as e:
+            print(f"Warm standby: could not prepare recognizer: {e}")
+            return
+        with self._standby_lock:
+            self._standby[(api_key, region)] = (audio_stream, recognizer, connection)
+
+    def _open_connection(self, recognizer):
+        # Opens the service websocket (TLS + auth) ahead of the first audio
+        connection = speechsdk.Connection.from_recognizer(recognizer)
+        connection.open(True)
+        return connection
+
+    def _prepare_next_standby(self, region):
+        """Keep a failover recognizer ready for the key after the current one."""
+        if Config.WARM_STANDBY and len(self.api_keys) > 1:
+            next_key = self.api_keys[(self.current_key_idx + 1) % len(self.api_keys)]
+            threading.Thread(target=self._prepare_standby, args=(next_key, region), daemon=True).start()
+
+    def _take_recognizer(self, api_key, region):
+        """Return (audio_stream, recognizer, warm) for a key, preferring the standby."""
+        with self._standby_lock:
+            standby = self._standby.pop((api_key, region), None)
+        if standby:
+            return standby[0], standby[1], True
+        audio_stream, recognizer = self._create_recognizer(api_key, region)
+        return audio_stream, recognizer, False
 
     def start(self, api_keys, region):
         """Start transcription."""
@@ -22,17 +122,15 @@ class AudioTranscriber:
             self.signals.status_update.emit("Error: Set Azure API key and region in Settings")
             return False
 
-        # Parse string if necessary, though it should be a list based on new Config
-        if isinstance(api_keys, str):
-            api_keys = [k.strip() for k in api_keys.split(',')]
-            
-        self.api_keys = [k for k in api_keys if k]
+        self.api_keys = self._parse_keys(api_keys)
         if not self.api_keys:
              self.signals.status_update.emit("Error: No valid Azure API keys found")
              return False
              
         self.current_key_idx = 0
         self.switch_key_requested = False
+        self._start_time = time.perf_counter()
+        self._first_event_pending = True
 
         self.is_transcribing = True
         self.signals.status_update.emit("Status: Starting transcription...")
@@ -54,113 +152,269 @@ class AudioTranscriber:
             except:
                 pass
 
-    def _transcription_worker(self, region):
-        """Worker thread for audio capture and transcription."""
-        p = None
-        stream = None
+    def metrics(self):
+        """Return audio pipeline counters, or None when not capturing."""
+        if not self.pipeline:
+            return None
+        metrics = self.pipeline.metrics()
+        if self.voice_gate:
+            metrics['vad'] = self.voice_gate.stats()
+        if self.startup_metrics:
+            metrics['startup'] = dict(self.startup_metrics)
+        return metrics
+
+    def _create_converter(self, device_channels, device_rate, chunk):
+        """Build the convert stage: downmix, resample to 16 kHz, then VAD gate."""
+        try:
+            converter = FrameConverter(device_channels, device_rate, 16000, weights=Config.AUDIO_CHANNEL_WEIGHTS, max_frames=chunk)
+        except ValueError as e:
+            self.signals.status_update.emit(f"Warning: {str(e)}, using default downmix")
+            converter = FrameConverter(device_channels, device_rate, 16000, max_frames=chunk)
+        
+        detector = create_vad(Config.VAD_MODE, 16000, threshold_db=Config.VAD_THRESHOLD_DB)
+        if not detector:
+            self.voice_gate = None
+            return lambda samples: converter.convert(samples).tobytes()
+        
+        self.voice_gate = VoiceGate(detector, preroll_ms=Config.VAD_PREROLL_MS, hangover_ms=Config.VAD_HANGOVER_MS)
+        return lambda samples: self.voice_gate.process(converter.convert(samples))
+
+    def _on_pipeline_error(self, stage, error):
+        self.signals.status_update.emit(f"Audio {stage} error: {str(error)}")
+        self.is_transcribing = False
+
+    def _create_recognizer(self, api_key, region):
+        """Build a push stream and recognizer for one key, without starting it."""
+        speech_config = speechsdk.SpeechConfig(subscription=api_key, region=region)
+        speech_config.speech_recognition_language = "en-US"
         
-        while self.is_transcribing:
-            self.switch_key_requested = False
-            current_api_key = self.api_keys[self.current_key_idx]
+        audio_format = AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
+        audio_stream = PushAudioInputStream(stream_format=audio_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
+        
+        recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
+        
+        def recognizing_cb(evt):
+            if recognizer is self.speech_recognizer:
+                self._note_first_event()
+                if evt.result.text:
+                    self.signals.transcription_update.emit(f"💬 {evt.result.text}")
+        
+        def recognized_cb(evt):
+            # A retired recognizer's late finals cover audio the new one is replaying
+            if recognizer is not self.speech_recognizer:
+                return
+            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
+                self._note_trailing_silence(evt.result.offset + evt.result.duration)
+                if tracer.enabled:
+                    self._trace_recognized(evt.result)
+                self.signals.transcription_update.emit(f"✅ {evt.result.text}")
+            self._note_first_event()
+            self._mark_recognized(evt.result.offset + evt.result.duration)
+        
+        def canceled_cb(evt):
+            # Late events from a recognizer we already rotated away from
+            if recognizer is not self.speech_recognizer:
+                return
             
-            try:
-                speech_config = speechsdk.SpeechConfig(subscription=current_api_key, region=region)
-                speech_config.speech_recognition_language = "en-US"
-                
-                audio_format = AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
-                self.audio_stream = PushAudioInputStream(stream_format=audio_format)
-                audio_config = speechsdk.audio.AudioConfig(stream=self.audio_stream)
-                
-                self.speech_recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
+            error_msg = f"Recognition canceled: {evt.result.cancellation_details.reason}"
+            if evt.result.cancellation_details.error_details:
+                error_details = evt.result.cancellation_details.error_details.lower()
+                error_msg += f" - {evt.result.cancellation_details.error_details}"
                 
-                def recognized_cb(evt):
-                    if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                        self.signals.transcription_update.emit(f"✅ {evt.result.text}")
-                
-                def canceled_cb(evt):
-                    error_msg = f"Recognition canceled: {evt.result.cancellation_details.reason}"
-                    if evt.result.cancellation_details.error_details:
-                        error_details = evt.result.cancellation_details.error_details.lower()
-                        error_msg += f" - {evt.result.cancellation_details.error_details}"
+                if "429" in error_details or "quota" in error_details or "too many requests" in error_details:
+                    if len(self.api_keys) > 1:
+                        self.switch_key_requested = True
+                        self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
+                        self.signals.status_update.emit(f"Azure Rate Limit. Rotating to Key #{self.current_key_idx + 1}...")
+                        return # Don't stop transcribing overall, just fall through
                         
-                        if "429" in error_details or "quota" in error_details or "too many requests" in error_details:
-                            if len(self.api_keys) > 1:
-                                self.switch_key_requested = True
-                                self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
-                                self.signals.status_update.emit(f"Azure Rate Limit. Rotating to Key #{self.current_key_idx + 1}...")
-                                return # Don't stop transcribing overall, just fall through
-                                
-                    self.signals.status_update.emit(f"Error: {error_msg}")
-                    if not self.switch_key_requested:
-                        self.is_transcribing = False
-                
-                self.speech_recognizer.recognized.connect(recognized_cb)
-                self.speech_recognizer.canceled.connect(canceled_cb)
-                
-                self.speech_recognizer.start_continuous_recognition()
-            except Exception as e:
-                self.signals.status_update.emit(f"Azure initialization error: {str(e)}")
+            self.signals.status_update.emit(f"Error: {error_msg}")
+            if not self.switch_key_requested:
                 self.is_transcribing = False
-                break
-            
-            p = pyaudio.PyAudio()
-            wasapi_info = p.get_host_api_info_by_type(pyaudio.paWASAPI)
-            default_speakers = p.get_device_info_by_index(wasapi_info["defaultOutputDevice"])
-            
-            loopback_device = None
-            if default_speakers.get("isLoopbackDevice"):
-                loopback_device = default_speakers
-            else:
-                for loopback in p.get_loopback_device_info_generator():
-                    if default_speakers["name"] in loopback["name"]:
-                        loopback_device = loopback
-                        break
-            
-            if not loopback_device:
-                self.signals.status_update.emit("Error: No loopback device found")
-                return
-            
-            device_channels = loopback_device["maxInputChannels"]
-            device_rate = int(loopback_device["defaultSampleRate"])
-            
-            CHUNK = 1024
-            stream = p.open(
-                format=pyaudio.paInt16,
-                channels=device_channels,
-                rate=device_rate,
-                input=True,
-                frames_per_buffer=CHUNK,
-                input_device_index=loopback_device["index"]
-            )
-            
-            self.signals.status_update.emit("Status: Recording and transcribing...")
-            
-            while self.is_transcribing and not self.switch_key_requested:
-                try:
-                    data = stream.read(CHUNK, exception_on_overflow=False)
-                    audio_data = np.frombuffer(data, dtype=np.int16)
-                    
-                    if device_channels == 2:
-                        audio_data = audio_data.reshape(-1, 2).mean(axis=1).astype(np.int16)
-                    
-                    if device_rate != 16000:
-                        audio_data = resample_audio(audio_data, device_rate, 16000)
-                    
-                    self.audio_stream.write(audio_data.tobytes())
-                    
-                except Exception as e:
-                    pass
-                    
-            # Cleanup for inner loop (rebuilding streams if rotated)
+        
+        recognizer.recognizing.connect(recognizing_cb)
+        recognizer.recognized.connect(recognized_cb)
+        recognizer.canceled.connect(canceled_cb)
+        return audio_stream, recognizer
+
+    def _note_first_event(self):
+        """Record time from start() to the first recognition event."""
+        if not self._first_event_pending:
+            return
+        self._first_event_pending = False
+        now = time.perf_counter()
+        self.startup_metrics['first_event_s'] = now - self._start_time
+        # Runs on an SDK callback thread: leave reporting to the tracer and startup_metrics
+        tracer.record('first_event', self._start_time, now,
+                      start="warm" if self.startup_metrics['warm_recognizer'] else "cold")
+
+    def _note_trailing_silence(self, end_ticks):
+        """Record how much audio Azure received after the speech it just finalized."""
+        pushed = getattr(self, '_stream_bytes', 0) / self.BYTES_PER_SECOND
+        self.trailing_silence_s = max(0.0, pushed - end_ticks / 10_000_000)
+
+    def _trace_recognized(self, result):
+        """Record an 'stt' span from the end of speech to the final result."""
+        now = tracer.now()
+        speech_end = now - self.trailing_silence_s
+        trace = tracer.new_trace()
+        self.last_utterance = (trace, speech_end)
+        tracer.record('stt', speech_end, now, trace=trace,
+                      speech_s=result.duration / 10_000_000, chars=len(result.text))
+
+    def _push_audio(self, payload):
+        """Push stage: write to the live stream, or hold audio during a rotation."""
+        with self._push_lock:
+            self._unrecognized.append((self._stream_bytes, payload))
+            self._stream_bytes += len(payload)
+            while self._stream_bytes - self._unrecognized[0][0] > self.REPLAY_LIMIT_BYTES:
+                self._unrecognized.popleft()
+            if not self._holding:
+                self.audio_stream.write(payload)
+
+    def _mark_recognized(self, end_ticks):
+        """Forget pushed audio that a final result has already covered."""
+        end_byte = end_ticks * self.BYTES_PER_SECOND // 10_000_000
+        with self._push_lock:
+            while self._unrecognized and self._unrecognized[0][0] + len(self._unrecognized[0][1]) <= end_byte:
+                self._unrecognized.popleft()
+
+    def _rotate_recognizer(self, region):
+        """Switch to the next key while capture keeps running.
+        
+        Audio is held while the new recognizer connects. Everything the old
+        recognizer received but never finalized, plus the held audio, is
+        then replayed into the new push stream, so no speech is lost.
+        """
+        self.switch_key_requested = False
+        with self._push_lock:
+            self._holding = True
+        old_stream, old_recognizer = self.audio_stream, self.speech_recognizer
+        
+        try:
+            new_stream, new_recognizer, _ = self._take_recognizer(self.api_keys[self.current_key_idx], region)
+            new_recognizer.start_continuous_recognition()
+        except Exception as e:
+            self.signals.status_update.emit(f"Azure initialization error: {str(e)}")
+            self.is_transcribing = False
+            return
+        
+        with self._push_lock:
+            replay = [payload for _, payload in self._unrecognized]
+            self._unrecognized.clear()
+            self._stream_bytes = 0
+            for payload in replay:
+                new_stream.write(payload)
+                self._unrecognized.append((self._stream_bytes, payload))
+                self._stream_bytes += len(payload)
+            self.audio_stream, self.speech_recognizer = new_stream, new_recognizer
+            self._holding = False
+        
+        self.rotations += 1
+        self.signals.status_update.emit(f"Status: Rotated to Azure Key #{self.current_key_idx + 1}, replayed {self._stream_bytes / self.BYTES_PER_SECOND:.1f}s of audio")
+        
+        self._prepare_next_standby(region)
+        
+        try:
+            old_recognizer.stop_continuous_recognition_async()
+            old_stream.close()
+        except:
+            pass
+
+    def _open_source(self, standby=None):
+        """Open the standby source, or a fresh one if there is none or it fails.
+
+        The standby device was resolved when the app started; if the default
+        output device changed since, opening it fails and a new source is
+        resolved instead.
+        """
+        if standby is not None:
             try:
-                if stream:
-                    stream.stop_stream()
-                    stream.close()
-                if p:
-                    p.terminate()
-                if self.audio_stream:
-                    self.audio_stream.close()
-                if self.speech_recognizer:
-                    self.speech_recognizer.stop_continuous_recognition()
-            except:
-                pass
+                standby.open()
+                return standby
+            except Exception as e:
+                standby.close()
+                print(f"Warm standby: audio device unavailable, resolving it again: {e}")
+        source = self.source_factory()
+        try:
+            source.open()
+        except Exception:
+            source.close()
+            raise
+        return source
+
+    def _transcription_worker(self, region):
+        """Worker thread for audio capture and transcription."""
+        self._push_lock = threading.Lock()
+        self._unrecognized = deque()
+        self._stream_bytes = 0
+        self._holding = False
+        self.rotations = 0
+        
+        source, self._standby_source = self._standby_source, None
+        try:
+            self.audio_stream, self.speech_recognizer, warm = self._take_recognizer(self.api_keys[self.current_key_idx], region)
+            self.startup_metrics = {
+                'warm_recognizer': warm,
+                'warm_device': source is not None,
+                'first_event_s': None,
+            }
+            self.speech_recognizer.start_continuous_recognition()
+        except Exception as e:
+            self.signals.status_update.emit(f"Azure initialization error: {str(e)}")
+            self.is_transcribing = False
+            return
+        
+        self._prepare_next_standby(region)
+        try:
+            source = self._open_source(source)
+        except Exception as e:
+            self.signals.status_update.emit(f"Error: {str(e)}")
+            self.is_transcribing = False
+            self.speech_recognizer.stop_continuous_recognition()
+            return
+        
+        CHUNK = 1024
+        self.signals.status_update.emit("Status: Recording and transcribing...")
+        
+        # Capture stays open for the whole session, including key rotations
+        self.pipeline = AudioPipeline(
+            read_fn=lambda: source.read(CHUNK),
+            convert_fn=self._create_converter(source.channels, source.rate, CHUNK),
+            push_fn=self._push_audio,
+            channels=source.channels,
+            rate=source.rate,
+            frames_per_chunk=CHUNK,
+            on_error=self._on_pipeline_error,
+            lossless=not source.realtime,
+            tracer=tracer if tracer.enabled else None
+        )
+        self.pipeline.start()
+        
+        reported_drops = 0
+        while self.is_transcribing and self.pipeline.running:
+            time.sleep(0.1)
+            if self.switch_key_requested:
+                self._rotate_recognizer(region)
+            if self.pipeline.source_finished:
+                self.is_transcribing = False
+            dropped = self.pipeline.metrics()['dropped_frames']
+            if dropped - reported_drops >= source.rate:
+                reported_drops = dropped
+                self.signals.status_update.emit(f"Warning: audio pipeline behind, {dropped / source.rate:.1f}s dropped")
+        
+        self.pipeline.stop()
+        source.close()
+        
+        try:
+            if self.audio_stream:
+                self.audio_stream.close()
+            if self.speech_recognizer:
+                self.speech_recognizer.stop_continuous_recognition()
+        except:
+            pass
+        
+        # Get ready for the next Alt+M
+        if Config.WARM_STANDBY:
+            self.prepare(self.api_keys, region)
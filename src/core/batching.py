@@ -0,0 +1,109 @@
+import re
+
+from src.core.speculation import looks_like_question
+
+# Words a speaker rarely ends a question on; a final ending in one is
+# almost always followed by more of the same sentence.
+CONTINUATION_WORDS = {
+    'and', 'but', 'or', 'so', 'because', 'if', 'then', 'like', 'that', 'which',
+    'the', 'a', 'an', 'to', 'of', 'for', 'with', 'in', 'on', 'about', 'as',
+    'um', 'uh', 'er', 'basically', 'actually', 'also',
+}
+
+
+class FixedFlushPolicy:
+    """The original behaviour: flush a fixed time after the last final."""
+
+    def __init__(self, wait=2.0):
+        self.wait = wait
+        self.max_wait = wait
+
+    def on_final(self, text, now, trailing_silence=0.0):
+        return self.wait
+
+    def on_partial(self, now):
+        return None
+
+    def on_flush(self, now):
+        pass
+
+
+class AdaptiveFlushPolicy:
+    """Decide how long to wait for more speech before sending a transcript.
+
+    ``on_final`` is called with the buffered text after each Azure final and
+    returns the wait in seconds. A question mark or a question-like last
+    sentence flushes almost at once, a sentence ending on a continuation
+    word waits the longest, and plain statements sit in between. The wait
+    for anything that is not clearly a finished question is raised to cover
+    the pauses this speaker has been seen to take mid-question, and the
+    silence Azure already waited through before finalizing is subtracted.
+
+    ``on_partial`` is called when new speech is recognized while a flush is
+    pending and returns the wait that holds the batch open until the next
+    final arrives. The first partial after a final also measures how long
+    the speaker paused.
+    """
+
+    def __init__(self, min_wait=0.3, max_wait=3.0, question_wait=0.3, statement_wait=1.2,
+                 gap_margin=0.25, history=20):
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.question_wait = question_wait
+        self.statement_wait = statement_wait
+        self.gap_margin = gap_margin
+        self.history = history
+        self.gaps = []
+        self._last_final_at = None
+        self._resumed = False
+        self._pending = False
+
+    def classify(self, text):
+        """Return 'question', 'open' or 'statement' for the buffered text."""
+        stripped = text.rstrip()
+        if stripped.endswith('?'):
+            return 'question'
+        words = re.findall(r"[\w']+", stripped.lower())
+        if not words or stripped.endswith((',', '-', '...')) or words[-1] in CONTINUATION_WORDS:
+            return 'open'
+        last_sentence = re.split(r'[.!?]\s+', stripped)[-1]
+        if looks_like_question(last_sentence):
+            return 'question'
+        return 'statement'
+
+    def pause_guard(self):
+        """Typical mid-question pause for this speaker, plus a margin."""
+        if len(self.gaps) < 3:
+            return 0.0
+        ordered = sorted(self.gaps)
+        return ordered[int(0.8 * (len(ordered) - 1))] + self.gap_margin
+
+    def on_final(self, text, now, trailing_silence=0.0):
+        self._last_final_at = now
+        self._resumed = False
+        self._pending = True
+
+        kind = self.classify(text)
+        if kind == 'question':
+            wait = self.question_wait - trailing_silence
+        elif kind == 'open':
+            wait = self.max_wait
+        else:
+            # Pauses are measured from the final, so the guard is not reduced
+            # by the silence Azure waited through before sending it
+            wait = max(self.statement_wait - trailing_silence, self.pause_guard())
+        return min(self.max_wait, max(self.min_wait, wait))
+
+    def on_partial(self, now):
+        if not self._resumed and self._last_final_at is not None:
+            # Speech resumed soon after a final: that silence was a pause
+            # within one question, whether or not the batch was already sent
+            self._resumed = True
+            gap = now - self._last_final_at
+            if gap < self.max_wait:
+                self.gaps.append(gap)
+                del self.gaps[:-self.history]
+        return self.max_wait if self._pending else None
+
+    def on_flush(self, now):
+        self._pending = False
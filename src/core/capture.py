@@ -0,0 +1,174 @@
+import subprocess
+import sys
+import threading
+
+from PIL import Image, ImageGrab
+
+TARGETS = ('screen', 'monitor', 'window', 'region')
+
+
+def parse_region(text):
+    """Parse a SCREENSHOT_REGION setting, "left,top,width,height", into a (left, top, right, bottom) box."""
+    if not text or not text.strip():
+        return None
+    try:
+        left, top, width, height = (int(v) for v in text.replace(' ', '').split(','))
+    except ValueError:
+        raise ValueError(f"Screenshot region must be left,top,width,height: {text!r}")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Screenshot region needs a positive size: {text!r}")
+    return (left, top, left + width, top + height)
+
+
+def clamp_box(box, bounds):
+    """``box`` cut down to ``bounds`` (both (left, top, right, bottom)), or None when they don't overlap."""
+    left, top = max(box[0], bounds[0]), max(box[1], bounds[1])
+    right, bottom = min(box[2], bounds[2]), min(box[3], bounds[3])
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right, bottom)
+
+
+def active_window_box(exclude=()):
+    """Screen box of the focused window, or None when it is unknown or one of the ``exclude`` window ids."""
+    try:
+        if sys.platform == 'win32':
+            return _active_window_box_win32(exclude)
+        if sys.platform.startswith('linux'):
+            return _active_window_box_x11(exclude)
+    except Exception as e:
+        print(f"Active window lookup failed: {e}")
+    return None
+
+
+def _active_window_box_win32(exclude):
+    import ctypes
+    from ctypes import wintypes
+
+    hwnd = ctypes.windll.user32.GetForegroundWindow()
+    if not hwnd or hwnd in exclude:
+        return None
+    rect = wintypes.RECT()
+    # DWMWA_EXTENDED_FRAME_BOUNDS: the visible frame, without the invisible resize borders
+    if ctypes.windll.dwmapi.DwmGetWindowAttribute(hwnd, 9, ctypes.byref(rect), ctypes.sizeof(rect)) != 0:
+        ctypes.windll.user32.GetWindowRect(hwnd, ctypes.byref(rect))
+    return (rect.left, rect.top, rect.right, rect.bottom)
+
+
+def _active_window_box_x11(exclude):
+    output = subprocess.run(['xdotool', 'getactivewindow', 'getwindowgeometry', '--shell'],
+                            capture_output=True, text=True, timeout=1, check=True).stdout
+    values = dict(line.split('=', 1) for line in output.splitlines() if '=' in line)
+    if int(values['WINDOW']) in exclude:
+        return None
+    left, top = int(values['X']), int(values['Y'])
+    return (left, top, left + int(values['WIDTH']), top + int(values['HEIGHT']))
+
+
+class PILCapture:
+    """Screen grabs with Pillow's ImageGrab, a new image per grab."""
+
+    name = 'pil'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def monitors(self):
+        # ImageGrab doesn't enumerate monitors
+        return []
+
+    def grab(self, box=None):
+        if box is None:
+            return ImageGrab.grab()
+        return ImageGrab.grab(bbox=box, all_screens=True)
+
+
+class MSSCapture:
+    """Screen grabs with mss, reusing one image buffer between grabs.
+
+    mss keeps its capture buffers between calls (a DIB section on Windows,
+    shared memory on X11) and the pixels are converted into the same PIL
+    image each time its size is unchanged, so a grab allocates nothing.
+    The returned image is only valid until the next grab: hold ``lock``
+    while grabbing and using it.
+    """
+
+    name = 'mss'
+
+    def __init__(self):
+        import mss
+        # mss 10 renamed the factory and made the object safe to use from any thread
+        self._sct = mss.MSS() if hasattr(mss, 'MSS') else mss.mss()
+        self._image = None
+        self.lock = threading.Lock()
+
+    def monitors(self):
+        """(left, top, right, bottom) of the whole desktop, then of each monitor."""
+        return [(m['left'], m['top'], m['left'] + m['width'], m['top'] + m['height'])
+                for m in self._sct.monitors]
+
+    def grab(self, box=None):
+        shot = self._sct.grab(box or self.monitors()[1])
+        if self._image is None or self._image.size != shot.size:
+            self._image = Image.new('RGB', shot.size)
+        self._image.frombytes(shot.raw, 'raw', 'BGRX')
+        return self._image
+
+    def close(self):
+        self._sct.close()
+
+
+def create_capture(backend='auto'):
+    """Build the capture backend for a SCREENSHOT_BACKEND setting."""
+    backend = (backend or 'auto').lower()
+    if backend in ('auto', 'mss'):
+        try:
+            return MSSCapture()
+        except ImportError:
+            if backend == 'mss':
+                print("mss is not installed, falling back to PIL screen grabs")
+        except Exception as e:
+            print(f"mss capture unavailable, falling back to PIL screen grabs: {e}")
+    return PILCapture()
+
+
+class ScreenCapture:
+    """What a screenshot covers: the primary screen, a monitor, the active window or a region.
+
+    ``target`` is 'screen' (the primary monitor, as before), 'monitor'
+    (``monitor``, where 0 is the whole desktop), 'window' (the focused
+    window when the hotkey fired) or 'region' (``region``, a box drawn by
+    the user or set in the config). Targets that can't be resolved fall
+    back to the primary screen. Boxes are in physical pixels of the
+    virtual desktop.
+    """
+
+    def __init__(self, backend, target='screen', monitor=1, region=None):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown screenshot target: {target}")
+        self.backend = backend
+        self.target = target
+        self.monitor = monitor
+        self.region = region
+
+    def resolve(self, window_box=None):
+        """Box to grab for the current target (None for the primary screen)."""
+        monitors = self.backend.monitors()
+        box = None
+        if self.target == 'monitor':
+            if 0 <= self.monitor < len(monitors):
+                return monitors[self.monitor]
+            if monitors:
+                print(f"Monitor {self.monitor} not found, capturing the primary screen")
+        elif self.target == 'window':
+            box = window_box
+        elif self.target == 'region':
+            box = self.region
+        if box is not None and monitors:
+            box = clamp_box(box, monitors[0])
+        return box
+
+    def grab(self, window_box=None):
+        """Grab the target; returns the image and the box it covers. Hold ``backend.lock`` while using the image."""
+        box = self.resolve(window_box)
+        return self.backend.grab(box), box
@@ -0,0 +1,150 @@
+import re
+
+from google.genai import types
+
+SUMMARY_PREFIX = "Summary of the conversation so far:"
+SUMMARY_ACK = "Understood, I'll keep that context in mind."
+SCREENSHOT_PLACEHOLDER = "[Screenshot shared earlier; the answer below describes it]"
+
+
+def part_tokens(part, image_tokens):
+    """Rough input tokens for one content part."""
+    if getattr(part, 'inline_data', None) is not None or getattr(part, 'file_data', None) is not None:
+        return image_tokens
+    return len(getattr(part, 'text', None) or "") // 4
+
+
+def content_text(content):
+    return " ".join(part.text for part in content.parts or [] if getattr(part, 'text', None))
+
+
+def split_turns(history):
+    """Group a chat history into turns: a user content and the model replies after it."""
+    turns = []
+    for content in history:
+        if content.role == 'user' or not turns:
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+def _first_sentences(text, limit):
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind("? "), cut.rfind("! "))
+    return cut[:end + 1] if end > limit // 3 else cut.rstrip() + "..."
+
+
+def extractive_summary(previous, turns, question_chars=200, answer_chars=300):
+    """Append one line per folded turn: the question and the start of its answer."""
+    lines = [previous] if previous else []
+    for turn in turns:
+        question = _first_sentences(content_text(turn[0]), question_chars) or "(no text)"
+        answer = _first_sentences(" ".join(content_text(c) for c in turn[1:]), answer_chars)
+        lines.append(f"- Q: {question}\n  A: {answer}")
+    return "\n".join(lines)
+
+
+class ContextManager:
+    """Keep the chat history under a token budget.
+
+    ``compact`` takes a chat history and returns a smaller one: screenshots
+    that have been answered are replaced by a short text marker (the answer
+    that follows already describes them), the last ``keep_turns`` turns stay
+    verbatim, and older turns are folded into a running summary carried as
+    the first exchange of the chat. If the result is still over
+    ``max_tokens``, more turns are folded, down to ``min_turns``, and the
+    summary is trimmed from its oldest lines.
+
+    ``summarize(previous, turns)`` builds the new summary text; the default
+    is a local extractive summary, so compaction never calls the API.
+    """
+
+    def __init__(self, max_tokens=12000, keep_turns=6, min_turns=2, summary_tokens=1500,
+                 keep_images=0, image_tokens=258, summarize=extractive_summary):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.min_turns = min_turns
+        self.summary_tokens = summary_tokens
+        self.keep_images = keep_images
+        self.image_tokens = image_tokens
+        self.summarize = summarize
+        self.folded_turns = 0
+        self.images_replaced = 0
+
+    def tokens(self, history):
+        return sum(part_tokens(part, self.image_tokens) for content in history for part in content.parts or [])
+
+    @staticmethod
+    def _is_summary(turn):
+        return content_text(turn[0]).startswith(SUMMARY_PREFIX)
+
+    def compact(self, history):
+        """Return a history within budget, or ``history`` itself if nothing changed."""
+        turns = split_turns(history)
+        summary = ""
+        if turns and self._is_summary(turns[0]):
+            summary = content_text(turns[0][0])[len(SUMMARY_PREFIX):].strip()
+            turns = turns[1:]
+
+        changed = False
+        answered = len(turns) - self.keep_images
+        for i, turn in enumerate(turns[:max(answered, 0)]):
+            if len(turn) > 1 and any(getattr(p, 'inline_data', None) is not None for p in turn[0].parts or []):
+                turns[i] = [self._without_images(turn[0])] + turn[1:]
+                changed = True
+
+        keep = min(len(turns), self.keep_turns)
+        while keep > self.min_turns and self._size(summary or keep < len(turns), turns[-keep:]) > self.max_tokens:
+            keep -= 1
+        folded = turns[:len(turns) - keep]
+        if folded:
+            summary = self.summarize(summary, folded)
+            self.folded_turns += len(folded)
+            turns = turns[len(folded):]
+            changed = True
+        trimmed = self._trim(summary)
+        if trimmed != summary:
+            summary = trimmed
+            changed = True
+
+        if not changed:
+            return history
+        compacted = self._summary_turn(summary) if summary else []
+        for turn in turns:
+            compacted.extend(turn)
+        return compacted
+
+    def _without_images(self, content):
+        parts = []
+        for part in content.parts or []:
+            if getattr(part, 'inline_data', None) is not None:
+                self.images_replaced += 1
+                parts.append(types.Part.from_text(text=SCREENSHOT_PLACEHOLDER))
+            else:
+                parts.append(part)
+        return types.Content(role=content.role, parts=parts)
+
+    def _size(self, with_summary, turns):
+        # A summary may grow up to its own budget once turns are folded into it
+        return (self.summary_tokens if with_summary else 0) + sum(self.tokens(turn) for turn in turns)
+
+    def _trim(self, summary):
+        """Drop the oldest summary lines until it fits its share of the budget."""
+        limit = 4 * self.summary_tokens
+        if len(summary) <= limit:
+            return summary
+        entries = re.split(r"\n(?=- Q: )", summary)
+        while len(entries) > 1 and len("\n".join(entries)) > limit:
+            entries.pop(0)
+        return "\n".join(entries)[-limit:]
+
+    @staticmethod
+    def _summary_turn(summary):
+        return [
+            types.Content(role='user', parts=[types.Part.from_text(text=f"{SUMMARY_PREFIX}\n{summary}")]),
+            types.Content(role='model', parts=[types.Part.from_text(text=SUMMARY_ACK)]),
+        ]
@@ -0,0 +1,77 @@
+import numpy as np
+
+from src.core.resampler import StreamingResampler
+
+# ITU-R BS.775 style fold-down for the common WASAPI surround layouts
+# (FL, FR, FC, LFE, BL, BR[, SL, SR]); the LFE channel carries no speech.
+SURROUND_WEIGHTS = {
+    6: (1.0, 1.0, 0.707, 0.0, 0.707, 0.707),
+    8: (1.0, 1.0, 0.707, 0.0, 0.707, 0.707, 0.707, 0.707),
+}
+
+
+def downmix_weights(channels, weights=None):
+    """Return normalized float32 downmix weights for a channel count."""
+    if weights is None:
+        weights = SURROUND_WEIGHTS.get(channels, (1.0,) * channels)
+    weights = np.asarray(weights, dtype=np.float32)
+    if weights.shape != (channels,):
+        raise ValueError(f"Expected {channels} channel weights, got {len(weights)}")
+    total = np.abs(weights).sum()
+    if total == 0:
+        raise ValueError("Channel weights must not all be zero")
+    return weights / total
+
+
+class FrameConverter:
+    """Convert interleaved int16 device frames to mono int16 at the target rate.
+
+    Handles any channel count. Every stage writes into buffers allocated up
+    front (non-integer rate ratios still gather one window matrix per chunk
+    inside the resampler), and samples are rounded and clipped before the
+    int16 cast.
+    """
+
+    def __init__(self, channels, orig_rate, target_rate=16000, weights=None, max_frames=1024):
+        self.channels = int(channels)
+        self.weights = downmix_weights(self.channels, weights)
+        self.resampler = None
+        if int(orig_rate) != int(target_rate):
+            self.resampler = StreamingResampler(orig_rate, target_rate, max_chunk=max_frames)
+        self._allocate(max_frames)
+
+    def _allocate(self, max_frames):
+        self.max_frames = int(max_frames)
+        out_size = self.resampler.output_size(self.max_frames) if self.resampler else self.max_frames
+        self._frames = np.empty((self.max_frames, self.channels), dtype=np.float32)
+        self._mono = np.empty(self.max_frames, dtype=np.float32)
+        self._resampled = np.empty(out_size, dtype=np.float32)
+        self._output = np.empty(out_size, dtype=np.int16)
+
+    def reset(self):
+        if self.resampler:
+            self.resampler.reset()
+
+    def convert(self, samples):
+        """Convert one chunk of interleaved int16 samples.
+
+        Returns a view into an internal int16 buffer that is overwritten by
+        the next call.
+        """
+        n = len(samples) // self.channels
+        if n > self.max_frames:
+            self._allocate(n)
+
+        frames = self._frames[:n]
+        np.copyto(frames, samples[:n * self.channels].reshape(n, self.channels), casting='unsafe')
+        mono = self._mono[:n]
+        np.matmul(frames, self.weights, out=mono)
+
+        if self.resampler:
+            mono = self.resampler.process(mono, out=self._resampled)
+
+        np.rint(mono, out=mono)
+        np.clip(mono, -32768, 32767, out=mono)
+        output = self._output[:len(mono)]
+        np.copyto(output, mono, casting='unsafe')
+        return output
@@ -1,44 +1,201 @@
+import hashlib
 import os
+import threading
+import time
 from google import genai
 from google.genai import types
 from src.config import Config
+from src.core.context import ContextManager
+from src.core.key_pool import KeyPool, is_rate_limit
+from src.core.prompt_cache import PromptCache, is_cache_miss
+from src.core.response_cache import ResponseCache
+from src.core.routing import ModelRouter
+from src.core.speculation import normalize_text
+from src.core.usage import UsageTracker, usage_from
+from src.utils.tracing import tracer
+
+class CachedChunk:
+    """A replayed piece of a cached answer, shaped like a streamed chunk."""
+
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
 
 class GeminiClient:
     """Client for interacting with Google Gemini API."""
     
+    SCREENSHOT_PROMPT = "What do you see in this screenshot? Please describe it and provide any relevant insights or help."
+    REGION_PROMPT = ("This is the region {box} of a {width}x{height} screen that changed since the previous screenshot "
+                     "in this conversation; the rest of the screen is unchanged. What changed? Please describe it and "
+                     "provide any relevant insights or help.")
+    OCR_PROMPT = ("Here is the text of {source}, read by OCR with its layout kept (it may contain recognition "
+                  "errors){attachment}:\n\n{text}\n\nPlease describe it and provide any relevant insights or help.")
+    OCR_THUMBNAIL_NOTE = "; a downscaled copy of the image is attached"
     FIXED_SYSTEM_PROMPT = """You are a helpful AI assistant integrated into a desktop application. You help users with transcribed audio, screenshots, and general queries. Always provide concise, accurate, and helpful responses."""
+    # Rough input cost of one image part, used before the real usage is known
+    IMAGE_TOKENS = 258
 
     def __init__(self):
         self.api_keys = Config.GEMINI_API_KEYS
         self.current_key_idx = 0
         self.client = None
         self.chat = None
+        # The chat is replaced from the GUI thread, the async loop and speculation threads
+        self._chat_lock = threading.RLock()
+        # One ready genai.Client per API key, reused across key switches
+        self.clients = {}
+        self._clients_lock = threading.Lock()
+        self._warmed = set()
+        self.key_pool = None
+        self.usage = UsageTracker(Config.GEMINI_USAGE_FILE or None)
+        self.context_tokens = 0
         self.current_model = Config.GEMINI_MODEL
         self.additional_instructions = Config.SYSTEM_PROMPT
+        self.response_cache = ResponseCache(
+            Config.RESPONSE_CACHE_FILE or None,
+            max_entries=Config.RESPONSE_CACHE_SIZE,
+            similarity=Config.RESPONSE_CACHE_SIMILARITY,
+            min_words=Config.RESPONSE_CACHE_MIN_WORDS
+        ) if Config.RESPONSE_CACHE else None
+        self.context = ContextManager(
+            max_tokens=Config.CONTEXT_MAX_TOKENS,
+            keep_turns=Config.CONTEXT_KEEP_TURNS,
+            image_tokens=self.IMAGE_TOKENS
+        ) if Config.CONTEXT_MAX_TOKENS > 0 else None
+        self.router = ModelRouter(
+            Config.ROUTING_FAST_MODEL,
+            Config.ROUTING_STRONG_MODEL or self.current_model,
+            fast_max_words=Config.ROUTING_FAST_MAX_WORDS,
+            log_path=Config.ROUTING_LOG or None
+        ) if Config.MODEL_ROUTING else None
+        # (normalized text, decision) of the last speculation, reused if the same utterance is sent for real
+        self._speculated_route = None
+        self.prompt_cache = PromptCache(
+            ttl=Config.GEMINI_PROMPT_CACHE_TTL_S,
+            min_tokens=Config.GEMINI_PROMPT_CACHE_MIN_TOKENS
+        ) if Config.GEMINI_PROMPT_CACHE else None
+        self._chat_config = None
         self.initialize()
 
+    def _ensure_key_pool(self):
+        if self.key_pool is None or self.key_pool.keys != self.api_keys:
+            self.key_pool = KeyPool(self.api_keys, rpm=Config.GEMINI_KEY_RPM, tpm=Config.GEMINI_KEY_TPM,
+                                    rpd=Config.GEMINI_KEY_RPD, usage=self.usage)
+
     def initialize(self):
         """Initialize the Gemini client with current API key."""
+        self._ensure_key_pool()
         if not self.api_keys:
             return False
             
-        current_api_key = self.api_keys[self.current_key_idx]
         try:
-            self.client = genai.Client(api_key=current_api_key)
+            self.client = self.client_for(self.current_key_idx)
             self.create_chat()
+            self.warm_clients()
             return True
         except Exception as e:
             print(f"Gemini initialization error with key idx {self.current_key_idx}: {e}")
             return False
-            
-    def _rotate_key(self):
-        """Move to the next available API key and reinitialize."""
-        if not self.api_keys or len(self.api_keys) <= 1:
+
+    def client_for(self, index):
+        """The genai.Client for key ``index``, built once and then reused."""
+        api_key = self.api_keys[index]
+        with self._clients_lock:
+            client = self.clients.get(api_key)
+            if client is None:
+                options = {'http_options': types.HttpOptions(base_url=Config.GEMINI_BASE_URL)} if Config.GEMINI_BASE_URL else {}
+                client = self.clients[api_key] = genai.Client(api_key=api_key, **options)
+            return client
+
+    def warm_clients(self):
+        """Build a client for every key and open its connection in the background."""
+        keys = [i for i, key in enumerate(self.api_keys) if key not in self._warmed]
+        if not keys:
+            return
+        self._warmed.update(self.api_keys[i] for i in keys)
+        threading.Thread(target=self._warm, args=(keys,), name='gemini-warm', daemon=True).start()
+
+    def _warm(self, keys):
+        for index in keys:
+            try:
+                client = self.client_for(index)
+                if Config.GEMINI_WARM_CLIENTS:
+                    # A metadata call opens the TLS connection the first request will reuse
+                    client.models.get(model=self.current_model)
+                if self.prompt_cache is not None:
+                    self.chat_config(index, wait=True)
+            except Exception as e:
+                print(f"Gemini warm-up failed for key #{index + 1}: {e}")
+
+    def _switch_key(self, index):
+        """Move the conversation to another API key's client, keeping its history."""
+        print(f"Switching to Gemini API Key #{index + 1}")
+        try:
+            client = self.client_for(index)
+        except Exception as e:
+            print(f"Gemini initialization error with key idx {index}: {e}")
             return False
-            
-        self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
-        print(f"Rate limited or quota exceeded. Rotating to Gemini API Key #{self.current_key_idx + 1}")
-        return self.initialize()
+        with self._chat_lock:
+            history = self.chat.get_history() if self.chat else []
+            self.current_key_idx = index
+            self.client = client
+            return self.create_chat(history) is not None
+
+    def acquire_key(self, tokens=0):
+        """Reserve the healthiest key for a request of about ``tokens``.
+        
+        Returns (state, 0) and switches to that key if needed, or
+        (None, seconds until a key is ready).
+        """
+        self._ensure_key_pool()
+        state = self.key_pool.acquire(tokens, prefer=self.current_key_idx)
+        if state is None:
+            return None, self.key_pool.wait_time(tokens)
+        if state.index != self.current_key_idx or not self.chat:
+            if not self._switch_key(state.index):
+                self.key_pool.report_failure(state, "initialization failed")
+                raise Exception("Gemini API not configured or keys exhausted")
+        return state, 0.0
+
+    def _acquire_key_blocking(self, tokens):
+        if not self.api_keys:
+            raise Exception("Gemini API not configured or keys exhausted")
+        deadline = time.monotonic() + Config.GEMINI_MAX_KEY_WAIT_S
+        while True:
+            state, wait = self.acquire_key(tokens)
+            if state:
+                return state
+            if time.monotonic() + wait > deadline:
+                raise Exception(f"All Gemini API keys are rate-limited; the next one is free in {wait:.0f}s")
+            time.sleep(max(wait, 0.01))
+
+    def estimate_tokens(self, message):
+        """Input tokens for sending ``message`` on the current chat, roughly."""
+        parts = message if isinstance(message, list) else [message]
+        tokens = self.context_tokens
+        for part in parts:
+            tokens += len(part) // 4 if isinstance(part, str) else self.IMAGE_TOKENS
+        return tokens
+
+    def note_usage(self, chunk):
+        """Token counts reported on a chunk (the last one carries the full usage), or None."""
+        usage = usage_from(getattr(chunk, 'usage_metadata', None))
+        if usage:
+            # The whole exchange is input context for the next request
+            self.context_tokens = usage['total']
+        return usage
+
+    def key_stats(self):
+        """Per-key request, rate-limit, cooldown and usage counters."""
+        self._ensure_key_pool()
+        stats = self.key_pool.stats()
+        for entry, api_key in zip(stats, self.api_keys):
+            entry['last_minute'] = self.usage.window(api_key, 60)
+            entry['last_day'] = self.usage.window(api_key, 86400)
+            entry['lifetime'] = self.usage.totals(api_key)
+        return stats
 
     def get_full_system_instruction(self):
         """Combine fixed system prompt with additional instructions."""
@@ -47,86 +204,306 @@ class GeminiClient:
         else:
             return self.FIXED_SYSTEM_PROMPT
 
-    def create_chat(self):
-        """Create a new Gemini chat instance."""
+    def chat_config(self, index=None, model=None, wait=False):
+        """Chat config for key ``index`` and ``model``: the system instruction, or its cached content."""
+        index = self.current_key_idx if index is None else index
+        model = model or self.current_model
+        instruction = self.get_full_system_instruction()
+        if self.prompt_cache is None:
+            return {"system_instruction": instruction}
+        return self.prompt_cache.config(self.client_for(index), self.api_keys[index], model, instruction, wait)
+
+    def create_chat(self, history=None):
+        """Create a new Gemini chat instance, optionally continuing ``history``."""
         if not self.client:
             return None
         
         try:
-            full_instruction = self.get_full_system_instruction()
+            with self._chat_lock:
+                config = self.chat_config()
+                self.chat = self.client.chats.create(
+                    model=self.current_model,
+                    config=config,
+                    history=history or None
+                )
+                self._chat_config = config
+                return self.chat
+        except Exception as e:
+            print(f"Error creating Gemini chat: {e}")
+            return None
+
+    def append_history(self, turns):
+        """Add turns completed on another chat object to the current chat."""
+        with self._chat_lock:
+            history = self.chat.get_history() if self.chat else []
+            config = self.chat_config()
             self.chat = self.client.chats.create(
                 model=self.current_model,
-                config={
-                    "system_instruction": full_instruction
-                }
+                config=config,
+                history=history + list(turns)
             )
+            self._chat_config = config
             return self.chat
-        except Exception as e:
-            print(f"Error creating Gemini chat: {e}")
+
+    def _refresh_chat_config(self):
+        """Move the chat onto cached content that became ready (or off content that went away)."""
+        with self._chat_lock:
+            if self.prompt_cache is not None and self.chat and self.chat_config() != self._chat_config:
+                self.create_chat(self.chat.get_history())
+
+    def _cache_miss(self, error, model):
+        """True (and the cached content dropped) if ``error`` means the API lost the current key's copy."""
+        if self.prompt_cache is None or not is_cache_miss(error):
+            return False
+        print(f"Gemini prompt cache for key #{self.current_key_idx + 1} is gone, sending the instruction inline")
+        self.prompt_cache.invalidate(self.api_keys[self.current_key_idx], model)
+        return True
+
+    def context_history(self):
+        """The chat history, compacted to the context budget first."""
+        with self._chat_lock:
+            history = self.chat.get_history() if self.chat else []
+            if self.context is None:
+                return history
+            compacted = self.context.compact(history)
+            if compacted is not history:
+                self.create_chat(compacted)
+                self.context_tokens = self.context.tokens(compacted)
+            return compacted
+
+    def add_exchange(self, question, answer):
+        """Record a question and an answer produced without the API in the history."""
+        return self.append_history([
+            types.Content(role='user', parts=[types.Part.from_text(text=question)]),
+            types.Content(role='model', parts=[types.Part.from_text(text=answer)]),
+        ])
+
+    def context_key(self, turns=2):
+        """Digest of the last ``turns`` history entries; cached answers are only reused after the same ones."""
+        if self.response_cache is None or not self.chat:
+            return ''
+        digest = hashlib.sha1()
+        for content in self.chat.get_history()[-turns:]:
+            if not isinstance(content, types.Content):
+                digest.update(str(content).encode('utf-8'))
+                continue
+            digest.update(f"{content.role}\0".encode('utf-8'))
+            for part in content.parts or []:
+                digest.update((part.text or '\0image').encode('utf-8') + b'\0')
+        return digest.hexdigest()[:16]
+
+    def cached_answer(self, text, model=None, context=''):
+        """Chunks of an earlier answer to the same (or a near-identical) question, or None."""
+        if self.response_cache is None:
             return None
+        return self.response_cache.get(text, model or self.current_model, self.get_full_system_instruction(), context)
+
+    def remember_answer(self, text, chunks, model=None, context=''):
+        if self.response_cache is not None:
+            self.response_cache.put(text, model or self.current_model, self.get_full_system_instruction(), chunks,
+                                    context)
+
+    def route(self, message):
+        """Routing decision for a message, or None when routing is off.
+        
+        An utterance already routed by its speculation keeps that decision,
+        so it is classified and counted once.
+        """
+        if self.router is None:
+            return None
+        if isinstance(message, str) and self._speculated_route:
+            speculated, self._speculated_route = self._speculated_route, None
+            if speculated[0] == normalize_text(message):
+                return speculated[1]
+        return self.router.route(message)
+
+    def _chat_for(self, model, history):
+        """A chat on ``model`` continuing ``history``; answers are copied back with append_history."""
+        return self.client.chats.create(
+            model=model,
+            config=self.chat_config(model=model),
+            history=history
+        )
+
+    def start_speculative_stream(self, text):
+        """Answer ``text`` on a fork of the current chat.
+        
+        Returns (text_chunks, adopt). The fork starts from the current history,
+        so an abandoned answer never reaches the real chat; ``adopt()`` swaps
+        the fork in as the current chat, or returns False if the chat has
+        changed since the fork was made.
+        """
+        if not self.chat or not self.client:
+            raise Exception("Gemini API not configured")
+        with self._chat_lock:
+            history = self.context_history()
+            base = self.chat
+        decision = self.route(text)
+        self._speculated_route = (normalize_text(text), decision) if decision else None
+        model = decision['model'] if decision else self.current_model
+        estimate = self.estimate_tokens(text)
+        state = self.key_pool.acquire(estimate, prefer=self.current_key_idx)
+        if state is None or state.index != self.current_key_idx:
+            # Speculation is optional: never switch keys or wait for one
+            if state:
+                self.key_pool.cancel(state, estimate)
+            raise Exception("Current Gemini API key has no spare capacity")
+        
+        fork = self._chat_for(model, history)
+        
+        def chunks():
+            usage = None
+            try:
+                for chunk in fork.send_message_stream(text):
+                    usage = usage_from(getattr(chunk, 'usage_metadata', None)) or usage
+                    if hasattr(chunk, 'text') and chunk.text:
+                        yield chunk.text
+            except GeneratorExit:
+                self.key_pool.settle(state, estimate, usage)
+                raise
+            except Exception as e:
+                self.key_pool.report_failure(state, e)
+                raise
+            self.key_pool.release(state, estimate, usage)
+        
+        def adopt():
+            with self._chat_lock:
+                if self.chat is not base:
+                    return False
+                # Committed: the utterance won't be sent again
+                self._speculated_route = None
+                if model == self.current_model:
+                    self.chat = fork
+                else:
+                    self.append_history(fork.get_history()[len(history):])
+                return True
+        
+        return chunks(), adopt
 
     def update_model(self, model_name):
         """Update the model and recreate chat."""
-        self.current_model = model_name
-        return self.create_chat()
+        with self._chat_lock:
+            self.current_model = model_name
+            if self.router and not Config.ROUTING_STRONG_MODEL:
+                self.router.strong_model = model_name
+            return self.create_chat()
 
     def update_instructions(self, instructions):
         """Update system instructions and recreate chat."""
-        self.additional_instructions = instructions
-        return self.create_chat()
+        with self._chat_lock:
+            self.additional_instructions = instructions
+            return self.create_chat()
 
-    def send_message_stream(self, text):
+    def send_message_stream(self, text, trace=None):
         """Send text message with fallback retry on rate limits."""
-        for attempt in range(len(self.api_keys) if self.api_keys else 1):
-            if not self.chat:
-                if not self.initialize():
-                    raise Exception("Gemini API not configured or keys exhausted")
+        decision = self.route(text)
+        model = decision['model'] if decision else None
+        context = self.context_key()
+        cached = self.cached_answer(text, model, context)
+        if cached is not None:
+            chunks = self._replay(text, cached)
+        else:
+            chunks = self._remembered(text, self._send_stream(text, decision), model, context)
+        if tracer.enabled:
+            chunks = self._traced(chunks, trace)
+        yield from chunks
+
+    def _replay(self, text, cached):
+        for piece in cached:
+            yield CachedChunk(piece)
+        self.add_exchange(text, "".join(cached))
+
+    def _remembered(self, text, chunks, model=None, context=''):
+        """Pass chunks through and cache the answer once it is complete."""
+        pieces = []
+        for chunk in chunks:
+            if hasattr(chunk, 'text') and chunk.text:
+                pieces.append(chunk.text)
+            yield chunk
+        self.remember_answer(text, pieces, model, context)
 
+    def _send_stream(self, message, decision=None):
+        """Stream one chat message on the healthiest key, retrying rate limits on others."""
+        if self.chat:
+            self.context_history()
+        estimate = self.estimate_tokens(message)
+        start = time.perf_counter()
+        first = None
+        for attempt in range(len(self.api_keys) + 1 if self.api_keys else 1):
+            state = self._acquire_key_blocking(estimate)
+            self._refresh_chat_config()
+            # A routed request runs on its own chat and copies the finished turn back
+            history = self.chat.get_history() if decision and decision['model'] != self.current_model else None
+            chat = self._chat_for(decision['model'], history) if history is not None else self.chat
+            yielded = False
+            usage = None
             try:
-                response = self.chat.send_message_stream(text)
-                for chunk in response:
+                for chunk in chat.send_message_stream(message):
+                    usage = self.note_usage(chunk) or usage
+                    if first is None:
+                        first = time.perf_counter()
+                    yielded = True
                     yield chunk
-                return
+            except GeneratorExit:
+                self.key_pool.settle(state, estimate, usage)
+                raise
             except Exception as e:
-                error_str = str(e).lower()
-                if "429" in error_str or "quota" in error_str or "exhausted" in error_str:
-                    rotated = self._rotate_key()
-                    if not rotated:
-                        raise e
-                    continue # Retry with new key
-                else:
-                    raise e
+                if not yielded and self._cache_miss(e, decision['model'] if decision else self.current_model):
+                    self.key_pool.cancel(state, estimate)
+                    continue # Retry with the instruction inline
+                self.key_pool.report_failure(state, e)
+                if is_rate_limit(e) and not yielded:
+                    print(f"Gemini API Key #{state.index + 1} rate limited, cooling down")
+                    continue # Retry on the next healthy key
+                if decision:
+                    self.router.record(decision, (first or time.perf_counter()) - start,
+                                       time.perf_counter() - start, error=e)
+                raise e
+            self.key_pool.release(state, estimate, usage)
+            if history is not None:
+                self.append_history(chat.get_history()[len(history):])
+            if decision:
+                self.router.record(decision, (first or time.perf_counter()) - start, time.perf_counter() - start)
+            return
                     
         raise Exception("All Gemini API keys exhausted or rate-limited.")
 
-    def send_screenshot_stream(self, image_bytes, prompt="What do you see in this screenshot? Please describe it and provide any relevant insights or help."):
+    def send_screenshot_stream(self, image_bytes, prompt=SCREENSHOT_PROMPT, trace=None, mime_type='image/png'):
         """Send screenshot with fallback retry on rate limits."""
+        message = self.screenshot_message(image_bytes, prompt, mime_type)
+        chunks = self._send_stream(message, self.route(message))
+        if tracer.enabled:
+            chunks = self._traced(chunks, trace)
+        yield from chunks
+
+    @classmethod
+    def ocr_prompt(cls, text, source="a screenshot of my screen", thumbnail=False):
+        """Prompt carrying OCR text in place of (or alongside a thumbnail of) a screenshot."""
+        return cls.OCR_PROMPT.format(source=source, text=text, attachment=cls.OCR_THUMBNAIL_NOTE if thumbnail else "")
+
+    @staticmethod
+    def screenshot_message(image_bytes, prompt, mime_type='image/png'):
+        """Message parts for a screenshot plus its prompt; text only when there are no image bytes (OCR)."""
+        if image_bytes is None:
+            return [prompt]
         image_part = types.Part.from_bytes(
             data=image_bytes,
-            mime_type='image/png'
+            mime_type=mime_type
         )
-        
-        for attempt in range(len(self.api_keys) if self.api_keys else 1):
-            if not self.chat:
-                if not self.initialize():
-                    raise Exception("Gemini API not configured or keys exhausted")
-                    
-            try:
-                response = self.chat.send_message_stream([
-                    image_part,
-                    prompt
-                ])
-                for chunk in response:
-                    yield chunk
-                return
-            except Exception as e:
-                error_str = str(e).lower()
-                if "429" in error_str or "quota" in error_str or "exhausted" in error_str:
-                    rotated = self._rotate_key()
-                    if not rotated:
-                        raise e
-                    continue # Retry with new key
-                else:
-                    raise e
-                    
-        raise Exception("All Gemini API keys exhausted or rate-limited.")
+        return [image_part, prompt]
+
+    def _traced(self, chunks, trace):
+        """Pass chunks through, recording first-chunk and streaming spans."""
+        start = tracer.now()
+        first = None
+        count = 0
+        for chunk in chunks:
+            if first is None:
+                first = tracer.now()
+                tracer.record('gemini_first_chunk', start, first, trace=trace, model=self.current_model)
+            count += 1
+            yield chunk
+        end = tracer.now()
+        if first is not None:
+            tracer.record('gemini_stream', first, end, trace=trace, chunks=count)
+        tracer.record('gemini_request', start, end, trace=trace, key_idx=self.current_key_idx)
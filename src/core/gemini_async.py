@@ -0,0 +1,387 @@
+import asyncio
+import contextlib
+import itertools
+import threading
+
+from src.config import Config
+from src.core.key_pool import is_rate_limit
+from src.core.prompt_cache import is_cache_miss
+from src.utils.tracing import tracer
+
+
+class GeminiRequest:
+    """Handle for one submitted request."""
+
+    def __init__(self, request_id, message, on_chunk, on_start=None, on_done=None, on_error=None, trace=None,
+                 kind='message'):
+        self.id = request_id
+        self.kind = kind
+        self.message = message
+        self.on_chunk = on_chunk
+        self.on_start = on_start
+        self.on_done = on_done
+        self.on_error = on_error
+        self.trace = trace
+        self.task = None
+        self.cancelled = False
+        self.chunks = 0
+
+
+class AsyncGeminiClient:
+    """Stream Gemini answers from one background asyncio event loop.
+
+    Requests are submitted from any thread and get an increasing request
+    id. Each runs as a task on the loop using the SDK's async client, at
+    most ``max_concurrent`` at a time. By default a new request supersedes
+    the ones of the same kind still in flight (a new utterance the older
+    utterance answers, a screenshot the older screenshot ones): they are
+    cancelled, which closes their HTTP streams so no more tokens are
+    generated for answers nobody will read.
+
+    Conversation state stays in the wrapped ``GeminiClient``. A request
+    starts an async chat from the current history and, only once it has
+    finished, appends its new turns back, so cancelled answers never enter
+    the history. Key switches and client construction block, so they run
+    in the loop's executor. With ``warm`` the async connection of every key's client
+    is opened up front, so switching keys after a 429 skips the handshake.
+
+    With ``serial`` requests take turns: one only starts (and calls
+    ``on_start``) once the one before it has finished, so answers of
+    different kinds queue instead of streaming into the chat together.
+
+    With ``hedge_delay`` set, a request with no first chunk after that many
+    seconds is sent again on a second healthy key. Whichever stream yields
+    first is kept and the other is cancelled; the input tokens the loser
+    was charged are counted in ``stats()['hedge_extra_tokens']``.
+    """
+
+    def __init__(self, client, max_concurrent=2, warm=False, hedge_delay=None, serial=False):
+        self.client = client
+        self.max_concurrent = max_concurrent
+        self.serial = serial
+        self.hedge_delay = hedge_delay
+        self._ids = itertools.count(1)
+        self._requests = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedge_extra_tokens = 0
+
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._turn = None
+        self._thread = threading.Thread(target=self._run_loop, name='gemini-loop', daemon=True)
+        self._thread.start()
+        if warm:
+            self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self._warm()))
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._turn = asyncio.Lock() if self.serial else contextlib.nullcontext()
+        self.loop.run_forever()
+
+    async def _warm(self):
+        for index in range(len(self.client.api_keys)):
+            try:
+                await self.client.client_for(index).aio.models.get(model=self.client.current_model)
+            except Exception as e:
+                print(f"Gemini async warm-up failed for key #{index + 1}: {e}")
+
+    def send_message(self, text, on_chunk, supersede=True, **callbacks):
+        """Stream an answer to ``text``; returns the request id."""
+        return self.submit(text, on_chunk, supersede, **callbacks)
+
+    def send_screenshot(self, image_bytes, on_chunk, prompt=None, supersede=True, mime_type='image/png', **callbacks):
+        """Stream an answer about a screenshot; returns the request id."""
+        message = self.client.screenshot_message(image_bytes, prompt or self.client.SCREENSHOT_PROMPT, mime_type)
+        return self.submit(message, on_chunk, supersede, kind='screenshot', **callbacks)
+
+    def submit(self, message, on_chunk, supersede=True, kind='message', **callbacks):
+        request = GeminiRequest(next(self._ids), message, on_chunk, kind=kind, **callbacks)
+        with self._lock:
+            self.submitted += 1
+            if supersede:
+                for older in list(self._requests.values()):
+                    if older.kind == kind:
+                        self._cancel(older)
+            self._requests[request.id] = request
+        self.loop.call_soon_threadsafe(self._start, request)
+        return request.id
+
+    def cancel(self, request_id):
+        """Cancel one request if it is still running."""
+        with self._lock:
+            request = self._requests.get(request_id)
+            if request:
+                self._cancel(request)
+
+    def cancel_all(self):
+        with self._lock:
+            for request in list(self._requests.values()):
+                self._cancel(request)
+
+    def _cancel(self, request):
+        # Caller holds the lock
+        if request.cancelled:
+            return
+        request.cancelled = True
+        self.cancelled += 1
+        self._requests.pop(request.id, None)
+        self.loop.call_soon_threadsafe(self._cancel_task, request)
+
+    @staticmethod
+    def _cancel_task(request):
+        if request.task:
+            request.task.cancel()
+
+    def _start(self, request):
+        if not request.cancelled:
+            request.task = self.loop.create_task(self._run(request))
+
+    def in_flight(self, kind=None):
+        with self._lock:
+            return sorted(i for i, request in self._requests.items() if kind is None or request.kind == kind)
+
+    async def _run(self, request):
+        try:
+            async with self._semaphore, self._turn:
+                if request.cancelled:
+                    return
+                if request.on_start:
+                    request.on_start(request.id)
+                await self._stream(request)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            if request.on_error and not request.cancelled:
+                request.on_error(request.id, e)
+            return
+        finally:
+            with self._lock:
+                self._requests.pop(request.id, None)
+
+        with self._lock:
+            self.completed += 1
+        if request.on_done:
+            request.on_done(request.id)
+
+    async def _acquire_key(self, tokens):
+        """Wait (without blocking the loop) for the key pool to offer a key."""
+        if not self.client.api_keys:
+            raise Exception("Gemini API not configured or keys exhausted")
+        deadline = self.loop.time() + Config.GEMINI_MAX_KEY_WAIT_S
+        while True:
+            # May switch keys, which builds a client and a chat
+            reserve = self.loop.run_in_executor(None, self.client.acquire_key, tokens)
+            try:
+                state, wait = await asyncio.shield(reserve)
+            except asyncio.CancelledError:
+                reserve.add_done_callback(lambda done: self._unreserve(done, tokens))
+                raise
+            if state:
+                return state
+            if self.loop.time() + wait > deadline:
+                raise Exception(f"All Gemini API keys are rate-limited; the next one is free in {wait:.0f}s")
+            await asyncio.sleep(max(wait, 0.01))
+
+    def _unreserve(self, done, tokens):
+        # The request was cancelled while a key was being reserved for it
+        if not done.cancelled() and not done.exception() and done.result()[0]:
+            self.client.key_pool.cancel(done.result()[0], tokens)
+
+    async def _open(self, index, history, message, model):
+        """Start a stream on key ``index``; return (chat, stream, first chunk or None)."""
+        client = self.client
+        # The first use of a key builds its genai.Client; keep that off the loop
+        await self.loop.run_in_executor(None, client.client_for, index)
+        config = client.chat_config(index, model)
+        try:
+            return await self._open_chat(index, history, message, model, config)
+        except Exception as e:
+            if 'cached_content' not in config or not is_cache_miss(e):
+                raise
+            # The cached instruction expired or was deleted: drop it and send the instruction inline
+            client.prompt_cache.invalidate(client.api_keys[index], model)
+            return await self._open_chat(index, history, message, model, client.chat_config(index, model))
+
+    async def _open_chat(self, index, history, message, model, config):
+        chat = self.client.client_for(index).aio.chats.create(
+            model=model,
+            config=config,
+            history=history
+        )
+        stream = await chat.send_message_stream(message)
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            await self._close(stream)
+            raise
+        return chat, stream, first
+
+    @staticmethod
+    async def _close(stream):
+        # Closing the stream drops the HTTP response, ending generation early
+        if hasattr(stream, 'aclose'):
+            await stream.aclose()
+
+    async def _race(self, request, state, history, estimate, model):
+        """Open the request on ``state``'s key, hedging on another key if it is slow.
+        
+        Returns (state, chat, stream, first chunk) for the attempt that
+        answered first. Failed attempts are reported to the key pool; if all
+        fail, the primary's error is raised.
+        """
+        pool = self.client.key_pool
+        primary = asyncio.ensure_future(self._open(state.index, history, request.message, model))
+        attempts = {primary: state}
+        errors = {}
+        try:
+            if self.hedge_delay is not None and len(self.client.api_keys) > 1:
+                done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+                if not done:
+                    # Hedging is best effort: only a key that is ready right now
+                    backup = pool.acquire(estimate, exclude=(state.index,))
+                    if backup:
+                        with self._lock:
+                            self.hedged += 1
+                        hedge = asyncio.ensure_future(self._open(backup.index, history, request.message, model))
+                        attempts[hedge] = backup
+
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if not task.exception()]
+                for task in done:
+                    if task.exception():
+                        errors[task] = task.exception()
+                        pool.report_failure(attempts[task], task.exception())
+                if winners:
+                    winner = primary if primary in winners else winners[0]
+                    for task in set(attempts) - {winner} - set(errors):
+                        await self._drop(task, attempts[task], estimate)
+                    if winner is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return (attempts[winner],) + winner.result()
+        except BaseException:
+            for task in set(attempts) - set(errors):
+                await self._drop(task, attempts[task], estimate, wasted=False)
+            raise
+        raise errors.get(primary) or next(iter(errors.values()))
+
+    async def _drop(self, task, state, estimate, wasted=True):
+        """Cancel an attempt that lost the race and settle its key reservation without judging the key."""
+        if task.done():
+            if not task.cancelled() and not task.exception():
+                await self._close(task.result()[1])
+        else:
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        # The prompt was already sent, so its input tokens count against the quota
+        self.client.key_pool.settle(state, estimate)
+        if wasted:
+            with self._lock:
+                self.hedge_extra_tokens += estimate
+
+    async def _stream(self, request):
+        client = self.client
+        pool = client.key_pool
+        start = tracer.now()
+        text = request.message if isinstance(request.message, str) else None
+        decision = client.route(request.message)
+        model = decision['model'] if decision else client.current_model
+        context = client.context_key() if text is not None else ''
+        cached = client.cached_answer(text, model, context) if text is not None else None
+        if cached is not None:
+            for piece in cached:
+                request.chunks += 1
+                request.on_chunk(piece)
+            client.add_exchange(text, "".join(cached))
+            tracer.record('gemini_request', start, trace=request.trace, cached=True)
+            return
+        estimate = client.estimate_tokens(request.message)
+        pieces = []
+
+        for attempt in range(len(client.api_keys) + 1 if client.api_keys else 1):
+            state = await self._acquire_key(estimate)
+            history = client.context_history()
+            try:
+                state, chat, stream, chunk = await self._race(request, state, history, estimate, model)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if is_rate_limit(e):
+                    print(f"Gemini API Key #{state.index + 1} rate limited, cooling down")
+                    continue
+                raise
+            first = tracer.now()
+            tracer.record('gemini_first_chunk', start, first, trace=request.trace,
+                          model=model, key_idx=state.index)
+            usage = None
+            try:
+                try:
+                    while chunk is not None:
+                        if request.cancelled:
+                            raise asyncio.CancelledError()
+                        usage = client.note_usage(chunk) or usage
+                        if hasattr(chunk, 'text') and chunk.text:
+                            request.chunks += 1
+                            pieces.append(chunk.text)
+                            request.on_chunk(chunk.text)
+                        try:
+                            chunk = await stream.__anext__()
+                        except StopAsyncIteration:
+                            chunk = None
+                finally:
+                    await self._close(stream)
+            except asyncio.CancelledError:
+                pool.settle(state, estimate, usage)
+                raise
+            except Exception as e:
+                pool.report_failure(state, e)
+                if decision:
+                    client.router.record(decision, first - start, tracer.now() - start, error=e)
+                raise
+            pool.release(state, estimate, usage)
+            break
+        else:
+            raise Exception("All Gemini API keys exhausted or rate-limited.")
+
+        end = tracer.now()
+        tracer.record('gemini_stream', first, end, trace=request.trace, chunks=request.chunks)
+        tracer.record('gemini_request', start, end, trace=request.trace, key_idx=state.index)
+        # Only finished answers become part of the conversation
+        client.append_history(chat.get_history()[len(history):])
+        if decision:
+            client.router.record(decision, first - start, end - start)
+        if text is not None:
+            client.remember_answer(text, pieces, model, context)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'failed': self.failed,
+                'in_flight': len(self._requests),
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'hedge_extra_tokens': self.hedge_extra_tokens,
+            }
+
+    def shutdown(self):
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,235 @@
+import re
+import threading
+import time
+
+RATE_LIMIT_MARKERS = ("429", "quota", "exhausted", "rate limit")
+
+
+def is_rate_limit(error):
+    """True for quota / 429 errors from the Gemini API."""
+    error_str = str(error).lower()
+    return any(marker in error_str for marker in RATE_LIMIT_MARKERS)
+
+
+def parse_retry_after(error):
+    """Seconds the API asked us to wait, from RetryInfo or a retry-after hint."""
+    match = re.search(r"retry_?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error), re.IGNORECASE)
+    if not match:
+        match = re.search(r"retry (?:after|in) (\d+(?:\.\d+)?)\s*s", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """Refills ``rate`` units per second up to ``capacity``."""
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.level
+
+    def time_until(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        # Ignore float dust left over from refilling so a full bucket reads as ready
+        missing = amount - self.level
+        if missing <= 1e-9:
+            return 0.0
+        return missing / self.rate if self.rate else float('inf')
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= amount
+
+
+class KeyState:
+    """Limits, cooldown and counters for one API key."""
+
+    def __init__(self, index, key, rpm, tpm, now):
+        self.index = index
+        self.key = key
+        self.requests = TokenBucket(rpm / 60.0, rpm, now)
+        self.tokens = TokenBucket(tpm / 60.0, tpm, now)
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.in_flight = 0
+        self.sent = 0
+        self.succeeded = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.tokens_used = 0
+        self.last_error = None
+
+    def wait_time(self, tokens, now):
+        """Seconds until this key may send a request of ``tokens``."""
+        return max(self.cooldown_until - now,
+                   self.requests.time_until(1, now),
+                   self.tokens.time_until(tokens, now))
+
+
+class KeyPool:
+    """Choose Gemini API keys by health and load instead of blind round-robin.
+
+    Each key has request-per-minute and token-per-minute buckets matching
+    its quota and a cooldown window set from the API's retry delay (or an
+    exponential backoff) after a 429. ``acquire`` prefers the key already
+    in use while it has headroom, so the chat stays on one key, and
+    otherwise picks the healthy key with the most spare capacity. When no
+    key is ready it returns None and ``wait_time`` says how long until one
+    is.
+
+    With a ``UsageTracker`` the pool also knows each key's recorded usage:
+    a key at its daily request limit (``rpd``) is not used until requests
+    age out of the last day, and when the current key is forecast to run
+    out within ``shift_before`` seconds, load moves to a key with more
+    time left before the 429s start.
+    """
+
+    def __init__(self, keys, rpm=15, tpm=1_000_000, cooldown=30.0, max_cooldown=300.0, clock=None,
+                 rpd=0, usage=None, shift_before=60.0):
+        self.keys = list(keys)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.usage = usage
+        self.shift_before = shift_before
+        self.shifts = 0
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock or time.monotonic
+        now = self.clock()
+        self.states = [KeyState(i, key, rpm, tpm, now) for i, key in enumerate(self.keys)]
+        self._lock = threading.Lock()
+
+    def _headroom(self, state, now):
+        headroom = (state.requests.available(now) / state.requests.capacity
+                    + state.tokens.available(now) / state.tokens.capacity
+                    - state.in_flight)
+        if self.usage and self.rpd:
+            headroom += 1 - self.usage.window(state.key, 86400)['requests'] / self.rpd
+        return headroom
+
+    def _wait(self, state, tokens, now):
+        wait = state.wait_time(tokens, now)
+        if self.usage and self.rpd:
+            wait = max(wait, self.usage.day_reset_in(state.key, self.rpd))
+        return wait
+
+    def exhausted_in(self, state):
+        """Forecast seconds until ``state``'s key hits a quota at its recent rate."""
+        if not self.usage:
+            return float('inf')
+        return self.usage.forecast(state.key, self.rpm, self.tpm, self.rpd)['exhausted_in']
+
+    def acquire(self, tokens=0, prefer=None, exclude=()):
+        """Reserve capacity on the best ready key not in ``exclude``, or return None."""
+        with self._lock:
+            now = self.clock()
+            ready = [s for s in self.states if s.index not in exclude and self._wait(s, tokens, now) <= 0]
+            if not ready:
+                return None
+            preferred = [s for s in ready if s.index == prefer]
+            if preferred and self.usage:
+                soon = self.exhausted_in(preferred[0])
+                if soon < self.shift_before:
+                    # Move before the key starts failing rather than after the first 429
+                    forecast = {s.index: self.exhausted_in(s) for s in ready if s is not preferred[0]}
+                    later = [s for s in ready if forecast.get(s.index, 0.0) > soon]
+                    if later:
+                        ready, preferred = later, []
+                        self.shifts += 1
+            state = preferred[0] if preferred else max(ready, key=lambda s: self._headroom(s, now))
+            state.requests.take(1, now)
+            state.tokens.take(tokens, now)
+            state.in_flight += 1
+            state.sent += 1
+            return state
+
+    def wait_time(self, tokens=0):
+        """Seconds until some key can take a request."""
+        with self._lock:
+            now = self.clock()
+            return min((self._wait(s, tokens, now) for s in self.states), default=float('inf'))
+
+    def release(self, state, reserved=0, usage=None):
+        """Record a finished request, correcting the token estimate with its ``usage``."""
+        tokens = usage['total'] if usage else reserved
+        if self.usage:
+            self.usage.record(state.key, usage)
+        with self._lock:
+            now = self.clock()
+            state.in_flight -= 1
+            state.succeeded += 1
+            state.strikes = 0
+            state.tokens_used += tokens
+            if tokens != reserved:
+                state.tokens.take(tokens - reserved, now)
+
+    def settle(self, state, reserved=0, usage=None):
+        """Close the reservation of a request that was sent but abandoned (cancelled, or a lost hedge).
+
+        The request and its tokens stay spent, but the key's health and
+        success counters are left as they were.
+        """
+        tokens = usage['total'] if usage else reserved
+        if self.usage:
+            self.usage.record(state.key, usage or {'prompt': reserved, 'total': reserved})
+        with self._lock:
+            now = self.clock()
+            state.in_flight -= 1
+            state.tokens_used += tokens
+            if tokens != reserved:
+                state.tokens.take(tokens - reserved, now)
+
+    def cancel(self, state, reserved=0):
+        """Hand back a reservation that was never used."""
+        with self._lock:
+            now = self.clock()
+            state.in_flight -= 1
+            state.sent -= 1
+            state.requests.take(-1, now)
+            state.tokens.take(-reserved, now)
+
+    def report_failure(self, state, error):
+        """Record a failed request; rate limits put the key into cooldown."""
+        with self._lock:
+            now = self.clock()
+            state.in_flight -= 1
+            state.last_error = str(error)[:200]
+            if not is_rate_limit(error):
+                state.failed += 1
+                return
+            state.rate_limited += 1
+            state.strikes += 1
+            retry_after = parse_retry_after(error)
+            if retry_after is None:
+                retry_after = min(self.max_cooldown, self.cooldown * 2 ** (state.strikes - 1))
+            state.cooldown_until = now + retry_after
+            # The quota is spent for now: empty the request bucket as well
+            state.requests.level = min(state.requests.level, 0.0)
+
+    def stats(self):
+        """Per-key counters for the UI and logs."""
+        with self._lock:
+            now = self.clock()
+            return [{
+                'key': f"#{s.index + 1}",
+                'sent': s.sent,
+                'succeeded': s.succeeded,
+                'rate_limited': s.rate_limited,
+                'failed': s.failed,
+                'in_flight': s.in_flight,
+                'tokens_used': s.tokens_used,
+                'cooldown_s': max(0.0, s.cooldown_until - now),
+                'requests_left': int(s.requests.available(now)),
+                'exhausted_in_s': self.exhausted_in(s),
+                'last_error': s.last_error,
+            } for s in self.states]
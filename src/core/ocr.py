@@ -0,0 +1,192 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+
+class OCRResult:
+    """Text read from a screenshot, its mean word confidence (0-100) and how long it took."""
+
+    def __init__(self, text, confidence, words, ocr_s):
+        self.text = text
+        self.confidence = confidence
+        self.words = words
+        self.ocr_s = ocr_s
+
+    def describe(self):
+        return f"{self.words} words at {self.confidence:.0f}% confidence, {1000 * self.ocr_s:.0f} ms"
+
+
+def _warm():
+    import pytesseract
+    return str(pytesseract.get_tesseract_version())
+
+
+def _read_band(image, top, lang, config):
+    """Words of one band as (block, paragraph, line, left, top, width, height, conf, text); runs in a pool process."""
+    import pytesseract
+    data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data['text']):
+        text = text.strip()
+        if text:
+            words.append((data['block_num'][i], data['par_num'][i], data['line_num'][i], data['left'][i],
+                          top + data['top'][i], data['width'][i], data['height'][i], float(data['conf'][i]), text))
+    return words
+
+
+def layout_text(bands):
+    """Join the words of each band into lines, keeping indentation, column gaps and blank lines.
+
+    Indentation and wide gaps become spaces using the median character
+    width and vertical gaps of more than a line become blank lines, so
+    code keeps its structure.
+    """
+    lines = []
+    for band in bands:
+        grouped = {}
+        for word in band:
+            grouped.setdefault(word[:3], []).append(word)
+        lines.extend(sorted(line, key=lambda w: w[3]) for line in grouped.values())
+    if not lines:
+        return ""
+    words = [word for line in lines for word in line]
+    char = max(1.0, statistics.median([w[5] / len(w[8]) for w in words if len(w[8]) > 1] or [w[5] for w in words]))
+    pitch = max(1.0, statistics.median(w[6] for w in words) * 1.5)
+    margin = min(w[3] for w in words)
+    text_lines = []
+    previous_top = None
+    for line in lines:
+        top = min(w[4] for w in line)
+        if previous_top is not None:
+            text_lines.extend([""] * min(2, max(0, round((top - previous_top) / pitch) - 1)))
+        previous_top = top
+        text = " " * round((line[0][3] - margin) / char) + line[0][8]
+        for before, word in zip(line, line[1:]):
+            gap = round((word[3] - before[3] - before[5]) / char)
+            text += " " * (gap if gap > 2 else 1) + word[8]
+        text_lines.append(text)
+    return "\n".join(text_lines)
+
+
+def confidence(bands):
+    """Mean word confidence weighted by word length; Tesseract marks non-words with -1."""
+    scored = [(w[7], len(w[8])) for band in bands for w in band if w[7] >= 0]
+    total = sum(length for _, length in scored)
+    return sum(conf * length for conf, length in scored) / total if total else 0.0
+
+
+def split_bands(gray, count, min_height=200):
+    """(top, bottom) rows of up to ``count`` horizontal bands, cut on the emptiest rows near even splits."""
+    height = gray.shape[0]
+    count = max(1, min(count, height // min_height))
+    # The flattest rows are the gaps between text lines
+    ink = gray.std(axis=1)
+    cuts = [0]
+    window = height // (4 * count)
+    for i in range(1, count):
+        target = height * i // count
+        low, high = max(cuts[-1] + 1, target - window), min(height - 1, target + window)
+        cuts.append(low + int(np.argmin(ink[low:high + 1])) if high >= low else target)
+    cuts.append(height)
+    return [(top, bottom) for top, bottom in zip(cuts, cuts[1:]) if bottom > top]
+
+
+class ScreenshotOCR:
+    """Local OCR of screenshots with Tesseract in a process pool.
+
+    Captures are converted to grayscale (dark themes inverted to dark text
+    on light), small ones upscaled to ``upscale`` times when under
+    ``upscale_below`` pixels, and split into up to ``workers`` horizontal
+    bands read in parallel. ``plan`` picks what to send for a result:
+    'text' when at least ``min_words`` were read at ``min_confidence`` or
+    better, 'thumbnail' (text plus a small image) below that, and 'image'
+    when there is too little text for OCR to help.
+    """
+
+    def __init__(self, workers=2, lang='eng', min_confidence=80, min_words=5, upscale=2,
+                 upscale_below=2_500_000, timeout=10):
+        import pytesseract
+        # Raises TesseractNotFoundError when the tesseract binary isn't installed
+        self.version = str(pytesseract.get_tesseract_version())
+        self.workers = max(1, workers)
+        self.lang = lang
+        # Assume a single uniform block of text per band and keep spacing between words
+        self.config = '--psm 6 -c preserve_interword_spaces=1'
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.upscale = upscale
+        self.upscale_below = upscale_below
+        self.timeout = timeout
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._lock = threading.Lock()
+        # Start the worker processes now rather than on the first screenshot
+        for _ in range(self.workers):
+            self._pool.submit(_warm)
+        self.runs = 0
+        self.text_only = 0
+        self.with_thumbnail = 0
+        self.ocr_s = 0.0
+
+    def prepare(self, image):
+        gray = image.convert('L')
+        if np.asarray(gray.resize((64, 64))).mean() < 128:
+            gray = ImageOps.invert(gray)
+        if self.upscale > 1 and gray.width * gray.height < self.upscale_below:
+            gray = gray.resize((gray.width * self.upscale, gray.height * self.upscale), Image.Resampling.BICUBIC)
+        return gray
+
+    def recognize(self, image):
+        """OCRResult for a PIL image."""
+        start = time.perf_counter()
+        gray = self.prepare(image)
+        bands = split_bands(np.asarray(gray, dtype=np.int16), self.workers)
+        futures = [self._pool.submit(_read_band, gray.crop((0, top, gray.width, bottom)), top, self.lang, self.config)
+                   for top, bottom in bands]
+        words = [future.result(timeout=self.timeout) for future in futures]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.runs += 1
+            self.ocr_s += elapsed
+        return OCRResult(layout_text(words), confidence(words), sum(len(band) for band in words), elapsed)
+
+    def plan(self, result):
+        """'text', 'thumbnail' or 'image' for an OCRResult."""
+        if result is None or result.words < self.min_words:
+            return 'image'
+        kind = 'text' if result.confidence >= self.min_confidence else 'thumbnail'
+        with self._lock:
+            if kind == 'text':
+                self.text_only += 1
+            else:
+                self.with_thumbnail += 1
+        return kind
+
+    def stats(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'text_only': self.text_only,
+                'with_thumbnail': self.with_thumbnail,
+                'avg_ms': 1000 * self.ocr_s / self.runs if self.runs else 0.0,
+            }
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_ocr(mode, workers=2, min_confidence=80, min_words=5):
+    """Build the OCR stage for a SCREENSHOT_OCR setting, or None when disabled or unavailable."""
+    mode = (mode or 'off').lower()
+    if mode in ('off', 'none', '0', 'false'):
+        return None
+    try:
+        return ScreenshotOCR(workers, min_confidence=min_confidence, min_words=min_words)
+    except ImportError:
+        print("pytesseract is not installed, screenshots are sent as images")
+    except Exception as e:
+        print(f"Tesseract is not available, screenshots are sent as images: {e}")
+    return None
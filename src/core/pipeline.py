@@ -0,0 +1,306 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+# pyaudio.paInputOverflowed; kept here so the pipeline doesn't need PyAudio
+PA_INPUT_OVERFLOWED = -9981
+
+
+class RingBuffer:
+    """Preallocated single-producer/single-consumer sample ring.
+
+    The writer only advances ``_written`` and the reader only advances
+    ``_read``, so neither side takes a lock on the data path. When the ring
+    is full new samples are dropped and counted instead of blocking the
+    capture thread.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=dtype)
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+
+    def available(self):
+        """Samples ready to be read."""
+        return self._written - self._read
+
+    def free(self):
+        """Samples that can be written without dropping."""
+        return self.capacity - (self._written - self._read)
+
+    def write(self, samples):
+        """Append samples, returning how many fit."""
+        n = min(len(samples), self.free())
+        if n < len(samples):
+            self.dropped += len(samples) - n
+        if n:
+            start = self._written % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:n]
+            self._written += n
+        return n
+
+    def read_into(self, out):
+        """Fill ``out`` with the oldest samples, returning how many were copied."""
+        n = min(len(out), self.available())
+        if n:
+            start = self._read % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._data[start:start + first]
+            out[first:n] = self._data[:n - first]
+            self._read += n
+        return n
+
+    def clear(self):
+        self._read = self._written
+
+
+class StageStats:
+    """Running latency statistics for one pipeline stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avg_ms': 1000 * self.total / self.count if self.count else 0.0,
+            'max_ms': 1000 * self.max,
+            'last_ms': 1000 * self.last,
+        }
+
+
+class AudioPipeline:
+    """Capture, convert and push audio on three decoupled threads.
+
+    ``read_fn()`` returns raw interleaved int16 frames and may block on the
+    device; an empty result marks the end of the source. ``convert_fn(samples)``
+    turns one chunk of int16 samples into the payload for ``push_fn(payload)``.
+    Capture only ever writes into the ring buffer, so a stalled push can never
+    hold up the device read; the bounded push queue drops its oldest chunk
+    instead of growing without limit.
+
+    Offline sources set ``lossless=True`` so capture and conversion wait for
+    space instead of dropping, letting files run as fast as the stages allow.
+    An enabled ``tracer`` gets one 'capture' span per chunk, from leaving the
+    device to being pushed.
+    """
+
+    STAGES = ('capture', 'convert', 'push', 'latency')
+
+    def __init__(self, read_fn, convert_fn, push_fn, channels, rate,
+                 frames_per_chunk=1024, ring_seconds=2.0, queue_size=32, on_error=None, lossless=False,
+                 tracer=None):
+        self.read_fn = read_fn
+        self.convert_fn = convert_fn
+        self.push_fn = push_fn
+        self.channels = int(channels)
+        self.rate = int(rate)
+        self.frames_per_chunk = int(frames_per_chunk)
+        self.on_error = on_error
+        self.lossless = lossless
+        self.tracer = tracer
+
+        self.ring = RingBuffer(int(ring_seconds * self.rate) * self.channels)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._chunk = np.zeros(self.frames_per_chunk * self.channels, dtype=np.int16)
+        self._data_ready = threading.Event()
+        self._space_ready = threading.Event()
+        self._threads = []
+        self.running = False
+        self.source_finished = False
+        self._converting = False
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.stats = {name: StageStats() for name in self.STAGES}
+        self.captured_frames = 0
+        self.pushed_frames = 0
+        self.overflows = 0
+        self.overflow_frames = 0
+        self.dropped_chunks = 0
+        self.ring.dropped = 0
+        self.started_at = time.monotonic()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.source_finished = False
+        self.started_at = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='audio-capture', daemon=True),
+            threading.Thread(target=self._convert_loop, name='audio-convert', daemon=True),
+            threading.Thread(target=self._push_loop, name='audio-push', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        self._data_ready.set()
+        self._space_ready.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def drain(self, timeout=None):
+        """Wait until a finite source has been fully pushed, then stop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.running:
+            idle = self.ring.available() == 0 and not self._converting and self.queue.unfinished_tasks == 0
+            if self.source_finished and idle:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        self.stop()
+
+    def _fail(self, stage, error):
+        self.running = False
+        self._data_ready.set()
+        self._space_ready.set()
+        if self.on_error:
+            self.on_error(stage, error)
+
+    def _capture_loop(self):
+        while self.running:
+            try:
+                data = self.read_fn()
+            except OSError as e:
+                if e.errno != PA_INPUT_OVERFLOWED:
+                    # Unplugged or failed device: retrying would spin
+                    self._fail('capture', e)
+                    return
+                # Device overflow: the driver already discarded this chunk
+                self.overflows += 1
+                self.overflow_frames += self.frames_per_chunk
+                continue
+            except Exception as e:
+                self._fail('capture', e)
+                return
+
+            if not data:
+                self.source_finished = True
+                self._data_ready.set()
+                return
+
+            start = time.perf_counter()
+            samples = np.frombuffer(data, dtype=np.int16)
+            if self.lossless:
+                while self.running and self.ring.free() < len(samples):
+                    self._space_ready.wait(0.1)
+                    self._space_ready.clear()
+            self.ring.write(samples)
+            self.captured_frames += len(samples) // self.channels
+            self._data_ready.set()
+            self.stats['capture'].record(time.perf_counter() - start)
+
+    def _convert_loop(self):
+        chunk = self._chunk
+        samples_per_second = self.rate * self.channels
+        while self.running:
+            finished = self.source_finished
+            available = self.ring.available()
+            # A finished source's last, partial chunk is flushed as is
+            if available < len(chunk) and not (finished and available):
+                self._data_ready.wait(0.1)
+                self._data_ready.clear()
+                continue
+
+            self._converting = True
+            block = chunk if available >= len(chunk) else chunk[:available]
+            backlog = available - len(block)
+            start = time.perf_counter()
+            self.ring.read_into(block)
+            self._space_ready.set()
+            try:
+                payload = self.convert_fn(block)
+            except Exception as e:
+                self._fail('convert', e)
+                return
+            now = time.perf_counter()
+            self.stats['convert'].record(now - start)
+
+            if payload is not None and len(payload):
+                # Age of the chunk when it left the ring, carried to the push stage
+                age = backlog / samples_per_second + (now - start)
+                self._enqueue((payload, now, age, len(block) // self.channels))
+            self._converting = False
+
+    def _enqueue(self, item):
+        if self.lossless:
+            while self.running:
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            return
+
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped_chunks += 1
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(item)
+
+    def _push_loop(self):
+        while self.running:
+            try:
+                payload, queued_at, age, frames = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.push_fn(payload)
+            except Exception as e:
+                self._fail('push', e)
+                return
+            finally:
+                self.queue.task_done()
+            end = time.perf_counter()
+            latency = age + (end - queued_at)
+            self.stats['push'].record(end - start)
+            self.stats['latency'].record(latency)
+            if self.tracer:
+                self.tracer.record('capture', end - latency, end)
+            self.pushed_frames += frames
+
+    def metrics(self):
+        """Snapshot of throughput, backpressure and per-stage latency."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'captured_frames': self.captured_frames,
+            'pushed_frames': self.pushed_frames,
+            'dropped_frames': self.ring.dropped // self.channels
+                              + self.overflow_frames
+                              + self.dropped_chunks * self.frames_per_chunk,
+            'overflows': self.overflows,
+            'dropped_chunks': self.dropped_chunks,
+            'ring_fill': self.ring.available() / self.ring.capacity,
+            'queue_depth': self.queue.qsize(),
+            'realtime_factor': self.pushed_frames / self.rate / elapsed,
+            'stages': {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
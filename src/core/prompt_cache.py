@@ -0,0 +1,147 @@
+import hashlib
+import threading
+import time
+
+from google.genai import types
+
+
+def is_cache_miss(error):
+    """True when a request named cached content the API no longer has (expired, deleted or another key's)."""
+    error_str = str(error).lower()
+    if "cachedcontent" not in error_str and "cached content" not in error_str:
+        return False
+    return "not found" in error_str or "permission" in error_str
+
+
+class PromptCache:
+    """The system instruction uploaded once per API key as Gemini cached content.
+
+    Cached content belongs to the project behind a key, so every key gets
+    its own copy per model. ``config`` hands chats ``cached_content`` once
+    a copy exists and the inline ``system_instruction`` until then, so a
+    request never waits for an upload: creation runs in the background
+    (or in the caller with ``wait=True``, as the warm-up does). Copies are kept
+    alive by extending their TTL when fewer than ``refresh_before``
+    seconds are left, replaced when the instruction changes, and skipped
+    for instructions under ``min_tokens`` (the API's minimum cache size).
+    A failed upload falls back to inline instructions and is not retried
+    for ``retry_after`` seconds.
+    """
+
+    def __init__(self, ttl=3600, refresh_before=300, min_tokens=1024, retry_after=600, clock=None):
+        self.ttl = ttl
+        self.refresh_before = min(refresh_before, ttl / 2)
+        self.min_tokens = min_tokens
+        self.retry_after = retry_after
+        self.clock = clock or time.monotonic
+        # (api_key, model) -> {'digest', 'name', 'expires', 'tokens'}
+        self._entries = {}
+        self._failed = {}
+        # slot -> Event set when its upload finishes
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.refreshed = 0
+        self.failures = 0
+
+    @staticmethod
+    def digest(instruction):
+        return hashlib.sha256(instruction.encode('utf-8')).hexdigest()
+
+    def config(self, client, api_key, model, instruction, wait=False):
+        """Chat config for ``model`` on ``api_key``: cached content when ready, else the inline instruction."""
+        inline = {'system_instruction': instruction}
+        if len(instruction) // 4 < self.min_tokens:
+            return inline
+        slot = (api_key, model)
+        digest = self.digest(instruction)
+        with self._lock:
+            pending = self._pending.get(slot)
+            start = pending is None and self._due(slot, digest)
+            if start:
+                pending = self._pending[slot] = threading.Event()
+        if start and wait:
+            self._prepare(client, slot, instruction, digest)
+        elif start:
+            threading.Thread(target=self._prepare, args=(client, slot, instruction, digest),
+                             name='gemini-prompt-cache', daemon=True).start()
+        elif pending is not None and wait:
+            pending.wait(60)
+        with self._lock:
+            entry = self._usable(slot, digest)
+        return {'cached_content': entry['name']} if entry else inline
+
+    def _usable(self, slot, digest):
+        entry = self._entries.get(slot)
+        # A small margin so a request never names content that expires in flight
+        if entry and entry['digest'] == digest and entry['expires'] - self.clock() > 30:
+            return entry
+        return None
+
+    def _due(self, slot, digest):
+        entry = self._usable(slot, digest)
+        if entry is not None:
+            return entry['expires'] - self.clock() < self.refresh_before
+        return self._failed.get(slot + (digest,), 0) <= self.clock()
+
+    def _prepare(self, client, slot, instruction, digest):
+        """Create, refresh or replace the cached content for ``slot``."""
+        api_key, model = slot
+        try:
+            with self._lock:
+                entry = self._usable(slot, digest)
+                stale = self._entries.get(slot) if entry is None else None
+            now = self.clock()
+            if entry is not None:
+                try:
+                    client.caches.update(name=entry['name'],
+                                         config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"))
+                    with self._lock:
+                        entry['expires'] = now + self.ttl
+                        self.refreshed += 1
+                    return
+                except Exception as e:
+                    print(f"Gemini prompt cache refresh failed, re-uploading: {e}")
+            cache = client.caches.create(model=model, config=types.CreateCachedContentConfig(
+                system_instruction=instruction,
+                ttl=f"{self.ttl}s",
+                display_name='interview-cracker-system-prompt'
+            ))
+            tokens = getattr(cache.usage_metadata, 'total_token_count', None) if cache.usage_metadata else None
+            with self._lock:
+                self._entries[slot] = {'digest': digest, 'name': cache.name, 'expires': now + self.ttl,
+                                       'tokens': tokens}
+                self.created += 1
+            print(f"Gemini prompt cache {cache.name} ready for {model} ({tokens or '?'} tokens)")
+            if stale is not None and stale['name'] != cache.name:
+                self._delete(client, stale['name'])
+        except Exception as e:
+            with self._lock:
+                self._failed[slot + (digest,)] = self.clock() + self.retry_after
+                self.failures += 1
+            print(f"Gemini prompt cache unavailable for {model}, sending the instruction inline: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(slot).set()
+
+    @staticmethod
+    def _delete(client, name):
+        try:
+            client.caches.delete(name=name)
+        except Exception as e:
+            # It expires with its TTL anyway
+            print(f"Gemini prompt cache {name} not deleted: {e}")
+
+    def invalidate(self, api_key, model):
+        """Forget the copy for a key and model after the API stopped recognising it."""
+        with self._lock:
+            self._entries.pop((api_key, model), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'caches': len(self._entries),
+                'created': self.created,
+                'refreshed': self.refreshed,
+                'failures': self.failures,
+            }
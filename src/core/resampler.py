@@ -0,0 +1,128 @@
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+
+@lru_cache(maxsize=None)
+def design_polyphase_filter(orig_rate, target_rate):
+    """Design the polyphase FIR bank for a rate pair (cached per pair).
+
+    Returns (up, down, bank) where bank[p] holds the time-reversed taps of
+    phase p, scaled by the interpolation factor so the passband gain is 1.
+    """
+    g = gcd(int(orig_rate), int(target_rate))
+    up, down = int(target_rate) // g, int(orig_rate) // g
+    if up == down:
+        bank = np.ones((1, 1), dtype=np.float32)
+        bank.setflags(write=False)
+        return up, down, bank
+
+    # Same prototype as scipy.signal.resample_poly
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    taps = taps * up
+
+    taps_per_phase = -(-len(taps) // up)
+    padded = np.zeros(taps_per_phase * up)
+    padded[:len(taps)] = taps
+    bank = padded.reshape(taps_per_phase, up).T[:, ::-1]
+    bank = np.ascontiguousarray(bank, dtype=np.float32)
+    bank.setflags(write=False)
+    return up, down, bank
+
+
+class StreamingResampler:
+    """Stateful polyphase resampler for continuous chunked audio.
+
+    Filter history and output phase are carried between calls, so feeding a
+    signal in chunks produces the same samples as feeding it in one piece,
+    without the per-chunk FFT and boundary artifacts of ``resample_audio``.
+    Lookup tables and buffers are preallocated and only grow when a larger
+    chunk arrives.
+    """
+
+    def __init__(self, orig_rate, target_rate=16000, max_chunk=4096):
+        self.orig_rate = int(orig_rate)
+        self.target_rate = int(target_rate)
+        self.up, self.down, self.bank = design_polyphase_filter(self.orig_rate, self.target_rate)
+        self.taps_per_phase = self.bank.shape[1]
+        # Output n of a chunk starting at upsampled offset o uses phase
+        # (o + n*down) % up. Because down is invertible mod up, that is
+        # entry n + n0 of one fixed phase sequence, so coefficients and
+        # input start indices are contiguous slices of precomputed tables.
+        self._down_inverse = pow(self.down, -1, self.up) if self.up > 1 else 0
+        self._allocate(max_chunk)
+        self.reset()
+
+    def _allocate(self, max_chunk):
+        self.max_chunk = int(max_chunk)
+        max_out = self.output_size(self.max_chunk)
+        hist = self.taps_per_phase - 1
+
+        self._input = np.zeros(hist + self.max_chunk, dtype=np.float32)
+        self._windows = sliding_window_view(self._input, self.taps_per_phase)
+        self._result = np.empty(max_out, dtype=np.float32)
+        self._starts = np.empty(max_out, dtype=np.int64)
+
+        steps = np.arange(self.up + max_out, dtype=np.int64) * self.down
+        self._step_starts = steps // self.up
+        self._step_coeffs = np.ascontiguousarray(self.bank[steps % self.up])
+
+    def reset(self):
+        """Forget filter history, e.g. when the capture device changes."""
+        self._input[:self.taps_per_phase - 1] = 0.0
+        # Position of the next output sample in the upsampled domain,
+        # relative to the first sample of the next input chunk.
+        self._offset = 0
+
+    def output_size(self, n_frames):
+        """Upper bound on output samples produced for n_frames of input."""
+        return -(-int(n_frames) * self.up // self.down) + 1
+
+    def process(self, samples, out=None):
+        """Resample one chunk of mono samples.
+
+        Returns float32 samples in the input's scale. When ``out`` is given
+        the result is written into it, otherwise into an internal buffer
+        that is reused by the next call.
+        """
+        samples = np.asarray(samples)
+        n = len(samples)
+        hist = self.taps_per_phase - 1
+        if n > self.max_chunk:
+            history = self._input[:hist].copy()
+            self._allocate(n)
+            self._input[:hist] = history
+
+        self._input[hist:hist + n] = samples
+
+        count = max(0, -(-(n * self.up - self._offset) // self.down))
+        result = self._result[:count] if out is None else out[:count]
+
+        if self.up == 1:
+            # Integer decimation: the windows are a plain strided view
+            windows = self._windows[self._offset:self._offset + count * self.down:self.down]
+            np.einsum('ij,j->i', windows, self.bank[0], out=result)
+        else:
+            first = (self._offset * self._down_inverse) % self.up
+            shift = (first * self.down - self._offset) // self.up
+            starts = self._starts[:count]
+            np.subtract(self._step_starts[first:first + count], shift, out=starts)
+            windows = self._windows[starts]
+            coeffs = self._step_coeffs[first:first + count]
+            np.einsum('ij,ij->i', windows, coeffs, out=result)
+
+        self._offset += count * self.down - n * self.up
+        self._input[:hist] = self._input[n:n + hist]
+        return result
+
+    def process_int16(self, samples):
+        """Resample one chunk and return clipped int16 samples."""
+        result = self.process(samples)
+        np.rint(result, out=result)
+        np.clip(result, -32768, 32767, out=result)
+        return result.astype(np.int16)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import zlib
+from collections import OrderedDict
+
+from src.core.speculation import normalize_text
+
+# Mersenne prime for the MinHash permutations
+_PRIME = (1 << 61) - 1
+
+
+class MinHasher:
+    """MinHash signatures over character n-grams of normalized text."""
+
+    def __init__(self, num_perm=64, ngram=3, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self.perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def shingles(self, text):
+        text = f" {text} "
+        if len(text) <= self.ngram:
+            return {text}
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, text):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in self.shingles(text)]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self.perms)
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """Estimated Jaccard similarity of the two shingle sets."""
+        return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class ResponseCache:
+    """Answers to earlier questions, keyed on question, model, instructions and context.
+
+    Exact lookups use the normalized question text. With ``similarity``
+    set (0-1), a miss falls back to near-duplicate questions found through
+    banded MinHash buckets and accepted when their estimated Jaccard
+    similarity reaches the threshold. Only standalone questions of at
+    least ``min_words`` words are cached, and ``context`` (a digest of the
+    preceding turns) is part of the key, so a short follow-up like "why?"
+    never replays an answer given in another conversation. Entries are
+    evicted least recently used beyond ``max_entries`` and saved to
+    ``path`` as JSON on a background timer ``save_delay`` seconds after a
+    change.
+    """
+
+    def __init__(self, path=None, max_entries=500, similarity=0.0, num_perm=64, bands=16, min_words=4,
+                 save_delay=2.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.min_words = min_words
+        self.save_delay = save_delay
+        self._save_timer = None
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def scope(model, instruction, context=''):
+        """Answers are only reused for the same model, system instruction and preceding turns."""
+        return hashlib.sha1(f"{model}\0{instruction}\0{context}".encode('utf-8')).hexdigest()[:16]
+
+    def _question(self, text):
+        question = normalize_text(text)
+        return question if len(question.split()) >= self.min_words else None
+
+    def _band_keys(self, scope, signature):
+        return [(scope, band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def get(self, text, model, instruction, context=''):
+        """Cached answer chunks for ``text``, or None."""
+        question = self._question(text)
+        if not question:
+            return None
+        scope = self.scope(model, instruction, context)
+        with self._lock:
+            entry = self._entries.get((scope, question))
+            if entry is None and self.similarity:
+                entry = self._nearest(scope, question)
+                if entry is not None:
+                    self.similar_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end((scope, entry['question']))
+            return list(entry['chunks'])
+
+    def _nearest(self, scope, question):
+        signature = self.hasher.signature(question)
+        best, best_score = None, self.similarity
+        seen = set()
+        for band_key in self._band_keys(scope, signature):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry = self._entries[key]
+                score = self.hasher.similarity(signature, entry['signature'])
+                if score >= best_score:
+                    best, best_score = entry, score
+        return best
+
+    def put(self, text, model, instruction, chunks, context=''):
+        """Store the answer chunks for ``text``; the file is saved shortly afterwards."""
+        question = self._question(text)
+        if not question or not chunks:
+            return
+        scope = self.scope(model, instruction, context)
+        with self._lock:
+            self._insert(scope, question, list(chunks))
+            # Coalesce a burst of answers into one write, off the caller's thread
+            if self.path and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _insert(self, scope, question, chunks):
+        # Caller holds the lock
+        key = (scope, question)
+        if key in self._entries:
+            self._remove(key)
+        signature = self.hasher.signature(question)
+        self._entries[key] = {'question': question, 'chunks': chunks, 'signature': signature}
+        for band_key in self._band_keys(scope, signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for band_key in self._band_keys(key[0], entry['signature']):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Response cache not loaded from {self.path}: {e}")
+            return
+        with self._lock:
+            # Stored oldest first, so replaying the inserts restores the LRU order
+            for item in data.get('entries', []):
+                self._insert(item['scope'], item['question'], item['chunks'])
+
+    def flush(self):
+        """Save now if there are unsaved changes, e.g. on exit."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {'entries': [{'scope': scope, 'question': question, 'chunks': entry['chunks']}
+                                for (scope, question), entry in self._entries.items()]}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Response cache not saved to {self.path}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
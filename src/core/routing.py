@@ -0,0 +1,118 @@
+import json
+import re
+import threading
+from collections import deque
+
+# Phrases that mark a question worth the stronger model
+STRONG_PATTERNS = [
+    r"\bdesign\b", r"\barchitect", r"\bscal(e|ing|able)\b", r"\bdistributed\b", r"\btrade-?offs?\b",
+    r"\balgorithm", r"\bcomplexity\b", r"\bbig[- ]o\b", r"\bimplement", r"\bwrite (a|the|some)?\s*(code|function|program|query)",
+    r"\bcode\b", r"\bdebug", r"\boptimi[sz]", r"\bwalk (me )?through\b", r"\bstep by step\b",
+    r"\bcompare\b", r"\bdifference between\b", r"\bpros and cons\b", r"\bwhy would\b", r"\bhow would you\b",
+    r"\btell me about a time\b", r"\bconcurren", r"\bconsisten", r"\bdatabase schema\b",
+]
+# Short follow-ups and clarifications that a fast model answers just as well
+FAST_PATTERNS = [
+    r"^(yes|no|yeah|okay|ok|right|sure|thanks|thank you)\b", r"\bwhat do you mean\b", r"\bcan you repeat\b",
+    r"\bsay (that|it) again\b", r"\bstands? for\b", r"\bwhat does \w+ mean\b", r"\bdefine\b",
+    r"\bhow do you spell\b", r"\bis that (right|correct)\b", r"\bone (word|line|sentence)\b",
+]
+
+
+class ModelRouter:
+    """Pick a fast or a strong model for each request.
+
+    Screenshots go to the strong model. Text is scored from its length and
+    from keyword patterns: system-design, coding and behavioural questions
+    count towards the strong model, clarifications and short follow-ups
+    towards the fast one. Both models share the same chat history, so a
+    follow-up routed differently still sees the whole conversation.
+
+    Each request's route, reason, time to first chunk and total time are
+    kept in per-route windows for ``stats()`` and appended to ``log_path``
+    as JSONL when set; the file is opened on the first record, and a path
+    that can't be opened only turns logging off.
+    """
+
+    def __init__(self, fast_model, strong_model, fast_max_words=12, strong_min_words=40,
+                 screenshots='strong', log_path=None, window=200):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.fast_max_words = fast_max_words
+        self.strong_min_words = strong_min_words
+        self.screenshots = screenshots
+        self.window = window
+        self._strong = [re.compile(p, re.IGNORECASE) for p in STRONG_PATTERNS]
+        self._fast = [re.compile(p, re.IGNORECASE) for p in FAST_PATTERNS]
+        self._lock = threading.Lock()
+        self._latency = {'fast': deque(maxlen=window), 'strong': deque(maxlen=window)}
+        self.counts = {'fast': 0, 'strong': 0}
+        self.log_path = log_path
+        self._log = None
+        # Opened on the first record; dropped for good if that fails
+        self._log_pending = bool(log_path)
+
+    def classify(self, message):
+        """Return (route, reason) for a message (text or a list of parts)."""
+        parts = message if isinstance(message, list) else [message]
+        if any(not isinstance(part, str) for part in parts):
+            return self.screenshots, 'screenshot'
+        text = " ".join(parts)
+        words = len(text.split())
+        strong_hits = [p.pattern for p in self._strong if p.search(text)]
+        if words >= self.strong_min_words:
+            return 'strong', f"{words} words"
+        if strong_hits:
+            return 'strong', f"keyword {strong_hits[0]}"
+        if any(p.search(text) for p in self._fast):
+            return 'fast', 'clarification'
+        if words <= self.fast_max_words:
+            return 'fast', f"{words} words"
+        return 'strong', f"{words} words"
+
+    def route(self, message):
+        """Decision dict with 'route', 'model' and 'reason' for a message."""
+        route, reason = self.classify(message)
+        model = self.fast_model if route == 'fast' else self.strong_model
+        with self._lock:
+            self.counts[route] += 1
+        return {'route': route, 'model': model, 'reason': reason}
+
+    def record(self, decision, first_chunk_s, total_s, error=None):
+        """Store the latency of a routed request."""
+        with self._lock:
+            if error is None:
+                self._latency[decision['route']].append((first_chunk_s, total_s))
+            if self._log_pending:
+                self._open_log()
+            if self._log:
+                entry = dict(decision, first_chunk_ms=round(1000 * first_chunk_s, 1),
+                             total_ms=round(1000 * total_s, 1))
+                if error is not None:
+                    entry['error'] = str(error)[:200]
+                self._log.write(json.dumps(entry) + "\n")
+                self._log.flush()
+
+    def _open_log(self):
+        # Caller holds the lock
+        self._log_pending = False
+        try:
+            self._log = open(self.log_path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"Warning: routing log {self.log_path} could not be opened, decisions are not logged: {e}")
+
+    def stats(self):
+        """Requests and p50/p95 time to first chunk per route, in milliseconds."""
+        with self._lock:
+            windows = {route: sorted(v[0] for v in values) for route, values in self._latency.items()}
+            counts = dict(self.counts)
+        result = {}
+        for route, values in windows.items():
+            n = len(values)
+            result[route] = {
+                'model': self.fast_model if route == 'fast' else self.strong_model,
+                'requests': counts[route],
+                'p50_first_chunk_ms': 1000 * values[int(0.5 * (n - 1))] if n else None,
+                'p95_first_chunk_ms': 1000 * values[int(0.95 * (n - 1))] if n else None,
+            }
+        return result
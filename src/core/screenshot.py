@@ -0,0 +1,236 @@
+import io
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+FORMATS = {'png': ('PNG', 'image/png'), 'jpeg': ('JPEG', 'image/jpeg'), 'webp': ('WEBP', 'image/webp')}
+
+
+class EncodedImage:
+    """Encoded screenshot bytes with their mime type and how they were produced."""
+
+    def __init__(self, data, mime_type, size, source_size, encode_s):
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.source_size = source_size
+        self.encode_s = encode_s
+
+    def describe(self):
+        fmt = self.mime_type.split('/')[-1].upper()
+        return f"{fmt} {self.size[0]}x{self.size[1]}, {len(self.data) // 1024} KB, {1000 * self.encode_s:.0f} ms"
+
+
+class ScreenshotEncoder:
+    """Downscale and compress screenshots before they are sent to Gemini.
+
+    Images larger than ``max_side`` on their long side are scaled down
+    (Gemini tiles large images anyway, so more pixels mostly cost upload
+    time and tokens). ``image_format`` is 'png', 'jpeg', 'webp' or 'auto':
+    auto encodes text and UI captures as PNG with a ``palette`` of at most
+    that many colours, which keeps small text sharp where JPEG artefacts
+    would blur it (the palette keeps the anti-aliasing a downscale adds
+    from bloating the file), and photo-like captures (video calls, slides
+    with pictures) with ``lossy_format`` at ``quality``. A capture counts
+    as text/UI when its ``flat_colors`` most common colours cover at least
+    ``flat_share`` of a small thumbnail. 'png' is always lossless.
+    """
+
+    def __init__(self, max_side=2048, image_format='auto', lossy_format='jpeg', quality=80,
+                 palette=256, flat_colors=32, flat_share=0.8):
+        if image_format not in FORMATS and image_format != 'auto':
+            raise ValueError(f"Unknown screenshot format: {image_format}")
+        if lossy_format not in ('jpeg', 'webp'):
+            raise ValueError(f"Unknown lossy screenshot format: {lossy_format}")
+        self.max_side = max_side
+        self.image_format = image_format
+        self.lossy_format = lossy_format
+        self.quality = quality
+        self.palette = palette
+        self.flat_colors = flat_colors
+        self.flat_share = flat_share
+
+    def is_text_like(self, image):
+        """True if a few flat colours dominate the image, as in code, documents and UI."""
+        scale = max(image.size) / 256
+        thumb = image.resize((max(1, int(image.width / scale)), max(1, int(image.height / scale))),
+                             Image.Resampling.NEAREST) if scale > 1 else image
+        colors = thumb.convert('RGB').getcolors(maxcolors=thumb.width * thumb.height)
+        counts = sorted((count for count, _ in colors), reverse=True)
+        return sum(counts[:self.flat_colors]) >= self.flat_share * thumb.width * thumb.height
+
+    def choose_format(self, image):
+        if self.image_format != 'auto':
+            return self.image_format
+        return 'png' if self.is_text_like(image) else self.lossy_format
+
+    def resize(self, image):
+        if not self.max_side or max(image.size) <= self.max_side:
+            return image
+        scale = self.max_side / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # Bilinear with reducing_gap (whole-factor reduce first) keeps text legible at a
+        # fraction of LANCZOS's cost on 4K captures
+        return image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    def encode(self, image):
+        """Encode a PIL image; returns an EncodedImage."""
+        start = time.perf_counter()
+        source_size = image.size
+        fmt = self.choose_format(image)
+        image = self.resize(image)
+        if image.mode not in ('RGB', 'L') and fmt != 'png':
+            image = image.convert('RGB')
+        pil_format, mime_type = FORMATS[fmt]
+        out = io.BytesIO()
+        if fmt == 'png' and self.image_format == 'auto' and self.palette:
+            image = image.convert('RGB').quantize(self.palette, method=Image.Quantize.FASTOCTREE,
+                                                  dither=Image.Dither.NONE)
+            image.save(out, format=pil_format)
+        elif fmt == 'png':
+            # Low zlib effort: a few percent larger, several times faster on large captures
+            image.save(out, format=pil_format, compress_level=1)
+        elif fmt == 'jpeg':
+            image.save(out, format=pil_format, quality=self.quality)
+        else:
+            image.save(out, format=pil_format, quality=self.quality, method=3)
+        return EncodedImage(out.getvalue(), mime_type, image.size, source_size, time.perf_counter() - start)
+
+
+def dhash(image, size=8):
+    """64-bit difference hash: brightness gradients of a tiny grayscale thumbnail."""
+    pixels = np.asarray(image.convert('L').resize((size + 1, size), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join('1' if b else '0' for b in bits), 2)
+
+
+class FrameChange:
+    """How a capture differs from the last submitted one.
+
+    ``kind`` is 'new' (send the whole frame), 'same' (nothing changed) or
+    'region' (only ``box``, in the capture's pixels, changed).
+    """
+
+    def __init__(self, kind, box=None, distance=None, dirty=1.0):
+        self.kind = kind
+        self.box = box
+        self.distance = distance
+        self.dirty = dirty
+
+
+class ScreenshotDiffer:
+    """Change detection between consecutive screenshots.
+
+    Each capture is compared with the last one submitted: a difference
+    hash catches a different screen cheaply, then a grayscale diff on
+    ``tile``-pixel tiles (at ``work_side`` resolution, ignoring per-pixel
+    changes up to ``noise``) finds the changed tiles. No changed tile
+    means the frame is the same; changed tiles covering at most
+    ``max_region`` of the frame give their bounding box, padded by a
+    tile, so only that region needs sending.
+
+    A frame only becomes the reference once the model has answered it
+    (``pending`` returns the commit to call then), so a cancelled or
+    failed request never leaves one behind. Asking again right after an
+    unchanged frame was skipped sends the whole frame.
+
+    Bytes saved are estimated against the size of the last full frame.
+    """
+
+    def __init__(self, tile=32, noise=24, max_region=0.5, hash_distance=16, work_side=1024):
+        self.tile = tile
+        self.noise = noise
+        self.max_region = max_region
+        self.hash_distance = hash_distance
+        self.work_side = work_side
+        self._lock = threading.Lock()
+        self._reference = None
+        self._hash = None
+        self._full_bytes = 0
+        self._skipped_last = False
+        self.frames = 0
+        self.skipped = 0
+        self.cropped = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+
+    def _work(self, image):
+        scale = min(1.0, self.work_side / max(image.size))
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return np.asarray(image.convert('L').resize(size, Image.Resampling.BILINEAR), dtype=np.int16), scale
+
+    def compare(self, image):
+        """FrameChange of ``image`` against the last submitted screenshot."""
+        with self._lock:
+            reference, ref_hash, skipped_last = self._reference, self._hash, self._skipped_last
+        work, scale = self._work(image)
+        if reference is None or reference.shape != work.shape:
+            return FrameChange('new')
+        distance = bin(dhash(image) ^ ref_hash).count('1')
+        if distance > self.hash_distance:
+            return FrameChange('new', distance=distance)
+
+        changed = np.abs(work - reference) > self.noise
+        rows, cols = -(-changed.shape[0] // self.tile), -(-changed.shape[1] // self.tile)
+        padded = np.zeros((rows * self.tile, cols * self.tile), dtype=bool)
+        padded[:changed.shape[0], :changed.shape[1]] = changed
+        tiles = padded.reshape(rows, self.tile, cols, self.tile).any(axis=(1, 3))
+        dirty = tiles.mean()
+        if not tiles.any():
+            # A second request for the same screen means the skip wasn't wanted
+            return FrameChange('new' if skipped_last else 'same', distance=distance, dirty=0.0)
+
+        ys, xs = np.nonzero(tiles)
+        top, bottom = max(0, ys.min() - 1), min(rows, ys.max() + 2)
+        left, right = max(0, xs.min() - 1), min(cols, xs.max() + 2)
+        if (bottom - top) * (right - left) > self.max_region * rows * cols:
+            return FrameChange('new', distance=distance, dirty=dirty)
+        box = tuple(min(limit, round(v * self.tile / scale)) for v, limit in (
+            (left, image.width), (top, image.height), (right, image.width), (bottom, image.height)))
+        return FrameChange('region', box=box, distance=distance, dirty=dirty)
+
+    def pending(self, image, change, sent_bytes):
+        """Commit function making ``image`` the reference and counting what was sent for it.
+
+        The image is reduced now, so its pixels may change before the commit.
+        """
+        work = self._work(image)[0]
+        image_hash = dhash(image)
+        return lambda: self._commit(work, image_hash, change, sent_bytes)
+
+    def submitted(self, image, change, sent_bytes):
+        """Make ``image`` the reference for the next capture and count what was sent for it."""
+        self.pending(image, change, sent_bytes)()
+
+    def _commit(self, work, image_hash, change, sent_bytes):
+        with self._lock:
+            self._reference, self._hash = work, image_hash
+            self._skipped_last = change.kind == 'same'
+            self.frames += 1
+            self.bytes_sent += sent_bytes
+            if change.kind == 'new':
+                self._full_bytes = sent_bytes
+                return
+            if change.kind == 'same':
+                self.skipped += 1
+            else:
+                self.cropped += 1
+            self.bytes_saved += max(0, self._full_bytes - sent_bytes)
+
+    def reset(self):
+        """Forget the reference, e.g. when the chat is cleared."""
+        with self._lock:
+            self._reference = self._hash = None
+            self._skipped_last = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'skipped': self.skipped,
+                'cropped': self.cropped,
+                'bytes_sent': self.bytes_sent,
+                'bytes_saved': self.bytes_saved,
+            }
@@ -0,0 +1,224 @@
+import time
+import wave
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class AudioSource(ABC):
+    """Interface for capture sources that produce interleaved int16 frames.
+
+    ``open()`` prepares the source and sets ``channels`` and ``rate``;
+    ``read(frames)`` returns up to that many frames as bytes, blocking for
+    real-time sources, and returns ``b''`` once the source is exhausted.
+    ``realtime`` tells the pipeline whether dropping frames under
+    backpressure is acceptable (live devices) or whether capture should wait
+    instead (files and synthetic benchmarks).
+    """
+
+    channels = 1
+    rate = 16000
+    realtime = False
+    name = "source"
+
+    def open(self):
+        return self
+
+    @abstractmethod
+    def read(self, frames):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LoopbackSource(AudioSource):
+    """WASAPI loopback capture of the default output device (Windows only)."""
+
+    realtime = True
+
+    def __init__(self, frames_per_buffer=1024):
+        self.frames_per_buffer = frames_per_buffer
+        self.device = None
+        self._pyaudio = None
+        self._stream = None
+
+    def resolve_device(self):
+        """Find the loopback twin of the default speakers without opening a stream."""
+        import pyaudiowpatch as pyaudio
+
+        if not self._pyaudio:
+            self._pyaudio = pyaudio.PyAudio()
+        p = self._pyaudio
+        wasapi_info = p.get_host_api_info_by_type(pyaudio.paWASAPI)
+        default_speakers = p.get_device_info_by_index(wasapi_info["defaultOutputDevice"])
+
+        loopback_device = None
+        if default_speakers.get("isLoopbackDevice"):
+            loopback_device = default_speakers
+        else:
+            for loopback in p.get_loopback_device_info_generator():
+                if default_speakers["name"] in loopback["name"]:
+                    loopback_device = loopback
+                    break
+
+        if not loopback_device:
+            raise RuntimeError("No loopback device found")
+
+        self.device = loopback_device
+        self.name = loopback_device["name"]
+        self.channels = loopback_device["maxInputChannels"]
+        self.rate = int(loopback_device["defaultSampleRate"])
+        return loopback_device
+
+    def open(self):
+        import pyaudiowpatch as pyaudio
+
+        if not self.device:
+            self.resolve_device()
+        self._stream = self._pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.frames_per_buffer,
+            input_device_index=self.device["index"]
+        )
+        return self
+
+    def read(self, frames):
+        # Overflows raise OSError(paInputOverflowed), which the pipeline counts as dropped frames
+        return self._stream.read(frames, exception_on_overflow=True)
+
+    def close(self):
+        try:
+            if self._stream:
+                self._stream.stop_stream()
+                self._stream.close()
+            if self._pyaudio:
+                self._pyaudio.terminate()
+        except Exception:
+            pass
+        self._stream = None
+        self._pyaudio = None
+        self.device = None
+
+
+class FileSource(AudioSource):
+    """Replay a 16-bit WAV (or FLAC, with the optional ``soundfile`` package).
+
+    With ``realtime=False`` the file is read as fast as the pipeline accepts
+    it; ``loop`` repeats it to simulate long sessions.
+    """
+
+    def __init__(self, path, realtime=False, loop=False):
+        self.path = path
+        self.name = path
+        self.realtime = realtime
+        self.loop = loop
+        self._data = None
+        self._pos = 0
+        self._clock = None
+
+    def open(self):
+        if self.path.lower().endswith('.flac'):
+            import soundfile
+            data, self.rate = soundfile.read(self.path, dtype='int16', always_2d=True)
+            self.channels = data.shape[1]
+            self._data = data.reshape(-1)
+        else:
+            with wave.open(self.path, 'rb') as f:
+                if f.getsampwidth() != 2:
+                    raise ValueError(f"{self.path}: only 16-bit PCM WAV is supported")
+                self.channels = f.getnchannels()
+                self.rate = f.getframerate()
+                self._data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        self._pos = 0
+        self._clock = _Pacer(self.rate) if self.realtime else None
+        return self
+
+    def read(self, frames):
+        if self._pos >= len(self._data):
+            if not self.loop or not len(self._data):
+                return b''
+            self._pos = 0
+        end = self._pos + frames * self.channels
+        chunk = self._data[self._pos:end]
+        self._pos = end
+        if self._clock:
+            self._clock.wait(len(chunk) // self.channels)
+        return chunk.tobytes()
+
+
+class SyntheticSource(AudioSource):
+    """Generated tone, noise or speech-like bursts for tests and benchmarks."""
+
+    def __init__(self, kind='tone', seconds=None, channels=2, rate=48000, realtime=False, seed=0):
+        self.kind = kind
+        self.name = f"synthetic-{kind}"
+        self.seconds = seconds
+        self.channels = channels
+        self.rate = rate
+        self.realtime = realtime
+        self.seed = seed
+        self._period = None
+        self._pos = 0
+        self._clock = None
+
+    def open(self):
+        # One pre-rendered 10 s period, replayed cyclically, keeps read() cheap
+        n = self.rate * 10
+        t = np.arange(n) / self.rate
+        rng = np.random.default_rng(self.seed)
+        if self.kind == 'noise':
+            mono = rng.normal(0, 3000, n)
+        elif self.kind == 'speech':
+            mono = rng.normal(0, 150, n)
+            envelope = (np.sin(2 * np.pi * 0.25 * t) > 0) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+            voice = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 8))
+            mono += 3000 * voice * envelope
+        else:
+            mono = 8000 * np.sin(2 * np.pi * 440 * t)
+        mono = np.clip(mono, -32768, 32767).astype(np.int16)
+        self._period = np.repeat(mono, self.channels)
+        self._pos = 0
+        self._total = int(self.seconds * self.rate) * self.channels if self.seconds else None
+        self._clock = _Pacer(self.rate) if self.realtime else None
+        return self
+
+    def read(self, frames):
+        want = frames * self.channels
+        if self._total is not None:
+            want = min(want, self._total - self._pos)
+            if want <= 0:
+                return b''
+        start = self._pos % len(self._period)
+        if start + want <= len(self._period):
+            chunk = self._period[start:start + want]
+        else:
+            chunk = np.take(self._period, np.arange(start, start + want), mode='wrap')
+        self._pos += want
+        if self._clock:
+            self._clock.wait(want // self.channels)
+        return chunk.tobytes()
+
+
+class _Pacer:
+    """Sleep so that frames are delivered no faster than the sample rate."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.frames = 0
+
+    def wait(self, frames):
+        self.frames += frames
+        delay = self.started + self.frames / self.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,238 @@
+import re
+import threading
+import time
+
+QUESTION_STARTERS = {
+    'what', 'why', 'how', 'when', 'where', 'who', 'whom', 'whose', 'which',
+    'can', 'could', 'would', 'should', 'will', 'shall', 'may', 'might',
+    'do', 'does', 'did', 'is', 'are', 'was', 'were', 'have', 'has', 'had',
+    'tell', 'explain', 'describe', 'walk', 'give', 'name', 'define', 'compare',
+}
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace for comparisons."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def looks_like_question(text, min_words=3):
+    """Cheap check that a transcript is worth answering speculatively."""
+    if text.rstrip().endswith('?'):
+        return True
+    words = normalize_text(text).split()
+    if len(words) < min_words:
+        return False
+    # Batched transcripts can carry an earlier remark, so check the last sentence too
+    last_sentence = normalize_text(re.split(r'[.!?]\s+', text.strip())[-1]).split()
+    return words[0] in QUESTION_STARTERS or bool(last_sentence and last_sentence[0] in QUESTION_STARTERS)
+
+
+class Speculation:
+    """One in-flight speculative answer and its buffered chunks."""
+
+    def __init__(self, text, started_at):
+        self.text = text
+        self.key = normalize_text(text)
+        self.started_at = started_at
+        self.first_chunk_at = None
+        self.chunks = []
+        self.committed = False
+        # Set once the buffered chunks have been handed over; later ones go straight to on_chunk
+        self.flushed = False
+        self.cancelled = False
+        self.done = False
+        self.error = None
+        self.adopt = None
+
+
+class SpeculativeDispatcher:
+    """Start Gemini answers from stable partial transcripts.
+
+    Azure ``recognizing`` partials are fed to ``on_partial``. Once a partial
+    has stopped changing for ``stable_s`` and reads like a question,
+    ``poll`` starts ``start_stream(text)`` in the background and buffers the
+    chunks. ``start_stream`` returns ``(chunks, adopt)``; ``adopt()`` is
+    called on commit and returns False if the answer can no longer be used
+    (for example because the chat moved on in the meantime).
+
+    When the final transcript arrives, ``on_final`` commits the speculation
+    if the normalized text matches and replays the buffered chunks through
+    ``on_commit(text)``, ``on_chunk(chunk)`` and ``on_done()``. A newer
+    partial or a final that diverges cancels it instead, and the caller
+    falls back to the normal request path. Callbacks run outside the
+    dispatcher's lock, in stream order.
+    """
+
+    def __init__(self, start_stream, on_commit, on_chunk, on_done=None,
+                 stable_s=0.4, min_words=3, clock=time.monotonic):
+        self.start_stream = start_stream
+        self.on_commit = on_commit
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.stable_s = stable_s
+        self.min_words = min_words
+        self.clock = clock
+        self.enabled = True
+
+        self._lock = threading.Lock()
+        self._partial = None
+        self._partial_at = 0.0
+        self._active = None
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.saved_s = []
+
+    def on_partial(self, text):
+        """Record the latest partial; cancel a speculation it has outgrown."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        with self._lock:
+            self._partial = text
+            self._partial_at = now
+            active = self._active
+        if active and normalize_text(text) != active.key:
+            self._cancel(active)
+
+    def poll(self):
+        """Start a speculation once the current partial has settled."""
+        if not self.enabled or not self._partial:
+            return None
+        now = self.clock()
+        with self._lock:
+            text = self._partial
+            if now - self._partial_at < self.stable_s:
+                return None
+            if self._active and self._active.key == normalize_text(text):
+                return None
+            if not looks_like_question(text, self.min_words):
+                return None
+            spec = Speculation(text, now)
+            self._active = spec
+            self.started += 1
+
+        threading.Thread(target=self._run, args=(spec,), daemon=True).start()
+        return spec
+
+    def on_final(self, text):
+        """Commit the running speculation if it answers ``text``.
+
+        Returns True when the caller must not send ``text`` itself.
+        """
+        with self._lock:
+            spec = self._active
+            self._partial = None
+        if not spec:
+            return False
+        if spec.key != normalize_text(text) or spec.error:
+            self._cancel(spec)
+            return False
+        if spec.adopt is None or not spec.adopt():
+            self._cancel(spec)
+            return False
+
+        now = self.clock()
+        with self._lock:
+            if spec.cancelled:
+                return False
+            self._active = None
+            spec.committed = True
+            self.hits += 1
+            self.saved_s.append(self._latency_saved(spec, now))
+        self.on_commit(text)
+        self._flush(spec)
+        return True
+
+    def _flush(self, spec):
+        """Hand a committed speculation's buffered chunks over, then let the stream deliver directly."""
+        while True:
+            with self._lock:
+                chunks, spec.chunks = spec.chunks, []
+                if not chunks:
+                    spec.flushed = True
+                    finished = spec.done
+                    break
+            for chunk in chunks:
+                self.on_chunk(chunk)
+        if finished and self.on_done:
+            self.on_done()
+
+    def cancel(self):
+        """Drop any running speculation, e.g. when transcription stops."""
+        with self._lock:
+            spec = self._active
+            self._partial = None
+        if spec:
+            self._cancel(spec)
+
+    def _cancel(self, spec):
+        with self._lock:
+            if spec.committed or spec.cancelled:
+                return
+            spec.cancelled = True
+            self.misses += 1
+            if self._active is spec:
+                self._active = None
+
+    def _latency_saved(self, spec, committed_at):
+        """Time to first token saved against sending the final text at commit.
+
+        Without speculation the first token would arrive one time-to-first-
+        token after the final; with it, it shows at the later of the commit
+        and its own first token. While the first token is still pending, the
+        saving is the time the request had already been running.
+        """
+        if spec.first_chunk_at is None:
+            return committed_at - spec.started_at
+        ttft = spec.first_chunk_at - spec.started_at
+        return committed_at + ttft - max(committed_at, spec.first_chunk_at)
+
+    def _run(self, spec):
+        try:
+            chunks, spec.adopt = self.start_stream(spec.text)
+            for chunk in chunks:
+                if spec.cancelled:
+                    break
+                with self._lock:
+                    if spec.first_chunk_at is None:
+                        spec.first_chunk_at = self.clock()
+                    direct = spec.flushed
+                    if not direct:
+                        spec.chunks.append(chunk)
+                if direct:
+                    self.on_chunk(chunk)
+        except Exception as e:
+            spec.error = e
+            with self._lock:
+                self.errors += 1
+                committed = spec.committed
+            if committed:
+                print(f"Speculative answer failed after commit: {e}")
+            else:
+                self._cancel(spec)
+                return
+
+        with self._lock:
+            spec.done = True
+            # Before the flush, _flush calls on_done itself
+            committed = spec.flushed and not spec.cancelled
+        if committed and self.on_done:
+            self.on_done()
+
+    def metrics(self):
+        """Hit rate and latency saved across speculations so far."""
+        decided = self.hits + self.misses
+        return {
+            'started': self.started,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': self.hits / decided if decided else 0.0,
+            'avg_saved_s': sum(self.saved_s) / len(self.saved_s) if self.saved_s else 0.0,
+            'total_saved_s': sum(self.saved_s),
+        }
@@ -0,0 +1,208 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+FIELDS = ('prompt', 'candidates', 'cached', 'total')
+DAY = 86400
+
+
+def usage_from(metadata):
+    """Token counts from a response's ``usage_metadata``, or None if it has none."""
+    if metadata is None:
+        return None
+    usage = {
+        'prompt': getattr(metadata, 'prompt_token_count', None) or 0,
+        'candidates': getattr(metadata, 'candidates_token_count', None) or 0,
+        'cached': getattr(metadata, 'cached_content_token_count', None) or 0,
+        'total': getattr(metadata, 'total_token_count', None) or 0,
+    }
+    return usage if usage['total'] else None
+
+
+def key_id(api_key):
+    """Stable short id for a key, so usage files never contain the key itself."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+class UsageTracker:
+    """Token usage per request and per API key over rolling windows.
+
+    Every finished request is recorded with its prompt, candidate, cached
+    and total token counts. Events from the last day are kept per key, so
+    totals over any window up to a day and the recent request and token
+    rates can be read back; the day's totals are kept running, so the
+    key pool can check them on every acquire without a scan. ``forecast``
+    turns them into the time left before a key runs into its per-minute or
+    per-day limits.
+
+    With ``path`` set the events and lifetime totals are written there as
+    JSON on a timer thread ``save_every`` seconds after a change and at
+    exit, and read back on start, so daily usage survives restarts without
+    file writes on the request path. Times are wall-clock seconds.
+    """
+
+    def __init__(self, path=None, save_every=60.0, clock=None):
+        self.path = path
+        self.save_every = save_every
+        self.clock = clock or time.time
+        self._events = {}
+        # Running sums over each key's kept events: requests, then FIELDS
+        self._day = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        # Serializes writers of the file (the timer and the exit hook)
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        if path:
+            self.load()
+            atexit.register(self.flush)
+
+    def record(self, api_key, usage, at=None):
+        """Add one finished request's token counts for ``api_key``."""
+        now = self.clock() if at is None else at
+        usage = usage or {}
+        event = (now,) + tuple(int(usage.get(field, 0)) for field in FIELDS)
+        ident = key_id(api_key)
+        with self._lock:
+            self._events.setdefault(ident, deque()).append(event)
+            self._count(ident, event, 1)
+            self._prune(ident, now)
+            totals = self._totals.setdefault(ident, dict.fromkeys(('requests',) + FIELDS, 0))
+            totals['requests'] += 1
+            for field, value in zip(FIELDS, event[1:]):
+                totals[field] += value
+            self._dirty = True
+            # Called from the key pool on the request path: write later, on another thread
+            if self.path and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_every, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _count(self, ident, event, sign):
+        day = self._day.setdefault(ident, [0] * (len(FIELDS) + 1))
+        day[0] += sign
+        for i, value in enumerate(event[1:], 1):
+            day[i] += sign * value
+
+    def _prune(self, ident, now):
+        events = self._events.get(ident)
+        while events and events[0][0] <= now - DAY:
+            self._count(ident, events.popleft(), -1)
+
+    def window(self, api_key, seconds, now=None):
+        """Requests and token sums for ``api_key`` over the last ``seconds``."""
+        now = self.clock() if now is None else now
+        result = dict.fromkeys(('requests',) + FIELDS, 0)
+        ident = key_id(api_key)
+        with self._lock:
+            if seconds >= DAY:
+                self._prune(ident, now)
+                return dict(zip(result, self._day.get(ident, result.values())))
+            events = self._events.get(ident, ())
+            for event in reversed(events):
+                if event[0] <= now - seconds:
+                    break
+                result['requests'] += 1
+                for field, value in zip(FIELDS, event[1:]):
+                    result[field] += value
+        return result
+
+    def rate(self, api_key, seconds=300, now=None):
+        """Recent (requests per second, tokens per second) for ``api_key``."""
+        recent = self.window(api_key, seconds, now)
+        return recent['requests'] / seconds, recent['total'] / seconds
+
+    def day_reset_in(self, api_key, rpd, now=None):
+        """Seconds until a key at its daily request limit gets a request back."""
+        now = self.clock() if now is None else now
+        ident = key_id(api_key)
+        with self._lock:
+            self._prune(ident, now)
+            events = self._events.get(ident, ())
+            if not rpd or len(events) < rpd:
+                return 0.0
+            oldest = events[len(events) - rpd][0]
+        return oldest + DAY - now
+
+    def forecast(self, api_key, rpm=0, tpm=0, rpd=0, now=None):
+        """Seconds until ``api_key`` runs out of its per-minute or per-day quota at the recent rate.
+
+        Returns a dict with the time to each limit (inf when it is not being
+        approached) and ``exhausted_in``, the soonest of them.
+        """
+        now = self.clock() if now is None else now
+        request_rate, token_rate = self.rate(api_key, now=now)
+        minute = self.window(api_key, 60, now)
+        result = {'rpm_in': float('inf'), 'tpm_in': float('inf'), 'rpd_in': float('inf')}
+        # Per-minute quotas refill continuously: they only run out if the rate outpaces them
+        if rpm and request_rate > rpm / 60.0:
+            result['rpm_in'] = max(0.0, rpm - minute['requests']) / (request_rate - rpm / 60.0)
+        if tpm and token_rate > tpm / 60.0:
+            result['tpm_in'] = max(0.0, tpm - minute['total']) / (token_rate - tpm / 60.0)
+        if rpd:
+            left = rpd - self.window(api_key, DAY, now)['requests']
+            if left <= 0:
+                result['rpd_in'] = 0.0
+            elif request_rate > 0:
+                result['rpd_in'] = left / request_rate
+        result['exhausted_in'] = min(result.values())
+        return result
+
+    def totals(self, api_key):
+        """Lifetime requests and token sums for ``api_key``."""
+        with self._lock:
+            return dict(self._totals.get(key_id(api_key), dict.fromkeys(('requests',) + FIELDS, 0)))
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Gemini usage not loaded from {self.path}: {e}")
+            return
+        now = self.clock()
+        with self._lock:
+            for ident, events in data.get('events', {}).items():
+                queue = self._events.setdefault(ident, deque())
+                for event in events:
+                    queue.append(tuple(event))
+                    self._count(ident, queue[-1], 1)
+                self._prune(ident, now)
+            self._totals.update(data.get('totals', {}))
+
+    def flush(self):
+        """Save now instead of waiting for the timer, e.g. on exit."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                now = self.clock()
+                for ident in self._events:
+                    self._prune(ident, now)
+                # Copies all the way down: record() keeps changing these while json.dump runs
+                data = {'events': {ident: list(events) for ident, events in self._events.items()},
+                        'totals': {ident: dict(totals) for ident, totals in self._totals.items()}}
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Gemini usage not saved to {self.path}: {e}")
@@ -0,0 +1,156 @@
+from collections import deque
+
+import numpy as np
+
+
+class EnergyVAD:
+    """Frame classifier from log energy and spectral flux.
+
+    The noise floor follows quiet frames quickly and loud frames slowly. A
+    frame counts as speech when it stands ``threshold_db`` above the floor,
+    or a third of that when its spectrum also changes sharply (an onset).
+    Frames below ``min_energy_db`` are always silence.
+    """
+
+    def __init__(self, rate=16000, frame_ms=20, threshold_db=9.0, min_energy_db=-55.0, flux_threshold=0.35):
+        self.frame_size = int(rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.flux_threshold = flux_threshold
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+        self._scaled = np.empty(self.frame_size, dtype=np.float32)
+        self._previous = None
+        self.noise_floor_db = None
+
+    def reset(self):
+        self._previous = None
+        self.noise_floor_db = None
+
+    def is_speech(self, frame):
+        scaled = self._scaled
+        np.multiply(frame, 1.0 / 32768.0, out=scaled, casting='unsafe')
+        energy_db = 10 * np.log10(np.dot(scaled, scaled) / len(scaled) + 1e-10)
+
+        np.multiply(scaled, self._window, out=scaled)
+        spectrum = np.abs(np.fft.rfft(scaled))
+        flux = 0.0
+        if self._previous is not None:
+            rise = np.maximum(spectrum - self._previous, 0.0).sum()
+            flux = rise / (spectrum.sum() + 1e-10)
+        self._previous = spectrum
+
+        if self.noise_floor_db is None:
+            self.noise_floor_db = energy_db
+        elif energy_db < self.noise_floor_db:
+            self.noise_floor_db += 0.5 * (energy_db - self.noise_floor_db)
+        else:
+            self.noise_floor_db += 0.002 * (energy_db - self.noise_floor_db)
+
+        if energy_db < self.min_energy_db:
+            return False
+        above_floor = energy_db - self.noise_floor_db
+        if above_floor > self.threshold_db:
+            return True
+        return flux > self.flux_threshold and above_floor > self.threshold_db / 3
+
+
+class WebRTCVAD:
+    """Wrapper around the optional ``webrtcvad`` package (10/20/30 ms frames)."""
+
+    def __init__(self, rate=16000, frame_ms=20, aggressiveness=2):
+        import webrtcvad
+        self.rate = rate
+        self.frame_size = int(rate * frame_ms / 1000)
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def reset(self):
+        pass
+
+    def is_speech(self, frame):
+        return self._vad.is_speech(frame.astype(np.int16, copy=False).tobytes(), self.rate)
+
+
+def create_vad(mode, rate=16000, frame_ms=20, threshold_db=9.0):
+    """Build the detector for a VAD_MODE setting, or None when disabled."""
+    mode = (mode or 'off').lower()
+    if mode in ('off', 'none', '0', 'false'):
+        return None
+    if mode == 'webrtc':
+        try:
+            return WebRTCVAD(rate, frame_ms)
+        except ImportError:
+            print("webrtcvad is not installed, falling back to the energy VAD")
+    return EnergyVAD(rate, frame_ms, threshold_db=threshold_db)
+
+
+class VoiceGate:
+    """Drop silent audio before it is pushed to the recognizer.
+
+    Audio is classified in fixed frames. Frames seen while the gate is
+    closed are held in a short pre-roll so word onsets are sent along with
+    the first speech frame, and the gate stays open for a hangover period
+    after speech so the recognizer still hears the trailing silence it
+    needs to end the phrase.
+    """
+
+    def __init__(self, detector, preroll_ms=300, hangover_ms=800, frame_ms=20):
+        self.detector = detector
+        self.frame_size = detector.frame_size
+        self.preroll = deque(maxlen=max(1, int(preroll_ms / frame_ms)))
+        self.hangover_frames = int(hangover_ms / frame_ms)
+        self._pending = np.zeros(self.frame_size, dtype=np.int16)
+        self._pending_len = 0
+        self._hangover = 0
+        self.total_frames = 0
+        self.sent_frames = 0
+
+    def reset(self):
+        self.detector.reset()
+        self.preroll.clear()
+        self._pending_len = 0
+        self._hangover = 0
+
+    @property
+    def suppressed_frames(self):
+        return self.total_frames - self.sent_frames
+
+    @property
+    def suppressed_ratio(self):
+        return self.suppressed_frames / self.total_frames if self.total_frames else 0.0
+
+    def stats(self):
+        return {
+            'total_frames': self.total_frames,
+            'sent_frames': self.sent_frames,
+            'suppressed_frames': self.suppressed_frames,
+            'suppressed_ratio': self.suppressed_ratio,
+        }
+
+    def process(self, samples):
+        """Gate one chunk of mono int16 samples and return the bytes to push."""
+        out = []
+        pos = 0
+        while pos < len(samples):
+            take = min(self.frame_size - self._pending_len, len(samples) - pos)
+            self._pending[self._pending_len:self._pending_len + take] = samples[pos:pos + take]
+            self._pending_len += take
+            pos += take
+            if self._pending_len == self.frame_size:
+                self._pending_len = 0
+                self._gate_frame(self._pending, out)
+        return b''.join(out)
+
+    def _gate_frame(self, frame, out):
+        self.total_frames += 1
+        if self.detector.is_speech(frame):
+            self._hangover = self.hangover_frames
+            while self.preroll:
+                out.append(self.preroll.popleft())
+                self.sent_frames += 1
+        elif self._hangover > 0:
+            self._hangover -= 1
+        else:
+            self.preroll.append(frame.tobytes())
+            return
+        out.append(frame.tobytes())
+        self.sent_frames += 1
@@ -1,7 +1,7 @@
 import sys
 import os
 import time
-import io
+import json
 import threading
 import ctypes
 from PyQt6.QtWidgets import (
@@ -11,21 +11,28 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QObject, QPoint, QRect, QTimer
 from PyQt6.QtGui import QTextCursor, QMouseEvent, QCursor, QIcon
-from PIL import ImageGrab
 from pynput import keyboard
 
 from src.config import Config
 from src.core.audio import AudioTranscriber
+from src.core.batching import AdaptiveFlushPolicy
+from src.core.capture import ScreenCapture, active_window_box, create_capture, parse_region
 from src.core.gemini import GeminiClient
-from src.ui.widgets import CustomComboBox
+from src.core.gemini_async import AsyncGeminiClient
+from src.core.ocr import create_ocr
+from src.core.screenshot import ScreenshotDiffer, ScreenshotEncoder
+from src.core.speculation import SpeculativeDispatcher
+from src.ui.widgets import CustomComboBox, RegionSelector
 from src.utils.helpers import markdown_to_html, resource_path
+from src.utils.tracing import tracer
 
 class TranscriptionSignals(QObject):
     """Signals for thread-safe GUI updates"""
     transcription_update = pyqtSignal(str)
     status_update = pyqtSignal(str)
-    screenshot_signal = pyqtSignal()
-    restore_window_signal = pyqtSignal()
+    screenshot_signal = pyqtSignal(float)
+    screenshot_grabbed = pyqtSignal(str)
+    region_signal = pyqtSignal()
     add_user_message = pyqtSignal(str)
     add_screenshot_message = pyqtSignal()
     add_assistant_message_start = pyqtSignal()
@@ -42,8 +49,12 @@ class MainWindow(QWidget):
         self.last_ui_update = time.time()
         self.update_timer = None
         self.transcription_buffer = []
+        self.flush_policy = AdaptiveFlushPolicy(
+            min_wait=Config.BATCH_MIN_WAIT_MS / 1000,
+            max_wait=Config.BATCH_MAX_WAIT_MS / 1000
+        )
+        # Single-shot; each final restarts it with the policy's wait
         self.batch_timer = QTimer(self)
-        self.batch_timer.setInterval(2000) # 4 seconds
         self.batch_timer.setSingleShot(True)
         self.batch_timer.timeout.connect(self._flush_transcription_buffer)
         
@@ -83,15 +94,87 @@ class MainWindow(QWidget):
         
         self.audio_transcriber = AudioTranscriber(self.signals)
         self.gemini_client = GeminiClient()
+        self.gemini_async = AsyncGeminiClient(self.gemini_client, Config.GEMINI_MAX_CONCURRENT,
+                                              warm=Config.GEMINI_WARM_CLIENTS,
+                                              hedge_delay=Config.GEMINI_HEDGE_DELAY_MS / 1000 if Config.GEMINI_HEDGE else None,
+                                              # One chat view: answers take turns instead of interleaving
+                                              serial=True) if Config.GEMINI_ASYNC else None
+        if Config.WARM_STANDBY:
+            self.audio_transcriber.prepare(Config.SPEECH_KEYS, Config.SPEECH_REGION)
+        
+        # Speculative answers from partial transcripts
+        self.speculator = SpeculativeDispatcher(
+            start_stream=self.gemini_client.start_speculative_stream,
+            on_commit=self._on_speculation_commit,
+            on_chunk=self.signals.add_assistant_chunk.emit,
+            on_done=self._on_speculation_done,
+            stable_s=Config.SPECULATION_STABLE_MS / 1000,
+            min_words=Config.SPECULATION_MIN_WORDS
+        )
+        self.speculator.enabled = Config.SPECULATIVE_ANSWERS
+        self.speculation_timer = QTimer(self)
+        self.speculation_timer.setInterval(100)
+        self.speculation_timer.timeout.connect(self.speculator.poll)
+        self.speculation_timer.start()
         
         # Windows API
         self.user32 = ctypes.windll.user32
         self.WDA_NONE = 0x00
         self.WDA_EXCLUDEFROMCAPTURE = 0x11
+        # DWM applies a new display affinity with the next composed frame
+        self.AFFINITY_SETTLE_MS = 35
         
         # State
         self.current_assistant_message = ""
         self.current_screenshot_bytes = None
+        # Questions shown but not answered yet; a superseded one is asked again with the next
+        self.unanswered_questions = []
+        self.unanswered_lock = threading.Lock()
+        self.screenshot_encoder = ScreenshotEncoder(
+            max_side=Config.SCREENSHOT_MAX_SIDE,
+            image_format=Config.SCREENSHOT_FORMAT,
+            lossy_format=Config.SCREENSHOT_LOSSY_FORMAT,
+            quality=Config.SCREENSHOT_QUALITY
+        )
+        self.screenshot_differ = ScreenshotDiffer() if Config.SCREENSHOT_DIFF else None
+        self.screenshot_busy = False
+        capture_backend = create_capture(Config.SCREENSHOT_BACKEND)
+        try:
+            self.screen_capture = ScreenCapture(
+                capture_backend,
+                target=Config.SCREENSHOT_TARGET,
+                monitor=Config.SCREENSHOT_MONITOR,
+                region=parse_region(Config.SCREENSHOT_REGION)
+            )
+        except ValueError as e:
+            print(f"Warning: {e}; capturing the full screen")
+            self.screen_capture = ScreenCapture(capture_backend)
+        self.region_selector = None
+        self.screenshot_ocr = create_ocr(
+            Config.SCREENSHOT_OCR,
+            workers=Config.SCREENSHOT_OCR_WORKERS,
+            min_confidence=Config.SCREENSHOT_OCR_MIN_CONFIDENCE,
+            min_words=Config.SCREENSHOT_OCR_MIN_WORDS
+        )
+        # Sent beside OCR text that was read with low confidence
+        self.thumbnail_encoder = ScreenshotEncoder(
+            max_side=Config.SCREENSHOT_OCR_THUMBNAIL_SIDE,
+            image_format=Config.SCREENSHOT_FORMAT,
+            lossy_format=Config.SCREENSHOT_LOSSY_FORMAT,
+            quality=Config.SCREENSHOT_QUALITY
+        )
+        
+        # Latency tracing: request being rendered and the speech it answers
+        self.current_trace = None
+        self.pending_first_render = None
+        self.batch_last_final_at = 0.0
+        self.batch_speech_end = 0.0
+        if Config.LATENCY_HUD:
+            self.latency_hud.show()
+            self.hud_timer = QTimer(self)
+            self.hud_timer.setInterval(1000)
+            self.hud_timer.timeout.connect(self.update_latency_hud)
+            self.hud_timer.start()
         
         self.setup_hotkey()
 
@@ -168,15 +251,21 @@ class MainWindow(QWidget):
         self.transcribe_button = QPushButton("🎤 Start Transcription")
         self.transcribe_button.setProperty("class", "transcribe-btn")
         
-        self.status_label = QLabel("Ready | Alt+Z: Privacy | Alt+A: Show/Hide | Alt+X: Snip | Alt+M: Mic")
+        self.status_label = QLabel("Ready | Alt+Z: Privacy | Alt+A: Show/Hide | Alt+X: Snip | Alt+R: Region | Alt+M: Mic")
         self.status_label.setStyleSheet("color: #a0a0a0; font-size: 12px;")
         
+        # p50/p95 per traced stage, shown when LATENCY_HUD is on
+        self.latency_hud = QLabel("")
+        self.latency_hud.setStyleSheet("color: #7fd1ff; font-size: 11px; font-family: Consolas, monospace;")
+        self.latency_hud.hide()
+        
         control_layout.addWidget(self.transcribe_button)
         control_layout.addWidget(self.status_label)
         control_layout.addStretch()
         
         chat_layout.addWidget(title_bar_widget)
         chat_layout.addWidget(self.chat_display, stretch=1)
+        chat_layout.addWidget(self.latency_hud)
         chat_layout.addWidget(control_bar)
 
         # Right side - Settings
@@ -322,7 +411,8 @@ class MainWindow(QWidget):
         self.signals.transcription_update.connect(self.update_transcription)
         self.signals.status_update.connect(self.update_status)
         self.signals.screenshot_signal.connect(self.take_screenshot_safe)
-        self.signals.restore_window_signal.connect(self.restore_window)
+        self.signals.screenshot_grabbed.connect(self._after_screenshot_grab)
+        self.signals.region_signal.connect(self.select_screenshot_region)
         self.signals.add_user_message.connect(self.add_user_message_to_chat)
         self.signals.add_screenshot_message.connect(self.add_screenshot_message_to_chat)
         self.signals.add_assistant_message_start.connect(self.start_assistant_message)
@@ -340,6 +430,9 @@ class MainWindow(QWidget):
         success, message = Config.save_env(speech_keys=azure_keys, speech_region=azure_region, gemini_keys=gemini_keys)
         self.signals.status_update.emit(message)
         
+        if Config.WARM_STANDBY and azure_keys and azure_region:
+            self.audio_transcriber.prepare(azure_keys, azure_region)
+        
         if gemini_keys:
             # Update current session with the newly inputted keys parsing them as lists
             self.gemini_client.api_keys = [k.strip() for k in gemini_keys.split(',')]
@@ -349,6 +442,9 @@ class MainWindow(QWidget):
     def on_model_changed(self, model_name):
         """Handle model change."""
         self.gemini_client.update_model(model_name)
+        if self.screenshot_differ:
+            # The new chat has not seen the last screenshot
+            self.screenshot_differ.reset()
         Config.save_env(gemini_model=model_name)
         self.signals.status_update.emit(f"✅ Model: {model_name} (saved)")
 
@@ -356,6 +452,8 @@ class MainWindow(QWidget):
         """Update system prompt."""
         instructions = self.system_prompt_input.toPlainText().strip()
         self.gemini_client.update_instructions(instructions)
+        if self.screenshot_differ:
+            self.screenshot_differ.reset()
         Config.save_env(system_prompt=instructions)
         self.signals.status_update.emit("✅ Instructions updated and saved")
 
@@ -374,21 +472,92 @@ class MainWindow(QWidget):
                 self.transcribe_button.style().polish(self.transcribe_button)
         else:
             self.audio_transcriber.stop()
+            self.speculator.cancel()
             self.transcribe_button.setText("🎤 Start Transcription")
             self.transcribe_button.setProperty("class", "transcribe-btn")
             self.transcribe_button.style().unpolish(self.transcribe_button)
             self.transcribe_button.style().polish(self.transcribe_button)
-            self.signals.status_update.emit("Status: Stopped | Alt+Z: Privacy | Alt+A: Show/Hide | Alt+X: Snip | Alt+M: Mic")
+            
+            status = "Status: Stopped"
+            metrics = self.audio_transcriber.metrics()
+            if metrics and 'vad' in metrics:
+                status += f" (VAD skipped {metrics['vad']['suppressed_ratio']:.0%} of audio)"
+            startup = metrics.get('startup') if metrics else None
+            if startup and startup.get('first_event_s') is not None:
+                status += (f" (first recognition after {startup['first_event_s']:.2f}s, "
+                           f"{'warm' if startup['warm_recognizer'] else 'cold'} start)")
+            speculation = self.speculator.metrics()
+            if speculation['started']:
+                status += f" (speculation hit {speculation['hit_rate']:.0%}, saved {speculation['avg_saved_s']:.1f}s avg)"
+            cache = self.gemini_client.response_cache.stats() if self.gemini_client.response_cache else None
+            if cache and cache['hits']:
+                status += f" (answered {cache['hits']} from cache)"
+            hedging = self.gemini_async.stats() if self.gemini_async else None
+            if hedging and hedging['hedged']:
+                status += f" (hedged {hedging['hedged']}, won {hedging['hedge_wins']}, +{hedging['hedge_extra_tokens']} tokens)"
+            routes = self.gemini_client.router.stats() if self.gemini_client.router else None
+            if routes and routes['fast']['requests']:
+                fast, strong = routes['fast'], routes['strong']
+                status += f" (fast model {fast['requests']}/{fast['requests'] + strong['requests']}"
+                if fast['p50_first_chunk_ms'] is not None and strong['p50_first_chunk_ms'] is not None:
+                    status += f", first chunk {fast['p50_first_chunk_ms']:.0f} vs {strong['p50_first_chunk_ms']:.0f} ms"
+                status += ")"
+            shots = self.screenshot_differ.stats() if self.screenshot_differ else None
+            if shots and shots['bytes_saved']:
+                status += (f" (screenshots: {shots['skipped']} unchanged, {shots['cropped']} cropped, "
+                           f"{shots['bytes_saved'] / 1024 ** 2:.1f} MB saved)")
+            ocr = self.screenshot_ocr.stats() if self.screenshot_ocr else None
+            if ocr and ocr['runs']:
+                status += (f" (OCR: {ocr['text_only']} as text, {ocr['with_thumbnail']} with thumbnail "
+                           f"of {ocr['runs']}, {ocr['avg_ms']:.0f} ms avg)")
+            self.signals.status_update.emit(f"{status} | Alt+Z: Privacy | Alt+A: Show/Hide | Alt+X: Snip | Alt+R: Region | Alt+M: Mic")
 
     def update_transcription(self, text):
         """Handle transcribed text."""
-        if text.startswith("✅"):
+        if text.startswith("💬"):
+            partial = text.replace("💬", "", 1).strip()
+            if partial:
+                if Config.TRANSCRIPT_LOG:
+                    self._record_transcript('partial', partial)
+                self.speculator.on_partial(" ".join(self.transcription_buffer + [partial]))
+                # The speaker is still going: hold the pending batch for their next final
+                hold = self.flush_policy.on_partial(time.monotonic())
+                if hold is not None and self.transcription_buffer:
+                    self.batch_timer.start(int(hold * 1000))
+        elif text.startswith("✅"):
             clean_text = text.replace("✅", "").strip()
             if clean_text:
+                if Config.TRANSCRIPT_LOG:
+                    self._record_transcript('final', clean_text)
+                # A speculative answer for exactly this text is already streaming
+                if self.speculator.on_final(" ".join(self.transcription_buffer + [clean_text])):
+                    self.transcription_buffer.clear()
+                    self.batch_timer.stop()
+                    self.flush_policy.on_final(clean_text, time.monotonic())
+                    self.flush_policy.on_flush(time.monotonic())
+                    return
+                
                 self.transcription_buffer.append(clean_text)
+                self.batch_last_final_at = tracer.now()
+                self.batch_speech_end = self.audio_transcriber.last_utterance[1]
                 
-                # Restart the 15-second timer
-                self.batch_timer.start()
+                wait = self.flush_policy.on_final(
+                    " ".join(self.transcription_buffer),
+                    time.monotonic(),
+                    self.audio_transcriber.trailing_silence_s
+                )
+                self.batch_timer.start(int(wait * 1000))
+
+    def _record_transcript(self, kind, text):
+        """Append one transcript event for benchmarks/replay_batching.py."""
+        event = {'t': time.monotonic(), 'kind': kind, 'text': text}
+        if kind == 'final':
+            event['silence'] = self.audio_transcriber.trailing_silence_s
+        try:
+            with open(Config.TRANSCRIPT_LOG, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError as e:
+            print(f"Could not write transcript log: {e}")
 
     def _flush_transcription_buffer(self):
         """Send buffered transcription to Gemini."""
@@ -397,21 +566,45 @@ class MainWindow(QWidget):
             
         combined_text = " ".join(self.transcription_buffer)
         self.transcription_buffer.clear()
+        self.flush_policy.on_flush(time.monotonic())
         
-        self.send_to_gemini(combined_text)
+        trace = tracer.new_trace()
+        tracer.record('batch', self.batch_last_final_at, trace=trace, chars=len(combined_text))
+        self.send_to_gemini(combined_text, trace, self.batch_speech_end)
 
-    def send_to_gemini(self, text):
+    def send_to_gemini(self, text, trace=None, speech_end=None):
         """Send text to Gemini."""
         if not self.gemini_client.chat:
             self.signals.status_update.emit("Error: Gemini API not configured")
             return
         
+        self._begin_trace(trace, speech_end)
+        
+        if self.gemini_async:
+            # Cancelled answers never reach the history, so their questions go along with this one
+            question = [text]
+            with self.unanswered_lock:
+                earlier = [q[0] for q in self.unanswered_questions]
+                self.unanswered_questions = [question]
+            self.signals.add_user_message.emit(text)
+            
+            def on_start(request_id):
+                self.signals.add_assistant_message_start.emit()
+            
+            def on_settled():
+                with self.unanswered_lock:
+                    self.unanswered_questions = [q for q in self.unanswered_questions if q is not question]
+            
+            self._submit_async(self.gemini_async.send_message, " ".join(earlier + [text]), on_start=on_start,
+                               trace=trace, on_settled=on_settled)
+            return
+        
         def gemini_worker():
             try:
                 self.signals.add_user_message.emit(text)
                 self.signals.add_assistant_message_start.emit()
                 
-                response = self.gemini_client.send_message_stream(text)
+                response = self.gemini_client.send_message_stream(text, trace=trace)
                 
                 for chunk in response:
                     if hasattr(chunk, 'text') and chunk.text:
@@ -425,10 +618,62 @@ class MainWindow(QWidget):
         
         threading.Thread(target=gemini_worker, daemon=True).start()
 
+    def _submit_async(self, send, *args, on_start, trace, kind='message', on_answered=None, on_settled=None,
+                      **options):
+        """Submit to the async client; the new request supersedes any answer of its ``kind`` still streaming.
+        
+        Answers of other kinds queue behind the one streaming. ``on_answered``
+        runs when the answer is complete, ``on_settled`` when it is complete
+        or failed.
+        """
+        if self.gemini_async.in_flight(kind):
+            self.signals.status_update.emit("Status: Newer request, previous answer cancelled")
+        
+        def on_done(request_id):
+            if on_answered:
+                on_answered()
+            if on_settled:
+                on_settled()
+            if self.chunk_buffer:
+                QTimer.singleShot(0, self._render_assistant_message_safe)
+        
+        def on_error(request_id, e):
+            if on_settled:
+                on_settled()
+            self.signals.status_update.emit(f"Gemini error: {str(e)}")
+        
+        send(*args, self.signals.add_assistant_chunk.emit,
+             on_start=on_start, on_done=on_done, on_error=on_error, trace=trace, **options)
+
+    def _on_speculation_commit(self, text):
+        """Show a committed speculative answer as a normal exchange."""
+        self._begin_trace(tracer.new_trace(), self.audio_transcriber.last_utterance[1])
+        self.signals.add_user_message.emit(text)
+        self.signals.add_assistant_message_start.emit()
+
+    def _on_speculation_done(self):
+        if self.chunk_buffer:
+            QTimer.singleShot(0, self._render_assistant_message_safe)
+
+    def _begin_trace(self, trace, speech_end):
+        """Attach following renders to ``trace``; the first one closes the end-to-end span."""
+        if not tracer.enabled:
+            return
+        self.current_trace = trace
+        self.pending_first_render = (trace, speech_end) if speech_end else None
+
+    def update_latency_hud(self):
+        summary = tracer.summary()
+        parts = [f"{stage} {s['p50_ms']:.0f}/{s['p95_ms']:.0f}" for stage, s in summary.items()]
+        self.latency_hud.setText("p50/p95 ms  " + "  ·  ".join(parts) if parts else "No spans yet")
+
     def setup_hotkey(self):
         """Setup global hotkey."""
         def on_screenshot_hotkey():
-            self.signals.screenshot_signal.emit()
+            self.signals.screenshot_signal.emit(time.perf_counter())
+            
+        def on_region_hotkey():
+            self.signals.region_signal.emit()
             
         def on_mute_hotkey():
             self.signals.toggle_transcription_signal.emit()
@@ -441,54 +686,198 @@ class MainWindow(QWidget):
         
         self.hotkey_listener = keyboard.GlobalHotKeys({
             '<alt>+x': on_screenshot_hotkey,
+            '<alt>+r': on_region_hotkey,
             '<alt>+m': on_mute_hotkey,
             '<alt>+z': on_privacy_hotkey,
             '<alt>+a': on_visibility_hotkey
         })
         self.hotkey_listener.start()
 
-    def take_screenshot_safe(self):
-        """Thread-safe screenshot handler."""
-        was_visible = self.isVisible()
-        
-        if was_visible:
+    def take_screenshot_safe(self, requested_at=None):
+        """Start a screenshot without blocking the GUI thread.
+        
+        The window is kept out of the capture with WDA_EXCLUDEFROMCAPTURE where
+        Windows supports it, or hidden and captured after SCREENSHOT_HIDE_DELAY_MS
+        on a Qt timer. It is back as soon as the screen is grabbed.
+        """
+        requested_at = requested_at or time.perf_counter()
+        if self.screenshot_busy or self.region_selector:
+            return
+        capture = self.screen_capture
+        if capture.target == 'region' and capture.region is None:
+            self.select_screenshot_region()
+            return
+        self.screenshot_busy = True
+        # Looked up now, while the window the user was in still has the focus
+        window_box = active_window_box(exclude=(int(self.winId()),)) if capture.target == 'window' else None
+        
+        mode, delay = 'none', 0
+        if sys.platform == 'win32' and self.screenshare_toggle.isChecked():
+            pass # "Hide from Screen Sharing" already keeps the window out of every capture
+        elif (Config.SCREENSHOT_EXCLUDE != 'hide' and sys.platform == 'win32'
+              and self.user32.SetWindowDisplayAffinity(int(self.winId()), self.WDA_EXCLUDEFROMCAPTURE)):
+            mode, delay = 'exclude', self.AFFINITY_SETTLE_MS
+        elif self.isVisible():
+            # No capture exclusion (other platforms, older Windows or SCREENSHOT_EXCLUDE=hide)
             self.hide()
-            time.sleep(0.3)
+            mode, delay = 'hide', Config.SCREENSHOT_HIDE_DELAY_MS
         
-        threading.Thread(target=self._take_screenshot_thread, args=(was_visible,), daemon=True).start()
+        def capture():
+            threading.Thread(target=self._take_screenshot_thread, args=(mode, requested_at, window_box),
+                             daemon=True).start()
+        
+        QTimer.singleShot(delay, capture)
 
-    def _take_screenshot_thread(self, was_visible):
-        """Take screenshot in separate thread."""
-        try:
-            screenshot = ImageGrab.grab()
-            img_byte_arr = io.BytesIO()
-            screenshot.save(img_byte_arr, format='PNG')
-            self.current_screenshot_bytes = img_byte_arr.getvalue()
+    def select_screenshot_region(self):
+        """Let the user drag out the region later screenshots capture."""
+        if self.region_selector or self.screenshot_busy:
+            return
+        self.region_selector = RegionSelector()
+        self.region_selector.selected.connect(self._on_region_selected)
+        self.region_selector.destroyed.connect(self._on_region_selector_closed)
+        self.region_selector.show()
+        self.region_selector.activateWindow()
+
+    def _on_region_selector_closed(self):
+        self.region_selector = None
+
+    def _on_region_selected(self, box):
+        """Remember the drawn region and capture it; a click without a drag goes back to the configured target."""
+        self.region_selector = None
+        capture = self.screen_capture
+        if self.screenshot_differ:
+            # Frames of another region aren't comparable with the last one
+            self.screenshot_differ.reset()
+        if box is None:
+            capture.target = Config.SCREENSHOT_TARGET
+            capture.region = parse_region(Config.SCREENSHOT_REGION)
+            self.signals.status_update.emit(f"Screenshot region cleared, capturing {capture.target}")
+            return
+        capture.target, capture.region = 'region', box
+        print(f"Screenshot region set to {box}")
+        # Let the overlay leave the screen before the grab
+        QTimer.singleShot(0, lambda: self.take_screenshot_safe(time.perf_counter()))
+
+    def _after_screenshot_grab(self, mode):
+        """Undo whatever kept the window out of the capture."""
+        self.screenshot_busy = False
+        if mode == 'exclude' and not self.screenshare_toggle.isChecked():
+            self.user32.SetWindowDisplayAffinity(int(self.winId()), self.WDA_NONE)
+        elif mode == 'hide':
+            self.restore_window()
+
+    def _take_screenshot_thread(self, mode, requested_at, window_box=None):
+        """Grab, encode and send a screenshot in a worker thread."""
+        capture = self.screen_capture
+        # The mss backend reuses its image between grabs: the next one waits until this frame is encoded
+        with capture.backend.lock:
+            try:
+                started = time.perf_counter()
+                screenshot, box = capture.grab(window_box)
+                grabbed = time.perf_counter()
+            except Exception as e:
+                self.signals.status_update.emit(f"Screenshot error: {str(e)}")
+                return
+            finally:
+                # The window can come back now; encoding and sending don't need it out of the way
+                self.signals.screenshot_grabbed.emit(mode)
+        
+            try:
+                differ = self.screenshot_differ
+                change = differ.compare(screenshot) if differ else None
+                if change and change.kind == 'same':
+                    differ.submitted(screenshot, change, 0)
+                    self.signals.status_update.emit("Screen unchanged since the last screenshot; its answer above "
+                                                    "still applies (press again to resend it)")
+                    return
             
-            self.signals.add_screenshot_message.emit()
-            self.send_screenshot_to_gemini(self.current_screenshot_bytes)
-            self.signals.status_update.emit("Screenshot captured and sent to AI")
-        except Exception as e:
-            self.signals.status_update.emit(f"Screenshot error: {str(e)}")
-        finally:
-            if was_visible:
-                self.signals.restore_window_signal.emit()
+                image, prompt = screenshot, GeminiClient.SCREENSHOT_PROMPT
+                if change and change.kind == 'region':
+                    image = screenshot.crop(change.box)
+                    prompt = GeminiClient.REGION_PROMPT.format(box=change.box, width=screenshot.width,
+                                                               height=screenshot.height)
+                # OCR and encoding stay on this worker thread; Pillow releases the GIL while it resizes and compresses
+                data, mime_type, prompt, summary = self._screenshot_payload(image, prompt, change, screenshot)
+                self.current_screenshot_bytes = data
+                # The frame becomes the reference only once it's answered; a cancelled or failed send leaves none
+                on_answered = differ.pending(screenshot, change, len(data or b'') + len(prompt.encode('utf-8'))) \
+                    if differ else None
+                region = f" region {change.box}" if change and change.kind == 'region' else ""
+                print(f"Screenshot {screenshot.width}x{screenshot.height}{region} sent as {summary}")
+            
+                self.send_screenshot_to_gemini(data, mime_type, prompt, on_answered)
+                sent = time.perf_counter()
+                latency = (f"{1000 * (sent - requested_at):.0f} ms from hotkey: wait {1000 * (started - requested_at):.0f}, "
+                           f"grab {1000 * (grabbed - started):.0f}, encode and send {1000 * (sent - grabbed):.0f}")
+                print(f"Screenshot ({mode}, {capture.backend.name} {capture.target}{f' {box}' if box else ''}) {latency}")
+                tracer.record('screenshot_wait', requested_at, started, mode=mode)
+                tracer.record('screenshot_to_request', requested_at, sent, mode=mode)
+                saved = differ.stats()['bytes_saved'] if differ else 0
+                self.signals.status_update.emit(f"Screenshot{' change' if region else ''} captured and sent to AI "
+                                                f"({summary}, {1000 * (sent - requested_at):.0f} ms from hotkey"
+                                                f"{f', {saved // 1024} KB saved so far' if saved else ''})")
+            except Exception as e:
+                self.signals.status_update.emit(f"Screenshot error: {str(e)}")
 
-    def send_screenshot_to_gemini(self, image_bytes):
-        """Send screenshot to Gemini."""
+    def _screenshot_payload(self, image, prompt, change, screenshot):
+        """(image bytes or None, mime type, prompt, summary) for a capture; OCR text replaces the pixels when it reads well."""
+        ocr = self.screenshot_ocr
+        result = None
+        if ocr:
+            try:
+                result = ocr.recognize(image)
+            except Exception as e:
+                print(f"Screenshot OCR failed, sending the image: {e}")
+        plan = ocr.plan(result) if ocr else 'image'
+        if plan == 'image':
+            encoded = self.screenshot_encoder.encode(image)
+            summary = encoded.describe() + (f", OCR {result.describe()}" if result else "")
+            return encoded.data, encoded.mime_type, prompt, summary
+        
+        source = "a screenshot of my screen"
+        if change and change.kind == 'region':
+            source = (f"the region {change.box} of a {screenshot.width}x{screenshot.height} screen that changed "
+                      f"since the previous screenshot in this conversation")
+        thumbnail = self.thumbnail_encoder.encode(image) if plan == 'thumbnail' else None
+        prompt = GeminiClient.ocr_prompt(result.text, source, thumbnail=thumbnail is not None)
+        summary = f"OCR text, {len(prompt.encode('utf-8')) // 1024} KB, {result.describe()}"
+        if thumbnail:
+            return thumbnail.data, thumbnail.mime_type, prompt, f"{summary} + {thumbnail.describe()}"
+        return None, 'text/plain', prompt, summary
+
+    def send_screenshot_to_gemini(self, image_bytes, mime_type='image/png', prompt=GeminiClient.SCREENSHOT_PROMPT,
+                                  on_answered=None):
+        """Send screenshot to Gemini; ``on_answered`` runs once the answer has streamed in full."""
         if not self.gemini_client.chat:
             self.signals.status_update.emit("Error: Gemini API not configured")
             return
         
+        trace = tracer.new_trace()
+        self._begin_trace(trace, None)
+        
+        if self.gemini_async:
+            # Shown when its turn comes, so it never lands inside an answer still streaming
+            def on_start(request_id):
+                self.signals.add_screenshot_message.emit()
+                self.signals.add_assistant_message_start.emit()
+            
+            self._submit_async(self.gemini_async.send_screenshot, image_bytes, on_start=on_start, trace=trace,
+                               kind='screenshot', on_answered=on_answered, prompt=prompt, mime_type=mime_type)
+            return
+        
         def gemini_screenshot_worker():
             try:
+                self.signals.add_screenshot_message.emit()
                 self.signals.add_assistant_message_start.emit()
-                response = self.gemini_client.send_screenshot_stream(image_bytes)
+                response = self.gemini_client.send_screenshot_stream(image_bytes, prompt, trace=trace,
+                                                                     mime_type=mime_type)
                 
                 for chunk in response:
                     if hasattr(chunk, 'text') and chunk.text:
                         self.signals.add_assistant_chunk.emit(chunk.text)
                 
+                if on_answered:
+                    on_answered()
                 if self.chunk_buffer:
                     QTimer.singleShot(0, self._render_assistant_message_safe)
                 
@@ -570,6 +959,8 @@ class MainWindow(QWidget):
         self.scroll_to_bottom()
 
     def start_assistant_message(self):
+        # Chunks of a cancelled answer still waiting to render belong to that answer
+        self._render_assistant_message_safe()
         self.current_assistant_message = ""
         self.assistant_message_start_pos = len(self.chat_display.toPlainText())
         
@@ -592,6 +983,8 @@ class MainWindow(QWidget):
             </div>
             <br />
         ''')
+        # Renders replace only this range, so bubbles added after it while it streams stay
+        self.assistant_message_end_pos = len(self.chat_display.toPlainText())
         self.scroll_to_bottom()
 
     def add_assistant_chunk(self, chunk):
@@ -604,6 +997,7 @@ class MainWindow(QWidget):
         if not self.chunk_buffer:
             return
         
+        render_start = tracer.now()
         self.current_assistant_message += ''.join(self.chunk_buffer)
         self.chunk_buffer = []
         self.last_ui_update = time.time()
@@ -612,7 +1006,8 @@ class MainWindow(QWidget):
         
         cursor = self.chat_display.textCursor()
         cursor.setPosition(self.assistant_message_start_pos)
-        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.setPosition(min(self.assistant_message_end_pos, len(self.chat_display.toPlainText())),
+                           QTextCursor.MoveMode.KeepAnchor)
         cursor.removeSelectedText()
         
         cursor.insertHtml(f'''
@@ -633,7 +1028,17 @@ class MainWindow(QWidget):
                 <br>
             </div>
         ''')
+        self.assistant_message_end_pos = cursor.position()
         self.scroll_to_bottom()
+        
+        if tracer.enabled:
+            now = tracer.now()
+            tracer.record('render', render_start, now, trace=self.current_trace,
+                          chars=len(self.current_assistant_message))
+            if self.pending_first_render:
+                trace, speech_end = self.pending_first_render
+                self.pending_first_render = None
+                tracer.record('end_to_end', speech_end, now, trace=trace)
 
     def scroll_to_bottom(self):
         scrollbar = self.chat_display.verticalScrollBar()
@@ -785,6 +1190,15 @@ class MainWindow(QWidget):
         if self.audio_transcriber.is_transcribing:
             self.audio_transcriber.stop()
         
+        if self.gemini_async:
+            self.gemini_async.shutdown()
+        
+        if self.screenshot_ocr:
+            self.screenshot_ocr.close()
+        
+        if self.gemini_client.response_cache is not None:
+            self.gemini_client.response_cache.flush()
+        
         if hasattr(self, 'hotkey_listener'):
             self.hotkey_listener.stop()
             
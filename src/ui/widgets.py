@@ -1,5 +1,7 @@
 import ctypes
-from PyQt6.QtWidgets import QComboBox
+from PyQt6.QtWidgets import QComboBox, QWidget
+from PyQt6.QtCore import Qt, QRect, pyqtSignal
+from PyQt6.QtGui import QColor, QCursor, QGuiApplication, QPainter, QPen
 
 class CustomComboBox(QComboBox):
     """Custom QComboBox that hides popup from screen capture."""
@@ -23,3 +25,64 @@ class CustomComboBox(QComboBox):
     def set_screen_share_hidden(self, hidden):
         """Set whether popup should be hidden from screen sharing."""
         self.screen_share_hidden = hidden
+
+
+class RegionSelector(QWidget):
+    """Full-screen overlay for dragging out a screenshot region.
+    
+    Covers the screen under the cursor. A drag emits ``selected`` with the
+    (left, top, right, bottom) box in physical pixels of the virtual
+    desktop, the coordinates screen grabs use; a click without a drag
+    emits None to clear the region. Escape cancels.
+    """
+    selected = pyqtSignal(object)
+    
+    def __init__(self):
+        super().__init__(None, Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint
+                         | Qt.WindowType.Tool)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setCursor(Qt.CursorShape.CrossCursor)
+        self.screen_ = QGuiApplication.screenAt(QCursor.pos()) or QGuiApplication.primaryScreen()
+        self.setGeometry(self.screen_.geometry())
+        self.origin = None
+        self.current = None
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 90))
+        if self.origin and self.current:
+            rect = QRect(self.origin, self.current).normalized()
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
+            painter.fillRect(rect, Qt.GlobalColor.transparent)
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+            painter.setPen(QPen(QColor('#7fd1ff'), 2))
+            painter.drawRect(rect)
+    
+    def mousePressEvent(self, event):
+        self.origin = self.current = event.position().toPoint()
+        self.update()
+    
+    def mouseMoveEvent(self, event):
+        if self.origin:
+            self.current = event.position().toPoint()
+            self.update()
+    
+    def mouseReleaseEvent(self, event):
+        if not self.origin:
+            return
+        rect = QRect(self.origin, event.position().toPoint()).normalized()
+        self.close()
+        if rect.width() < 8 or rect.height() < 8:
+            self.selected.emit(None)
+            return
+        # Qt keeps each screen's top-left in physical pixels and scales the rest by its ratio
+        ratio = self.screen_.devicePixelRatio()
+        origin = self.screen_.geometry().topLeft()
+        self.selected.emit((origin.x() + round(rect.left() * ratio), origin.y() + round(rect.top() * ratio),
+                            origin.x() + round((rect.right() + 1) * ratio),
+                            origin.y() + round((rect.bottom() + 1) * ratio)))
+    
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            self.close()
@@ -23,10 +23,14 @@ def markdown_to_html(text):
     return html
 
 def resample_audio(audio_data, orig_rate, target_rate=16000):
-    """Resample audio to target rate."""
+    """Resample a single buffer to target rate.
+
+    For continuous chunked capture use ``src.core.resampler.StreamingResampler``,
+    which keeps filter state between chunks.
+    """
     try:
         number_of_samples = round(len(audio_data) * float(target_rate) / orig_rate)
         resampled = signal.resample(audio_data, number_of_samples)
-        return resampled.astype(np.int16)
+        return np.clip(resampled, -32768, 32767).astype(np.int16)
     except:
         return audio_data
@@ -0,0 +1,149 @@
+import atexit
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from src.config import Config
+
+
+class Tracer:
+    """Record latency spans per utterance and request.
+
+    A span is a stage name with monotonic ``perf_counter`` start/end times
+    and an optional trace id that ties the stages of one utterance or
+    Gemini request together. Spans go to a JSONL file when ``path`` is set
+    and into small per-stage windows that ``summary()`` turns into p50/p95
+    for the in-app HUD. The file is opened on the first span; if that
+    fails, spans are only kept for the summary.
+
+    When disabled, ``record`` returns after one attribute check and
+    ``span`` hands back a shared no-op context manager, so call sites can
+    stay in hot paths.
+    """
+
+    def __init__(self, path=None, enabled=False, window=500, sample_every=None):
+        self.enabled = bool(enabled or path)
+        self.path = path
+        self.window = window
+        # High-rate stages only write every Nth span to disk; all of them count in summary()
+        self.sample_every = sample_every or {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._durations = {}
+        self._seen = {}
+        self._file = None
+        # Until the first span, or for good once opening failed or the tracer was closed
+        self._file_pending = bool(path)
+        self._last_flush = 0.0
+        if path:
+            atexit.register(self.close)
+
+    @staticmethod
+    def now():
+        return time.perf_counter()
+
+    def new_trace(self):
+        """Return a fresh id for one utterance or request (0 when disabled)."""
+        return next(self._ids) if self.enabled else 0
+
+    def record(self, stage, start, end=None, trace=None, **fields):
+        """Record one finished span."""
+        if not self.enabled:
+            return
+        if end is None:
+            end = time.perf_counter()
+        duration = end - start
+        with self._lock:
+            window = self._durations.get(stage)
+            if window is None:
+                window = self._durations[stage] = deque(maxlen=self.window)
+            window.append(duration)
+            if self._file_pending:
+                self._open_file()
+            if not self._file:
+                return
+            seen = self._seen[stage] = self._seen.get(stage, 0) + 1
+            if seen % self.sample_every.get(stage, 1):
+                return
+            span = {'stage': stage, 'trace': trace, 'start': round(start, 6), 'end': round(end, 6),
+                    'ms': round(1000 * duration, 3)}
+            if fields:
+                span.update(fields)
+            self._file.write(json.dumps(span) + "\n")
+            if end - self._last_flush > 1.0:
+                self._file.flush()
+                self._last_flush = end
+
+    def _open_file(self):
+        # Caller holds the lock
+        self._file_pending = False
+        try:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"Warning: trace log {self.path} could not be opened, spans are only summarized: {e}")
+
+    def span(self, stage, trace=None, **fields):
+        """Context manager form of ``record`` around a block."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, trace, fields)
+
+    def summary(self):
+        """p50/p95/count in milliseconds per stage over the recent window."""
+        with self._lock:
+            windows = {stage: sorted(values) for stage, values in self._durations.items()}
+        result = {}
+        for stage, values in windows.items():
+            if not values:
+                continue
+            n = len(values)
+            result[stage] = {
+                'count': n,
+                'p50_ms': 1000 * values[int(0.5 * (n - 1))],
+                'p95_ms': 1000 * values[int(0.95 * (n - 1))],
+            }
+        return result
+
+    def close(self):
+        with self._lock:
+            self._file_pending = False
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class _Span:
+    __slots__ = ('tracer', 'stage', 'trace', 'fields', 'start')
+
+    def __init__(self, tracer, stage, trace, fields):
+        self.tracer = tracer
+        self.stage = stage
+        self.trace = trace
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.stage, self.start, trace=self.trace, **self.fields)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+# Per-chunk audio spans arrive ~47 times a second
+CHUNK_SAMPLE_EVERY = 50
+
+# Process-wide tracer configured from TRACE_LOG / LATENCY_HUD
+tracer = Tracer(Config.TRACE_LOG or None, enabled=Config.LATENCY_HUD,
+                sample_every={'capture': CHUNK_SAMPLE_EVERY})
@@ -0,0 +1,171 @@
+import time
+
+from src.core.audio import AudioTranscriber
+from src.core.sources import SyntheticSource
+
+
+class Signal:
+    def __init__(self):
+        self.messages = []
+
+    def emit(self, message):
+        self.messages.append(message)
+
+
+class Signals:
+    def __init__(self):
+        self.status_update = Signal()
+        self.transcription_update = Signal()
+
+
+class RecordingStream:
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, payload):
+        self.data += payload
+
+    def close(self):
+        self.closed = True
+
+
+class StubRecognizer:
+    def start_continuous_recognition(self):
+        pass
+
+    def stop_continuous_recognition(self):
+        pass
+
+    def stop_continuous_recognition_async(self):
+        pass
+
+
+class StubConnection:
+    def close(self):
+        pass
+
+
+class OfflineTranscriber(AudioTranscriber):
+    """Swaps Azure for recording streams; everything else is the real worker."""
+
+    def __init__(self, signals, source_factory):
+        super().__init__(signals, source_factory)
+        self.streams = []
+        self.connect_delay = 0.0
+
+    def _create_recognizer(self, api_key, region):
+        time.sleep(self.connect_delay)
+        stream = RecordingStream()
+        self.streams.append((api_key, stream))
+        return stream, StubRecognizer()
+
+    def _open_connection(self, recognizer):
+        return StubConnection()
+
+
+def _tone_source():
+    return SyntheticSource('tone', channels=2, rate=48000, realtime=True)
+
+
+def test_rotation_keeps_capture_and_replays_unrecognized_audio(monkeypatch):
+    monkeypatch.setattr('src.config.Config.VAD_MODE', 'off')
+    monkeypatch.setattr('src.config.Config.WARM_STANDBY', False)
+    opened = []
+
+    def source_factory():
+        source = SyntheticSource('noise', channels=2, rate=48000, realtime=True)
+        opened.append(source)
+        return source
+
+    transcriber = OfflineTranscriber(Signals(), source_factory)
+    transcriber.start(['key-a', 'key-b'], 'region')
+    time.sleep(0.5)
+
+    # Azure finalized the first 0.2 s, then the key hit its quota
+    transcriber._mark_recognized(2_000_000)
+    transcriber.connect_delay = 0.3
+    transcriber.current_key_idx = 1
+    transcriber.switch_key_requested = True
+    time.sleep(1.0)
+    transcriber.stop()
+    transcriber.transcription_thread.join(2)
+
+    (_, first), (key, second) = transcriber.streams
+    assert key == 'key-b'
+    assert len(opened) == 1
+    assert transcriber.rotations == 1
+
+    # Replay starts at the push chunk holding the recognized point, so every
+    # byte the old stream did not finalize reaches the new one
+    recognized = 2 * 16000 * 2 // 10
+    replay_start = first.data.find(second.data[:256])
+    assert recognized - 700 < replay_start <= recognized
+    assert second.data.startswith(first.data[replay_start:])
+    assert len(second.data) > len(first.data) - replay_start
+
+
+def test_warm_standby_serves_start_and_failover(monkeypatch):
+    monkeypatch.setattr('src.config.Config.VAD_MODE', 'off')
+    monkeypatch.setattr('src.config.Config.WARM_STANDBY', True)
+
+    transcriber = OfflineTranscriber(Signals(), _tone_source)
+    transcriber.prepare(['key-a', 'key-b'], 'region')
+    time.sleep(0.2)
+    assert [key for key, _ in transcriber.streams] == ['key-a', 'key-b']
+
+    transcriber.start(['key-a', 'key-b'], 'region')
+    time.sleep(0.3)
+    assert transcriber.startup_metrics['warm_recognizer']
+    assert transcriber.startup_metrics['warm_device']
+
+    transcriber.connect_delay = 1.0
+    transcriber.current_key_idx = 1
+    started = time.perf_counter()
+    transcriber.switch_key_requested = True
+    while transcriber.rotations == 0 and time.perf_counter() - started < 2:
+        time.sleep(0.01)
+    # The failover recognizer was already built, so rotation skips the slow connect
+    assert time.perf_counter() - started < 0.5
+    transcriber.stop()
+    transcriber.transcription_thread.join(2)
+
+
+def test_stale_warm_device_is_resolved_again(monkeypatch):
+    monkeypatch.setattr('src.config.Config.VAD_MODE', 'off')
+    monkeypatch.setattr('src.config.Config.WARM_STANDBY', True)
+    sources = []
+
+    class UnpluggedSource(SyntheticSource):
+        def open(self):
+            raise OSError("device unplugged")
+
+    def source_factory():
+        # The first source is the standby resolved before the device went away
+        source = (UnpluggedSource if not sources else SyntheticSource)('tone', channels=2, rate=48000, realtime=True)
+        sources.append(source)
+        return source
+
+    signals = Signals()
+    transcriber = OfflineTranscriber(signals, source_factory)
+    transcriber.prepare(['key-a'], 'region')
+    time.sleep(0.2)
+    transcriber.start(['key-a'], 'region')
+    time.sleep(0.3)
+    assert transcriber.is_transcribing
+    assert transcriber.pipeline.channels == 2 and len(sources) == 2
+    transcriber.stop()
+    transcriber.transcription_thread.join(2)
+    assert not [m for m in signals.status_update.messages if m.startswith("Error")]
+
+
+def test_stale_standby_recognizers_are_closed(monkeypatch):
+    monkeypatch.setattr('src.config.Config.WARM_STANDBY', True)
+
+    transcriber = OfflineTranscriber(Signals(), _tone_source)
+    transcriber.prepare(['key-a', 'key-b'], 'region')
+    time.sleep(0.2)
+    transcriber.prepare(['key-c'], 'region')
+    time.sleep(0.2)
+    stale = [stream for key, stream in transcriber.streams if key != 'key-c']
+    assert stale and all(stream.closed for stream in stale)
@@ -0,0 +1,35 @@
+from benchmarks.replay_batching import replay, score, synthetic_session
+from src.core.batching import AdaptiveFlushPolicy, FixedFlushPolicy
+
+
+def test_wait_follows_how_finished_the_text_sounds():
+    policy = AdaptiveFlushPolicy(min_wait=0.3, max_wait=3.0, statement_wait=1.2)
+
+    assert policy.on_final("How would you scale this?", 0.0, trailing_silence=0.5) == 0.3
+    assert policy.on_final("Tell me about yourself.", 10.0) == 0.3
+    assert policy.on_final("So looking at your resume, and", 20.0) == 3.0
+    assert abs(policy.on_final("Looking at your resume.", 30.0, trailing_silence=0.5) - 0.7) < 1e-9
+
+
+def test_partials_hold_the_batch_and_teach_the_pause_length():
+    policy = AdaptiveFlushPolicy(min_wait=0.3, max_wait=3.0, statement_wait=1.0, gap_margin=0.2)
+    assert policy.on_partial(0.0) is None
+
+    for start in (0.0, 10.0, 20.0, 30.0):
+        policy.on_final("Looking at your resume.", start)
+        assert policy.on_partial(start + 1.5) == 3.0
+        policy.on_partial(start + 1.8)  # only the first partial measures the pause
+        policy.on_flush(start + 5.0)
+
+    assert policy.gaps == [1.5] * 4
+    assert abs(policy.on_final("Looking at your resume.", 40.0) - 1.7) < 1e-9
+
+
+def test_adaptive_policy_beats_fixed_timer_on_replay():
+    events = synthetic_session(turns=60, seed=1)
+    fixed = score(replay(events, FixedFlushPolicy(2.0)))
+    adaptive = score(replay(events, AdaptiveFlushPolicy()))
+
+    assert fixed['questions'] == adaptive['questions'] == 60
+    assert adaptive['mean_s'] < fixed['mean_s']
+    assert adaptive['split_rate'] < fixed['split_rate']
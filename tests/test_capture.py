@@ -0,0 +1,104 @@
+import sys
+import types
+
+import pytest
+
+from src.core.capture import MSSCapture, PILCapture, ScreenCapture, clamp_box, create_capture, parse_region
+
+
+class FakeShot:
+    def __init__(self, box, value):
+        self.size = (box[2] - box[0], box[3] - box[1])
+        # BGRX: blue, green, red, padding
+        self.raw = bytearray(bytes((value, 0, 255 - value, 0)) * (self.size[0] * self.size[1]))
+
+
+class FakeMSS:
+    monitors = [
+        {'left': -1920, 'top': 0, 'width': 3840, 'height': 1080},
+        {'left': 0, 'top': 0, 'width': 1920, 'height': 1080},
+        {'left': -1920, 'top': 0, 'width': 1920, 'height': 1080},
+    ]
+
+    def __init__(self):
+        self.grabs = []
+
+    def grab(self, box):
+        self.grabs.append(box)
+        return FakeShot(box, len(self.grabs))
+
+    def close(self):
+        pass
+
+
+class FakeBackend:
+    name = 'fake'
+
+    def __init__(self, monitors):
+        self._monitors = monitors
+        self.boxes = []
+
+    def monitors(self):
+        return self._monitors
+
+    def grab(self, box=None):
+        self.boxes.append(box)
+        return 'image'
+
+
+def test_parse_region():
+    assert parse_region("100, 50, 800, 600") == (100, 50, 900, 650)
+    assert parse_region("-1920,0,640,480") == (-1920, 0, -1280, 480)
+    assert parse_region("") is None
+    for bad in ("100,50,800", "a,b,c,d", "0,0,0,600"):
+        with pytest.raises(ValueError):
+            parse_region(bad)
+
+
+def test_clamp_box():
+    assert clamp_box((-50, 100, 300, 5000), (0, 0, 1920, 1080)) == (0, 100, 300, 1080)
+    assert clamp_box((2000, 0, 2100, 100), (0, 0, 1920, 1080)) is None
+
+
+def test_targets_resolve_to_boxes_and_fall_back_to_the_screen():
+    backend = FakeBackend([(-1920, 0, 1920, 1080), (0, 0, 1920, 1080), (-1920, 0, 0, 1080)])
+    capture = ScreenCapture(backend)
+    assert capture.resolve() is None
+
+    capture.target, capture.monitor = 'monitor', 2
+    assert capture.resolve() == (-1920, 0, 0, 1080)
+    capture.monitor = 5
+    assert capture.resolve() is None
+
+    capture.target = 'window'
+    assert capture.resolve((100, -20, 900, 600)) == (100, 0, 900, 600)
+    assert capture.resolve(None) is None
+
+    capture.target, capture.region = 'region', (1800, 1000, 2200, 1200)
+    assert capture.grab() == ('image', (1800, 1000, 1920, 1080))
+    assert backend.boxes == [(1800, 1000, 1920, 1080)]
+
+    with pytest.raises(ValueError):
+        ScreenCapture(backend, target='tab')
+
+
+def test_mss_capture_reuses_its_image_between_grabs(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'mss', types.SimpleNamespace(MSS=FakeMSS))
+    capture = MSSCapture()
+    assert capture.monitors()[2] == (-1920, 0, 0, 1080)
+
+    first = capture.grab((0, 0, 64, 32))
+    assert first.size == (64, 32) and first.getpixel((0, 0)) == (254, 0, 1)
+    second = capture.grab((100, 100, 164, 132))
+    assert second is first and second.getpixel((5, 5)) == (253, 0, 2)
+
+    full = capture.grab()
+    assert full.size == (1920, 1080) and full is not first
+    assert capture._sct.grabs[-1] == (0, 0, 1920, 1080)
+
+
+def test_create_capture_falls_back_to_pil_without_mss(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'mss', None)
+    assert isinstance(create_capture('auto'), PILCapture)
+    assert isinstance(create_capture('mss'), PILCapture)
+    assert isinstance(create_capture('pil'), PILCapture)
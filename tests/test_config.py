@@ -0,0 +1,39 @@
+from src.config import _env_number, _env_weights
+
+
+def test_channel_weights_fall_back_when_malformed(monkeypatch, capsys):
+    monkeypatch.setenv('AUDIO_CHANNEL_WEIGHTS', "1, 1,0.7")
+    assert _env_weights('AUDIO_CHANNEL_WEIGHTS') == [1.0, 1.0, 0.7]
+    monkeypatch.setenv('AUDIO_CHANNEL_WEIGHTS', "1,,0.7")
+    assert _env_weights('AUDIO_CHANNEL_WEIGHTS') is None
+    assert "AUDIO_CHANNEL_WEIGHTS" in capsys.readouterr().out
+    monkeypatch.setenv('AUDIO_CHANNEL_WEIGHTS', "")
+    assert _env_weights('AUDIO_CHANNEL_WEIGHTS') is None
+
+
+def test_vad_numbers_fall_back_when_malformed(monkeypatch, capsys):
+    monkeypatch.setenv('VAD_PREROLL_MS', "250")
+    assert _env_number('VAD_PREROLL_MS', 300, int) == 250
+    monkeypatch.setenv('VAD_PREROLL_MS', "250ms")
+    assert _env_number('VAD_PREROLL_MS', 300, int) == 300
+    assert "VAD_PREROLL_MS" in capsys.readouterr().out
+    monkeypatch.delenv('VAD_THRESHOLD_DB', raising=False)
+    assert _env_number('VAD_THRESHOLD_DB', 9.0) == 9.0
+
+
+def test_malformed_numeric_settings_do_not_break_startup(monkeypatch, capsys):
+    import importlib
+    import src.config as config
+
+    original = config.Config
+    for name in ('GEMINI_MAX_CONCURRENT', 'SCREENSHOT_QUALITY', 'RESPONSE_CACHE_SIMILARITY', 'BATCH_MAX_WAIT_MS'):
+        monkeypatch.setenv(name, "lots")
+    try:
+        reloaded = importlib.reload(config).Config
+        assert reloaded.GEMINI_MAX_CONCURRENT == 2
+        assert reloaded.SCREENSHOT_QUALITY == 80
+        assert reloaded.RESPONSE_CACHE_SIMILARITY == 0.0
+        assert reloaded.BATCH_MAX_WAIT_MS == 3000
+        assert "BATCH_MAX_WAIT_MS" in capsys.readouterr().out
+    finally:
+        config.Config = original
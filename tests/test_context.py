@@ -0,0 +1,64 @@
+from google.genai import types
+
+from src.core.context import SCREENSHOT_PLACEHOLDER, SUMMARY_PREFIX, ContextManager, content_text
+
+
+def turn(question, answer, image=None):
+    parts = [types.Part.from_bytes(data=image, mime_type='image/png')] if image else []
+    parts.append(types.Part.from_text(text=question))
+    return [
+        types.Content(role='user', parts=parts),
+        types.Content(role='model', parts=[types.Part.from_text(text=answer)]),
+    ]
+
+
+def session(n, image_every=0):
+    history = []
+    for i in range(n):
+        image = b"\x89PNG" * 100 if image_every and i % image_every == 0 else None
+        history += turn(f"Question number {i}?", f"Answer number {i}. " + "detail " * 40, image)
+    return history
+
+
+def test_short_text_history_is_left_alone():
+    history = session(3)
+    assert ContextManager(keep_turns=6).compact(history) is history
+
+
+def test_answered_screenshots_become_text():
+    manager = ContextManager(keep_turns=6)
+    compacted = manager.compact(session(3, image_every=1))
+
+    assert len(compacted) == 6
+    assert all(p.inline_data is None for c in compacted for p in c.parts)
+    assert content_text(compacted[0]).startswith(SCREENSHOT_PLACEHOLDER)
+    assert manager.images_replaced == 3
+
+
+def test_old_turns_fold_into_a_summary():
+    manager = ContextManager(keep_turns=4)
+    compacted = manager.compact(session(30))
+
+    summary = content_text(compacted[0])
+    assert summary.startswith(SUMMARY_PREFIX)
+    assert "Question number 25?" in summary and "Question number 26?" not in summary
+    assert [c.role for c in compacted[:2]] == ['user', 'model']
+    assert content_text(compacted[2]) == "Question number 26?"
+    assert len(compacted) == 2 + 2 * 4
+    # Already compact: a second pass changes nothing
+    assert manager.compact(compacted) is compacted
+
+    compacted = manager.compact(compacted + turn("Question number 30?", "Answer number 30."))
+    summary = content_text(compacted[0])
+    assert "Question number 25?" in summary and "Question number 26?" in summary
+    assert summary.count(SUMMARY_PREFIX) == 1
+
+
+def test_token_budget_keeps_fewer_turns_and_trims_the_summary():
+    manager = ContextManager(max_tokens=400, keep_turns=6, min_turns=2, summary_tokens=150)
+    compacted = manager.compact(session(40))
+
+    assert len(compacted) == 2 + 2 * 3
+    assert manager.tokens(compacted) <= 400
+    summary = content_text(compacted[0])
+    assert "Question number 36?" in summary and "Question number 0?" not in summary
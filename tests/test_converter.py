@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from src.core.converter import FrameConverter, downmix_weights
+
+
+def test_surround_downmix_drops_lfe():
+    converter = FrameConverter(6, 16000, 16000)
+    frames = np.zeros((4, 6), dtype=np.int16)
+    frames[:, 3] = 20000
+    assert not converter.convert(frames.reshape(-1)).any()
+
+    frames[:, 2] = 10000
+    expected = round(10000 * 0.707 / sum((1.0, 1.0, 0.707, 0.0, 0.707, 0.707)))
+    assert list(converter.convert(frames.reshape(-1))) == [expected] * 4
+
+
+def test_custom_weights_and_clipping():
+    converter = FrameConverter(2, 16000, 16000, weights=(1.0, -1.0))
+    frames = np.array([[32767, -32768], [-32768, 32767]], dtype=np.int16)
+    assert list(converter.convert(frames.reshape(-1))) == [32767, -32768]
+
+    with pytest.raises(ValueError):
+        downmix_weights(4, (1.0, 1.0))
+
+
+def test_reuses_output_buffer_and_resamples():
+    converter = FrameConverter(8, 48000, 16000, max_frames=1024)
+    chunk = np.ones(1024 * 8, dtype=np.int16)
+    first = converter.convert(chunk)
+    second = converter.convert(chunk)
+    assert first.dtype == np.int16
+    assert np.shares_memory(first, second)
+    assert sum(len(converter.convert(chunk)) for _ in range(3)) == 1024
@@ -0,0 +1,55 @@
+import threading
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.gemini_async import AsyncGeminiClient
+
+
+def make_client(monkeypatch, server, keys=('k1', 'k2')):
+    monkeypatch.setattr(Config, 'GEMINI_BASE_URL', server.base_url)
+    monkeypatch.setattr(Config, 'GEMINI_API_KEYS', list(keys))
+    monkeypatch.setattr(Config, 'GEMINI_WARM_CLIENTS', False)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE', False)
+    monkeypatch.setattr(Config, 'GEMINI_USAGE_FILE', '')
+    return GeminiClient()
+
+
+def test_streams_text_and_screenshots_from_the_stand_in(monkeypatch):
+    with FakeGeminiServer(first_token_ms=10, chunk_interval_ms=1, chunk_chars=20, answer_chars=100) as server:
+        client = make_client(monkeypatch, server)
+        chunks = [c.text for c in client.send_message_stream("How does a hash map work?")]
+        assert len(chunks) == 5 and len("".join(chunks)) == 100
+
+        answer = "".join(c.text for c in client.send_screenshot_stream(b"\x89PNG fake"))
+        assert len(answer) == 100
+        assert server.stats()['images'] == 1
+        assert [c.role for c in client.chat.get_history()].count('user') == 2
+        assert client.context_tokens > 0
+
+
+def test_rate_limit_moves_to_the_next_key(monkeypatch):
+    with FakeGeminiServer(first_token_ms=10, chunk_interval_ms=1, retry_delay_s=7) as server:
+        client = make_client(monkeypatch, server)
+        server.fail_next(429)
+        assert "".join(c.text for c in client.send_message_stream("q"))
+
+        stats = server.stats()
+        assert stats['by_key'] == {'k1': 1, 'k2': 1}
+        assert stats['errors'] == {429: 1}
+        assert 6 < client.key_stats()[0]['cooldown_s'] <= 7
+
+
+def test_async_client_streams_from_the_stand_in(monkeypatch):
+    with FakeGeminiServer(first_token_ms=10, chunk_interval_ms=1, chunk_chars=20, answer_chars=100) as server:
+        client = make_client(monkeypatch, server)
+        async_client = AsyncGeminiClient(client)
+        chunks = []
+        done = threading.Event()
+        async_client.send_message("q", chunks.append, on_done=lambda _id: done.set())
+
+        assert done.wait(10)
+        assert len("".join(chunks)) == 100
+        history = client.chat.get_history()
+        assert history[0].role == 'user' and history[-1].role == 'model'
+        async_client.shutdown()
@@ -0,0 +1,283 @@
+import asyncio
+import threading
+import time
+
+from src.core.gemini_async import AsyncGeminiClient
+from src.core.key_pool import KeyPool
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeAsyncChat:
+    def __init__(self, backend, history, key_idx=0):
+        self.backend = backend
+        self.history = list(history)
+        self.key_idx = key_idx
+
+    def get_history(self):
+        return list(self.history)
+
+    async def send_message_stream(self, message):
+        if self.backend.fail_next:
+            self.backend.fail_next -= 1
+            raise Exception("429 RESOURCE_EXHAUSTED")
+        return self._stream(message)
+
+    async def _stream(self, message):
+        backend = self.backend
+        backend.active += 1
+        backend.peak = max(backend.peak, backend.active)
+        try:
+            reply = []
+            await asyncio.sleep(backend.first_delay.get(self.key_idx, 0.0))
+            for i in range(backend.chunks):
+                await asyncio.sleep(backend.delay)
+                backend.generated += 1
+                reply.append(f"{message}:{i} ")
+                yield Chunk(reply[-1])
+            self.history += [('user', message), ('model', "".join(reply))]
+        finally:
+            backend.active -= 1
+
+
+class FakeBackend:
+    """Stands in for genai.Client plus GeminiClient's chat state."""
+
+    SCREENSHOT_PROMPT = "describe"
+
+    def __init__(self, chunks=5, delay=0.01):
+        self.chunks = chunks
+        self.delay = delay
+        self.fail_next = 0
+        self.active = 0
+        self.peak = 0
+        self.generated = 0
+        self.rotations = 0
+        self.first_delay = {}
+        self.cache = {}
+        self.history = []
+        self.api_keys = ['a', 'b']
+        self.current_key_idx = 0
+        self.current_model = 'fake-model'
+        self.key_pool = KeyPool(self.api_keys, rpm=1000)
+        self.chat = self
+        self.client = self
+        self.aio = self
+        self.chats = self
+
+    def client_for(self, index):
+        return _KeyClient(self, index)
+
+    # GeminiClient surface
+    def get_history(self):
+        return list(self.history)
+
+    def context_history(self):
+        return list(self.history)
+
+    def get_full_system_instruction(self):
+        return "system"
+
+    def chat_config(self, index=None, model=None):
+        return {"system_instruction": "system"}
+
+    def initialize(self):
+        return True
+
+    def acquire_key(self, tokens=0):
+        state = self.key_pool.acquire(tokens, prefer=self.current_key_idx)
+        if state is None:
+            return None, self.key_pool.wait_time(tokens)
+        if state.index != self.current_key_idx:
+            self.rotations += 1
+            self.current_key_idx = state.index
+        return state, 0.0
+
+    def estimate_tokens(self, message):
+        return 10
+
+    def note_usage(self, chunk):
+        return None
+
+    def append_history(self, turns):
+        self.history += turns
+
+    def context_key(self):
+        return ''
+
+    def cached_answer(self, text, model=None, context=''):
+        return self.cache.get(text)
+
+    def remember_answer(self, text, chunks, model=None, context=''):
+        self.cache[text] = chunks
+
+    def route(self, message):
+        return None
+
+    def add_exchange(self, question, answer):
+        self.history += [('user', question), ('model', answer)]
+
+    @staticmethod
+    def screenshot_message(image_bytes, prompt, mime_type='image/png'):
+        return f"{prompt}[{len(image_bytes)}]"
+
+
+class _KeyClient:
+    """genai.Client().aio.chats for one key."""
+
+    def __init__(self, backend, index):
+        self.backend = backend
+        self.index = index
+        self.aio = self
+        self.chats = self
+
+    def create(self, model, config, history):
+        return FakeAsyncChat(self.backend, history, self.index)
+
+
+def _collect(client, message, **kwargs):
+    chunks = []
+    done = threading.Event()
+    request_id = client.send_message(message, chunks.append, on_done=lambda _id: done.set(), **kwargs)
+    return request_id, chunks, done
+
+
+def test_streams_and_appends_history():
+    backend = FakeBackend()
+    client = AsyncGeminiClient(backend)
+    request_id, chunks, done = _collect(client, "q1")
+
+    assert done.wait(2)
+    assert request_id == 1
+    assert "".join(chunks) == "q1:0 q1:1 q1:2 q1:3 q1:4 "
+    assert backend.history == [('user', "q1"), ('model', "".join(chunks))]
+    assert client.stats()['completed'] == 1
+    client.shutdown()
+
+
+def test_newer_request_cancels_the_stale_stream():
+    backend = FakeBackend(chunks=50, delay=0.01)
+    client = AsyncGeminiClient(backend)
+    _, old_chunks, old_done = _collect(client, "old")
+    while not old_chunks:
+        time.sleep(0.001)
+    _, new_chunks, new_done = _collect(client, "new")
+
+    assert new_done.wait(5)
+    assert not old_done.is_set()
+    # The old stream stopped early instead of generating all 50 chunks
+    assert len(old_chunks) < 50
+    assert backend.generated < 100
+    assert backend.history == [('user', "new"), ('model', "".join(new_chunks))]
+    stats = client.stats()
+    assert stats['cancelled'] == 1 and stats['completed'] == 1 and stats['in_flight'] == 0
+    client.shutdown()
+
+
+def test_requests_only_supersede_their_own_kind():
+    backend = FakeBackend(chunks=20, delay=0.01)
+    client = AsyncGeminiClient(backend)
+    _, answer_chunks, answer_done = _collect(client, "utterance")
+    while not answer_chunks:
+        time.sleep(0.001)
+    shot_done = threading.Event()
+    shot_id = client.submit("screen", [].append, kind='screenshot', on_done=lambda _id: shot_done.set())
+    assert client.in_flight('screenshot') == [shot_id]
+
+    assert answer_done.wait(5) and shot_done.wait(5)
+    assert len(answer_chunks) == 20
+    assert client.stats()['cancelled'] == 0
+    client.shutdown()
+
+
+def test_concurrency_is_bounded():
+    backend = FakeBackend(chunks=3, delay=0.02)
+    client = AsyncGeminiClient(backend, max_concurrent=2)
+    requests = [_collect(client, f"q{i}", supersede=False) for i in range(5)]
+
+    for _, _, done in requests:
+        assert done.wait(5)
+    assert backend.peak == 2
+    assert len(backend.history) == 10
+    client.shutdown()
+
+
+def test_rate_limit_rotates_and_retries():
+    backend = FakeBackend()
+    backend.fail_next = 1
+    client = AsyncGeminiClient(backend)
+    chunks = []
+    done = threading.Event()
+    client.send_screenshot(b"png", chunks.append, on_done=lambda _id: done.set())
+
+    assert done.wait(2)
+    assert backend.rotations == 1
+    assert chunks[0] == "describe[3]:0 "
+    client.shutdown()
+
+
+def test_slow_key_is_hedged_on_another_key():
+    backend = FakeBackend(chunks=3, delay=0.01)
+    backend.first_delay = {0: 1.0}
+    client = AsyncGeminiClient(backend, hedge_delay=0.05)
+    started = time.perf_counter()
+    _, chunks, done = _collect(client, "q")
+
+    assert done.wait(2)
+    assert time.perf_counter() - started < 0.5
+    assert "".join(chunks) == "q:0 q:1 q:2 "
+    # The slow stream was cancelled before it generated anything
+    assert backend.generated == 3
+    assert backend.history == [('user', "q"), ('model', "q:0 q:1 q:2 ")]
+    stats = client.stats()
+    assert stats['hedged'] == 1 and stats['hedge_wins'] == 1
+    assert stats['hedge_extra_tokens'] == 10
+    assert sum(s['in_flight'] for s in backend.key_pool.stats()) == 0
+    client.shutdown()
+
+
+def test_fast_key_is_not_hedged():
+    backend = FakeBackend(chunks=3, delay=0.01)
+    client = AsyncGeminiClient(backend, hedge_delay=0.2)
+    _, chunks, done = _collect(client, "q")
+
+    assert done.wait(2)
+    stats = client.stats()
+    assert stats['hedged'] == 0 and stats['hedge_extra_tokens'] == 0
+    assert [s['sent'] for s in backend.key_pool.stats()] == [1, 0]
+    client.shutdown()
+
+
+def test_repeated_question_replays_the_cached_answer():
+    backend = FakeBackend(chunks=3, delay=0.01)
+    client = AsyncGeminiClient(backend)
+    _, first, done = _collect(client, "q")
+    assert done.wait(2)
+    _, second, done = _collect(client, "q")
+    assert done.wait(2)
+
+    assert second == first == ["q:0 ", "q:1 ", "q:2 "]
+    assert backend.generated == 3
+    assert backend.history[2:] == [('user', "q"), ('model', "q:0 q:1 q:2 ")]
+    client.shutdown()
+
+
+def test_serial_requests_take_turns_across_kinds():
+    backend = FakeBackend(chunks=10, delay=0.01)
+    client = AsyncGeminiClient(backend, serial=True)
+    events = []
+    done = threading.Event()
+    client.send_message("utterance", lambda c: events.append(('utterance', c)),
+                        on_start=lambda _id: events.append(('start', 'utterance')))
+    client.submit("screen", lambda c: events.append(('screen', c)), kind='screenshot',
+                  on_start=lambda _id: events.append(('start', 'screen')), on_done=lambda _id: done.set())
+
+    assert done.wait(5)
+    kinds = [kind for kind, _ in events]
+    # The screenshot answer only starts once the utterance answer has finished
+    assert kinds == ['start'] + ['utterance'] * 10 + ['start'] + ['screen'] * 10
+    assert client.stats()['cancelled'] == 0
+    client.shutdown()
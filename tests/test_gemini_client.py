@@ -0,0 +1,119 @@
+import threading
+
+import src.core.gemini as gemini_module
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.response_cache import ResponseCache
+
+
+class Chunk:
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChat:
+    def __init__(self, client, history):
+        self.client = client
+        self.history = list(history or [])
+
+    def send_message_stream(self, message):
+        if self.client.api_key in FakeGenai.rate_limited:
+            raise Exception("429 RESOURCE_EXHAUSTED. {'retryDelay': '30s'}")
+        answer = f"answer to {message} from {self.client.api_key}"
+        yield Chunk(answer)
+        self.history += [('user', message), ('model', answer)]
+
+    def get_history(self):
+        return list(self.history)
+
+
+class FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, model):
+        self.client.warmed = True
+
+
+class FakeGenai:
+    """genai.Client replacement that counts constructions."""
+
+    built = []
+    rate_limited = set()
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.warmed = False
+        self.chats = self
+        self.models = FakeModels(self)
+        FakeGenai.built.append(api_key)
+
+    def create(self, model, config, history=None):
+        return FakeChat(self, history)
+
+
+def make_client(monkeypatch, keys):
+    FakeGenai.built = []
+    FakeGenai.rate_limited = set()
+    monkeypatch.setattr(gemini_module.genai, 'Client', FakeGenai)
+    monkeypatch.setattr(Config, 'GEMINI_API_KEYS', keys)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE', False)
+    monkeypatch.setattr(Config, 'GEMINI_USAGE_FILE', '')
+    monkeypatch.setattr(Config, 'CONTEXT_MAX_TOKENS', 0)
+    monkeypatch.setattr(Config, 'GEMINI_WARM_CLIENTS', True)
+    client = GeminiClient()
+    for thread in threading.enumerate():
+        if thread.name == 'gemini-warm':
+            thread.join(timeout=2)
+    return client
+
+
+def ask(client, text):
+    return "".join(chunk.text for chunk in client.send_message_stream(text))
+
+
+def test_clients_are_built_and_warmed_once_per_key(monkeypatch):
+    client = make_client(monkeypatch, ['k1', 'k2', 'k3'])
+
+    assert sorted(FakeGenai.built) == ['k1', 'k2', 'k3']
+    assert all(c.warmed for c in client.clients.values())
+
+    client._switch_key(2)
+    client._switch_key(0)
+    assert len(FakeGenai.built) == 3
+    assert client.client is client.clients['k1']
+
+
+def test_rotation_after_rate_limit_keeps_the_conversation(monkeypatch):
+    client = make_client(monkeypatch, ['k1', 'k2'])
+    assert ask(client, "first") == "answer to first from k1"
+
+    FakeGenai.rate_limited.add('k1')
+    assert ask(client, "second") == "answer to second from k2"
+
+    assert client.current_key_idx == 1
+    assert client.chat.get_history() == [
+        ('user', 'first'), ('model', 'answer to first from k1'),
+        ('user', 'second'), ('model', 'answer to second from k2'),
+    ]
+    assert len(FakeGenai.built) == 2
+
+
+def test_cached_answer_is_replayed_and_kept_in_history(monkeypatch):
+    client = make_client(monkeypatch, ['k1'])
+    client.response_cache = ResponseCache()
+    assert ask(client, "What is a heap?") == "answer to What is a heap? from k1"
+    # After other turns the same words may mean something else: asked again, not replayed
+    assert ask(client, "What is a heap?") == "answer to What is a heap? from k1"
+    assert len(client.chat.get_history()) == 4
+
+    # A new conversation: every key is rate-limited, but the repeat never reaches the API
+    client.create_chat()
+    FakeGenai.rate_limited.add('k1')
+    assert ask(client, "what is a heap") == "answer to What is a heap? from k1"
+    history = client.chat.get_history()
+    assert len(history) == 2
+    assert history[0].role == 'user' and history[0].parts[0].text == "what is a heap"
+    assert history[1].parts[0].text == "answer to What is a heap? from k1"
@@ -0,0 +1,208 @@
+import math
+import random
+from collections import deque
+
+import src.core.gemini as gemini_module
+import src.core.key_pool as key_pool_module
+import src.core.usage as usage_module
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.key_pool import KeyPool, parse_retry_after
+
+RPM = 10
+SUCCESS_S = 1.0
+REJECT_S = 0.2
+
+
+class FakeTime:
+    """Simulated clock standing in for the time module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class QuotaServer:
+    """Per-key requests-per-minute quota over a sliding 60 s window."""
+
+    def __init__(self, clock, rpm=RPM):
+        self.clock = clock
+        self.rpm = rpm
+        self.windows = {}
+        self.rejected = 0
+
+    def send(self, key):
+        now = self.clock.now
+        window = self.windows.setdefault(key, deque())
+        while window and window[0] <= now - 60:
+            window.popleft()
+        if len(window) >= self.rpm:
+            self.rejected += 1
+            self.clock.sleep(REJECT_S)
+            delay = math.ceil(window[0] + 60 - now)
+            raise Exception(f"429 RESOURCE_EXHAUSTED. {{'retryDelay': '{delay}s'}}")
+        window.append(now)
+        self.clock.sleep(SUCCESS_S)
+
+
+class Chunk:
+    text = "answer"
+    usage_metadata = None
+
+
+class FakeChat:
+    def __init__(self, server, key):
+        self.server = server
+        self.key = key
+
+    def send_message_stream(self, message):
+        self.server.send(self.key)
+        return iter([Chunk()])
+
+    def get_history(self):
+        return []
+
+
+class FakeGenai:
+    """genai.Client replacement whose chats hit the quota server."""
+
+    server = None
+
+    def __init__(self, api_key):
+        self.chats = self
+        self.api_key = api_key
+
+    def create(self, model, config, history=None):
+        return FakeChat(self.server, self.api_key)
+
+
+def arrivals(seconds=900, rate=0.45, seed=3):
+    """Bursty question arrivals averaging just under the pooled quota."""
+    rng = random.Random(seed)
+    t, times = 0.0, []
+    while t < seconds:
+        t += rng.expovariate(rate)
+        times.append(t)
+    return times
+
+
+def run(clock, send, times):
+    start = clock.now
+    answered = 0
+    for t in times:
+        clock.now = max(clock.now, start + t)
+        answered += send()
+    return answered
+
+
+def round_robin_sender(server, keys):
+    """The previous GeminiClient._rotate_key behaviour: rotate on each 429."""
+    idx = 0
+
+    def send():
+        nonlocal idx
+        for attempt in range(len(keys)):
+            try:
+                server.send(keys[idx])
+                return True
+            except Exception:
+                idx = (idx + 1) % len(keys)
+        return False
+
+    return send
+
+
+def pool_sender(monkeypatch, clock, server, keys):
+    monkeypatch.setattr(gemini_module, 'time', clock)
+    monkeypatch.setattr(key_pool_module, 'time', clock)
+    monkeypatch.setattr(usage_module, 'time', clock)
+    monkeypatch.setattr(gemini_module.genai, 'Client', FakeGenai)
+    monkeypatch.setattr(Config, 'GEMINI_API_KEYS', keys)
+    monkeypatch.setattr(Config, 'GEMINI_KEY_RPM', RPM)
+    monkeypatch.setattr(Config, 'GEMINI_MAX_KEY_WAIT_S', 20)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE', False)
+    monkeypatch.setattr(Config, 'GEMINI_USAGE_FILE', '')
+    monkeypatch.setattr(Config, 'CONTEXT_MAX_TOKENS', 0)
+    monkeypatch.setattr(Config, 'GEMINI_WARM_CLIENTS', False)
+    FakeGenai.server = server
+    client = GeminiClient()
+
+    def send():
+        try:
+            return len(list(client.send_message_stream("question"))) == 1
+        except Exception:
+            return False
+
+    return send, client
+
+
+def test_pool_answers_more_questions_than_round_robin(monkeypatch):
+    keys = ['k1', 'k2', 'k3']
+    times = arrivals()
+
+    rr_clock = FakeTime()
+    rr_server = QuotaServer(rr_clock)
+    rr_answered = run(rr_clock, round_robin_sender(rr_server, keys), times)
+
+    pool_clock = FakeTime()
+    pool_server = QuotaServer(pool_clock)
+    send, client = pool_sender(monkeypatch, pool_clock, pool_server, keys)
+    pool_answered = run(pool_clock, send, times)
+
+    # Round-robin drops questions once every key has just been 429'd
+    assert pool_answered == len(times) > rr_answered
+    assert pool_server.rejected < rr_server.rejected / 2
+    stats = client.key_stats()
+    assert [s['key'] for s in stats] == ['#1', '#2', '#3']
+    assert all(s['succeeded'] > 0 for s in stats)
+    assert sum(s['in_flight'] for s in stats) == 0
+
+
+def test_cooldown_follows_retry_delay_and_skips_cooling_keys():
+    clock = FakeTime()
+    pool = KeyPool(['a', 'b'], rpm=60, clock=clock.monotonic)
+
+    first = pool.acquire(prefer=0)
+    assert first.index == 0
+    pool.report_failure(first, "429 Quota exceeded {'retryDelay': '12s'}")
+
+    assert pool.acquire(prefer=0).index == 1
+    clock.sleep(11)
+    assert pool.acquire(prefer=0).index == 1
+    clock.sleep(1)
+    assert pool.acquire(prefer=0).index == 0
+    assert pool.stats()[0]['rate_limited'] == 1
+
+
+def test_least_loaded_key_is_chosen_without_a_preference():
+    clock = FakeTime()
+    pool = KeyPool(['a', 'b', 'c'], rpm=10, clock=clock.monotonic)
+    for _ in range(4):
+        pool.release(pool.acquire(prefer=0), 1)
+
+    assert pool.acquire().index in (1, 2)
+    assert parse_retry_after("please retry after 7 s") == 7.0
+    assert parse_retry_after("500 internal") is None
+
+
+def test_settled_reservations_leave_key_health_alone():
+    clock = FakeTime()
+    pool = KeyPool(['a'], rpm=60, clock=clock.monotonic)
+    pool.report_failure(pool.acquire(), "429 Quota exceeded {'retryDelay': '1s'}")
+    clock.sleep(2)
+
+    pool.settle(pool.acquire(tokens=100), 100)
+    stats = pool.stats()[0]
+    assert stats['succeeded'] == 0 and stats['in_flight'] == 0 and stats['tokens_used'] == 100
+    assert pool.states[0].strikes == 1
@@ -0,0 +1,72 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from src.core.gemini import GeminiClient
+from src.core.ocr import OCRResult, ScreenshotOCR, confidence, create_ocr, layout_text, split_bands
+
+
+def word(line, left, top, text, conf=95.0, block=1, par=1):
+    # 10 px per character, 20 px high
+    return (block, par, line, left, top, 10 * len(text), 20, conf, text)
+
+
+def test_layout_keeps_indentation_gaps_and_blank_lines():
+    band = [
+        word(1, 100, 0, "def"), word(1, 140, 0, "f(x):"),
+        word(2, 140, 30, "return"), word(2, 210, 30, "x"),
+        word(4, 100, 90, "print(f(2))"), word(4, 300, 90, "#"), word(4, 320, 90, "4"),
+    ]
+    assert layout_text([band]) == "def f(x):\n    return x\n\nprint(f(2))         # 4"
+
+
+def test_layout_orders_bands_and_handles_empty_input():
+    first = [word(1, 0, 0, "first")]
+    second = [word(1, 0, 30, "second")]
+    assert layout_text([first, second]) == "first\nsecond"
+    assert layout_text([[], []]) == ""
+
+
+def test_confidence_is_weighted_by_length_and_skips_non_words():
+    bands = [[word(1, 0, 0, "ab", conf=50), word(1, 30, 0, "abcdef", conf=90), word(1, 100, 0, "|", conf=-1)]]
+    assert confidence(bands) == pytest.approx(80)
+    assert confidence([[]]) == 0.0
+
+
+def test_bands_are_cut_between_text_lines():
+    gray = np.full((1000, 400), 255, dtype=np.int16)
+    for top in range(0, 1000, 40):
+        gray[top + 5:top + 25, 20:380] = 0
+    bands = split_bands(gray, 2)
+    assert bands[0][0] == 0 and bands[-1][1] == 1000 and len(bands) == 2
+    cut = bands[0][1]
+    assert (gray[cut] == 255).all()
+    assert split_bands(gray[:300], 4) == [(0, 300)]
+
+
+def test_plan_picks_text_thumbnail_or_image(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pytesseract', types.SimpleNamespace(get_tesseract_version=lambda: '5.3.0'))
+    ocr = ScreenshotOCR(workers=1, min_confidence=80, min_words=5)
+    try:
+        assert ocr.plan(OCRResult("x " * 50, 91, 50, 0.2)) == 'text'
+        assert ocr.plan(OCRResult("x " * 50, 62, 50, 0.2)) == 'thumbnail'
+        assert ocr.plan(OCRResult("x", 99, 1, 0.2)) == 'image'
+        assert ocr.plan(None) == 'image'
+        assert ocr.stats()['text_only'] == 1 and ocr.stats()['with_thumbnail'] == 1
+    finally:
+        ocr.close()
+
+
+def test_create_ocr_is_off_by_default_and_falls_back_without_pytesseract(monkeypatch):
+    assert create_ocr('off') is None
+    monkeypatch.setitem(sys.modules, 'pytesseract', None)
+    assert create_ocr('tesseract') is None
+
+
+def test_ocr_prompt_is_sent_as_text_without_image():
+    prompt = GeminiClient.ocr_prompt("Which of these is O(1)?\nA) list.append", thumbnail=False)
+    assert "Which of these is O(1)?" in prompt and "attached" not in prompt
+    assert "attached" in GeminiClient.ocr_prompt("text", thumbnail=True)
+    assert GeminiClient.screenshot_message(None, prompt) == [prompt]
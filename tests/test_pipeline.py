@@ -0,0 +1,100 @@
+import threading
+import time
+import wave
+
+import numpy as np
+
+from src.core.pipeline import AudioPipeline, RingBuffer
+from src.core.sources import FileSource
+
+
+def test_ring_buffer_wraps_and_counts_drops():
+    ring = RingBuffer(8)
+    out = np.zeros(8, dtype=np.int16)
+
+    assert ring.write(np.arange(6, dtype=np.int16)) == 6
+    assert ring.read_into(out[:4]) == 4
+    assert ring.write(np.arange(6, 12, dtype=np.int16)) == 6
+    assert ring.write(np.arange(3, dtype=np.int16)) == 0
+    assert ring.dropped == 3
+
+    assert ring.read_into(out) == 8
+    assert list(out) == [4, 5, 6, 7, 8, 9, 10, 11]
+
+
+def test_stalled_push_does_not_block_capture():
+    chunk = np.ones(256, dtype=np.int16).tobytes()
+    release = threading.Event()
+    reads = []
+
+    def read():
+        reads.append(1)
+        time.sleep(0.001)
+        return chunk
+
+    pipeline = AudioPipeline(
+        read_fn=read,
+        convert_fn=lambda samples: samples.tobytes(),
+        push_fn=lambda payload: release.wait(),
+        channels=1, rate=16000, frames_per_chunk=256, queue_size=4
+    )
+    pipeline.start()
+    time.sleep(0.3)
+    release.set()
+    pipeline.stop()
+
+    metrics = pipeline.metrics()
+    assert len(reads) > 50
+    assert metrics['dropped_chunks'] > 0
+    assert metrics['queue_depth'] <= 4
+
+
+def test_offline_source_is_pushed_without_loss(tmp_path):
+    path = str(tmp_path / "session.wav")
+    frames = np.arange(48000 * 2, dtype=np.int16) % 1000
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(48000)
+        f.writeframes(frames.tobytes())
+
+    source = FileSource(path).open()
+    pushed = []
+    pipeline = AudioPipeline(
+        read_fn=lambda: source.read(1024),
+        convert_fn=lambda samples: samples.copy(),
+        push_fn=pushed.append,
+        channels=source.channels, rate=source.rate,
+        frames_per_chunk=1024, ring_seconds=0.05, queue_size=2, lossless=True
+    )
+    pipeline.start()
+    pipeline.drain(timeout=10)
+
+    assert pipeline.metrics()['dropped_frames'] == 0
+    assert np.array_equal(np.concatenate(pushed), frames)
+
+
+def test_overflows_are_counted_and_other_device_errors_stop_capture():
+    errors = []
+    reads = []
+
+    def read():
+        reads.append(1)
+        if len(reads) <= 3:
+            raise OSError(-9981, "Input overflowed")
+        raise OSError(-9999, "Unanticipated host error")
+
+    pipeline = AudioPipeline(
+        read_fn=read,
+        convert_fn=lambda samples: samples.tobytes(),
+        push_fn=lambda payload: None,
+        channels=1, rate=16000, frames_per_chunk=256,
+        on_error=lambda stage, e: errors.append((stage, e.errno))
+    )
+    pipeline.start()
+    time.sleep(0.2)
+    pipeline.stop()
+
+    assert len(reads) == 4
+    assert pipeline.metrics()['overflows'] == 3
+    assert errors == [('capture', -9999)]
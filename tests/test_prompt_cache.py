@@ -0,0 +1,118 @@
+from google import genai
+from google.genai import types
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.prompt_cache import PromptCache, is_cache_miss
+
+RESUME = "Senior backend engineer, eight years of Python, Kafka and Postgres at scale. " * 60
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(monkeypatch, server, keys=('k1', 'k2')):
+    monkeypatch.setattr(Config, 'GEMINI_BASE_URL', server.base_url)
+    monkeypatch.setattr(Config, 'GEMINI_API_KEYS', list(keys))
+    monkeypatch.setattr(Config, 'GEMINI_WARM_CLIENTS', False)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE', False)
+    monkeypatch.setattr(Config, 'GEMINI_USAGE_FILE', '')
+    monkeypatch.setattr(Config, 'SYSTEM_PROMPT', RESUME)
+    monkeypatch.setattr(Config, 'GEMINI_PROMPT_CACHE', True)
+    monkeypatch.setattr(Config, 'GEMINI_PROMPT_CACHE_MIN_TOKENS', 500)
+    client = GeminiClient()
+    for index in range(len(keys)):
+        client.chat_config(index, wait=True)
+    return client
+
+
+def ask(client, text):
+    return "".join(c.text for c in client.send_message_stream(text))
+
+
+def sdk_client(server, key='k1'):
+    return genai.Client(api_key=key, http_options=types.HttpOptions(base_url=server.base_url))
+
+
+def test_instruction_is_uploaded_once_per_key_and_referenced(monkeypatch):
+    with FakeGeminiServer(first_token_ms=5, chunk_interval_ms=1, min_cache_tokens=500) as server:
+        client = make_client(monkeypatch, server)
+        assert server.stats()['caches_created'] == 2
+
+        assert ask(client, "How do you partition a Kafka topic?")
+        assert ask(client, "And how many partitions would you start with?")
+        server.fail_next(429)
+        assert ask(client, "What about consumer lag?")
+
+        stats = server.stats()
+        assert stats['by_key'] == {'k1': 3, 'k2': 1}
+        # Every answered request named its own key's cached content
+        assert stats['cache_hits'] == 3 and stats['caches_created'] == 2
+        assert client.usage.totals('k1')['cached'] > 2 * 500
+        assert client.usage.totals('k2')['cached'] > 500
+
+
+def test_lost_cache_falls_back_inline_then_reuploads(monkeypatch):
+    with FakeGeminiServer(first_token_ms=5, chunk_interval_ms=1, min_cache_tokens=500) as server:
+        client = make_client(monkeypatch, server, keys=('k1',))
+        server.cached_contents.clear()
+
+        assert ask(client, "How does a B-tree index work?")
+        assert server.stats()['errors'] == {403: 1}
+        assert client.key_stats()[0]['failed'] == 0
+
+        client.chat_config(wait=True)
+        assert ask(client, "And a hash index?")
+        stats = server.stats()
+        assert stats['caches_created'] == 2 and stats['cache_hits'] == 1
+        assert [c.role for c in client.chat.get_history()].count('user') == 2
+
+
+def test_small_or_rejected_instructions_stay_inline():
+    with FakeGeminiServer(min_cache_tokens=100_000) as server:
+        clock = FakeTime()
+        cache = PromptCache(min_tokens=500, retry_after=600, clock=clock)
+        api = sdk_client(server)
+
+        assert cache.config(api, 'k1', 'm', "Be concise.", wait=True) == {'system_instruction': "Be concise."}
+        assert cache.config(api, 'k1', 'm', RESUME, wait=True) == {'system_instruction': RESUME}
+        assert cache.stats()['failures'] == 1
+        # A rejected upload is not retried on every request
+        cache.config(api, 'k1', 'm', RESUME, wait=True)
+        assert cache.stats()['failures'] == 1
+        clock.now += 601
+        cache.config(api, 'k1', 'm', RESUME, wait=True)
+        assert cache.stats()['failures'] == 2
+        assert server.stats()['caches_created'] == 0
+
+
+def test_ttl_is_extended_before_expiry_and_replaced_on_change():
+    with FakeGeminiServer(min_cache_tokens=500) as server:
+        clock = FakeTime()
+        cache = PromptCache(ttl=600, refresh_before=120, min_tokens=500, clock=clock)
+        api = sdk_client(server)
+
+        name = cache.config(api, 'k1', 'm', RESUME, wait=True)['cached_content']
+        clock.now += 500
+        assert cache.config(api, 'k1', 'm', RESUME, wait=True) == {'cached_content': name}
+        assert cache.stats()['refreshed'] == 1
+        clock.now += 500
+        assert cache.config(api, 'k1', 'm', RESUME, wait=True) == {'cached_content': name}
+
+        changed = RESUME + "Target role: staff engineer."
+        new_name = cache.config(api, 'k1', 'm', changed, wait=True)['cached_content']
+        assert new_name != name
+        # The old copy is deleted rather than left to expire
+        assert list(server.cached_contents) == [new_name]
+
+
+def test_cache_miss_errors():
+    assert is_cache_miss(Exception("403 PERMISSION_DENIED. CachedContent not found (or permission denied)"))
+    assert not is_cache_miss(Exception("429 RESOURCE_EXHAUSTED"))
+    assert not is_cache_miss(Exception("403 PERMISSION_DENIED. API key not valid"))
@@ -0,0 +1,49 @@
+import numpy as np
+from scipy import signal
+
+from src.core.resampler import StreamingResampler
+
+
+def _noise(rate, seconds=0.5):
+    return np.random.default_rng(0).normal(0, 2000, int(rate * seconds)).astype(np.float32)
+
+
+def test_chunked_output_matches_single_pass():
+    for rate in (44100, 48000, 22050):
+        audio = _noise(rate)
+        resampler = StreamingResampler(rate, 16000, max_chunk=1024)
+        single = resampler.process(audio).copy()
+
+        resampler.reset()
+        chunks = []
+        for i in range(0, len(audio), 700):
+            chunks.append(resampler.process(audio[i:i + 700]).copy())
+
+        assert np.array_equal(single, np.concatenate(chunks))
+
+
+def test_matches_resample_poly_up_to_filter_delay():
+    rate = 44100
+    audio = _noise(rate)
+    resampler = StreamingResampler(rate, 16000)
+    output = resampler.process(audio)
+    reference = signal.resample_poly(audio.astype(np.float64), resampler.up, resampler.down)
+
+    delay = (resampler.taps_per_phase * resampler.up // 2) // resampler.down
+    n = len(reference) - 2 * delay
+    assert np.allclose(output[delay:delay + n], reference[:n], atol=0.05)
+
+
+def test_output_length_tracks_rate_ratio():
+    resampler = StreamingResampler(44100, 16000)
+    produced = sum(len(resampler.process(np.zeros(1024, dtype=np.int16))) for _ in range(441))
+    assert produced == 1024 * 441 * 16000 // 44100
+
+
+def test_int16_output_is_clipped():
+    resampler = StreamingResampler(48000, 16000)
+    square = np.tile(np.r_[np.full(24, 32767), np.full(24, -32768)], 100).astype(np.int16)
+    output = resampler.process_int16(square)
+    assert output.dtype == np.int16
+    # Gibbs overshoot would wrap around without clipping
+    assert output.max() == 32767 and output.min() == -32768
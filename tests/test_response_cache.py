@@ -0,0 +1,72 @@
+from src.core.response_cache import ResponseCache
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    cache.put("What is a hash map?", "flash", "sys", ["A hash ", "map is..."])
+
+    assert cache.get("what is a HASH map", "flash", "sys") == ["A hash ", "map is..."]
+    assert cache.get("What is a hash map?", "pro", "sys") is None
+    assert cache.get("What is a hash map?", "flash", "other instructions") is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_similarity_matches_near_duplicates_only_when_enabled():
+    exact = ResponseCache()
+    similar = ResponseCache(similarity=0.7)
+    for cache in (exact, similar):
+        cache.put("Tell me about yourself", "m", "s", ["I am..."])
+        cache.put("What is a hash map?", "m", "s", ["map"])
+
+    assert exact.get("So tell me about yourself", "m", "s") is None
+    assert similar.get("So tell me about yourself", "m", "s") == ["I am..."]
+    assert similar.get("What is a hash set?", "m", "s") is None
+    assert similar.stats()['similar_hits'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, similarity=0.7, min_words=3)
+    cache.put("first question here", "m", "s", ["1"])
+    cache.put("second question here", "m", "s", ["2"])
+    cache.get("first question here", "m", "s")
+    cache.put("third question here", "m", "s", ["3"])
+
+    assert len(cache) == 2
+    assert cache.get("second question here", "m", "s") is None
+    assert cache.get("first question here", "m", "s") == ["1"]
+    assert not any("second question here" in key for bucket in cache._buckets.values() for key in bucket)
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(path, max_entries=2, min_words=2)
+    cache.put("old question", "m", "s", ["old"])
+    cache.put("what is a heap", "m", "s", ["a ", "tree"])
+    cache.flush()
+
+    reloaded = ResponseCache(path, max_entries=2, min_words=2)
+    assert reloaded.get("What is a heap?", "m", "s") == ["a ", "tree"]
+    reloaded.put("newest question", "m", "s", ["new"])
+    # The reloaded LRU order was kept: the oldest entry went first
+    assert reloaded.get("old question", "m", "s") is None
+
+
+def test_follow_ups_and_other_contexts_are_not_replayed():
+    cache = ResponseCache()
+    cache.put("Why?", "m", "s", ["because"])
+    assert cache.get("Why?", "m", "s") is None
+
+    cache.put("What is a heap?", "m", "s", ["a tree"], context="after-exchange-1")
+    assert cache.get("What is a heap?", "m", "s", context="after-exchange-1") == ["a tree"]
+    assert cache.get("What is a heap?", "m", "s", context="after-exchange-2") is None
+
+
+def test_saves_are_batched_on_a_timer(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = ResponseCache(str(path), save_delay=0.1)
+    cache.put("What is a heap?", "m", "s", ["a tree"])
+    cache.put("What is a hash map?", "m", "s", ["buckets"])
+    assert not path.exists()
+
+    cache._save_timer.join(2)
+    assert len(ResponseCache(str(path))) == 2
@@ -0,0 +1,73 @@
+from benchmarks.fake_gemini import FakeGeminiServer
+from src.config import Config
+from src.core.gemini import GeminiClient
+from src.core.routing import ModelRouter
+
+
+def test_classifier_routes_by_length_keywords_and_screenshots():
+    router = ModelRouter('fast', 'strong')
+
+    assert router.classify("Sorry, what do you mean by idempotent?") == ('fast', 'clarification')
+    assert router.classify("What is a hash map?")[0] == 'fast'
+    assert router.classify("How would you design a rate limiter for a public API?")[0] == 'strong'
+    assert router.classify("Tell me about a time you disagreed with your manager.")[0] == 'strong'
+    assert router.classify(" ".join(["word"] * 45)) == ('strong', '45 words')
+    assert router.classify([object(), "What do you see?"]) == ('strong', 'screenshot')
+    assert router.route("ok thanks")['model'] == 'fast'
+
+
+def test_routes_share_one_history_and_record_latency(monkeypatch, tmp_path):
+    log = tmp_path / "routes.jsonl"
+    with FakeGeminiServer(first_token_ms=5, chunk_interval_ms=1, answer_chars=60) as server:
+        monkeypatch.setattr(Config, 'GEMINI_BASE_URL', server.base_url)
+        monkeypatch.setattr(Config, 'GEMINI_API_KEYS', ['k1'])
+        monkeypatch.setattr(Config, 'GEMINI_MODEL', 'strong-model')
+        monkeypatch.setattr(Config, 'GEMINI_WARM_CLIENTS', False)
+        monkeypatch.setattr(Config, 'RESPONSE_CACHE', False)
+        monkeypatch.setattr(Config, 'GEMINI_USAGE_FILE', '')
+        monkeypatch.setattr(Config, 'MODEL_ROUTING', True)
+        monkeypatch.setattr(Config, 'ROUTING_FAST_MODEL', 'fast-model')
+        monkeypatch.setattr(Config, 'ROUTING_LOG', str(log))
+        client = GeminiClient()
+
+        list(client.send_message_stream("How would you design a URL shortener?"))
+        list(client.send_message_stream("What does TTL mean?"))
+        list(client.send_message_stream("And how would you scale it to many regions?"))
+
+        stats = server.stats()
+        assert stats['by_model'] == {'strong-model': 2, 'fast-model': 1}
+        # Every request carried the earlier turns, whichever model answered them
+        assert server.contents[0] == 1 and server.contents[1] > 1 and server.contents[2] > server.contents[1]
+        assert [c.role for c in client.chat.get_history()].count('user') == 3
+
+    routes = client.router.stats()
+    assert routes['fast']['requests'] == 1 and routes['strong']['requests'] == 2
+    assert routes['fast']['p50_first_chunk_ms'] > 0
+    assert len(log.read_text().splitlines()) == 3
+
+
+def test_an_utterance_is_routed_once_across_speculation_and_send(monkeypatch):
+    with FakeGeminiServer(first_token_ms=5, chunk_interval_ms=1, answer_chars=60) as server:
+        monkeypatch.setattr(Config, 'GEMINI_BASE_URL', server.base_url)
+        monkeypatch.setattr(Config, 'GEMINI_API_KEYS', ['k1'])
+        monkeypatch.setattr(Config, 'GEMINI_WARM_CLIENTS', False)
+        monkeypatch.setattr(Config, 'RESPONSE_CACHE', False)
+        monkeypatch.setattr(Config, 'GEMINI_USAGE_FILE', '')
+        monkeypatch.setattr(Config, 'MODEL_ROUTING', True)
+        monkeypatch.setattr(Config, 'ROUTING_FAST_MODEL', 'fast-model')
+        client = GeminiClient()
+
+        # The speculation is abandoned, so the final transcript is sent normally
+        chunks, _ = client.start_speculative_stream("what does TTL mean")
+        list(chunks)
+        list(client.send_message_stream("What does TTL mean?"))
+        list(client.send_message_stream("What does TTL mean?"))
+
+    assert client.router.stats()['fast']['requests'] == 2
+
+
+def test_unwritable_routing_log_only_disables_logging(tmp_path):
+    router = ModelRouter('fast', 'strong', log_path=str(tmp_path / 'missing' / 'routes.jsonl'))
+    decision = router.route("ok thanks")
+    router.record(decision, 0.1, 0.2)
+    assert router.stats()['fast']['requests'] == 1
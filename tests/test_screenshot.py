@@ -0,0 +1,114 @@
+import io
+import random
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from src.core.gemini import GeminiClient
+from src.core.screenshot import ScreenshotDiffer, ScreenshotEncoder, dhash
+
+
+def code_capture(size=(3840, 2160)):
+    image = Image.new('RGB', size, (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    for y in range(0, size[1], 18):
+        draw.text((20, y), "def two_sum(nums, target): seen = {}  # O(n) time " * 4, fill=(220, 220, 150))
+    return image
+
+
+def photo_capture(size=(1920, 1080)):
+    rng = random.Random(0)
+    image = Image.frombytes('RGB', (size[0] // 8, size[1] // 8), bytes(rng.randrange(256) for _ in range(size[0] * size[1] * 3 // 64)))
+    return image.resize(size, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+
+
+def test_large_captures_are_scaled_to_max_side_keeping_aspect():
+    encoded = ScreenshotEncoder(max_side=2048).encode(code_capture())
+    assert encoded.size == (2048, 1152)
+    assert encoded.source_size == (3840, 2160)
+    assert Image.open(io.BytesIO(encoded.data)).size == (2048, 1152)
+
+    small = ScreenshotEncoder(max_side=2048).encode(code_capture((800, 600)))
+    assert small.size == (800, 600)
+
+
+def test_auto_keeps_text_lossless_and_compresses_photos():
+    encoder = ScreenshotEncoder()
+    text = encoder.encode(code_capture((1920, 1080)))
+    assert text.mime_type == 'image/png'
+    decoded = Image.open(io.BytesIO(text.data))
+    assert decoded.format == 'PNG' and decoded.mode == 'P'
+    assert len(text.data) < len(ScreenshotEncoder(image_format='png').encode(code_capture((1920, 1080))).data)
+
+    photo = encoder.encode(photo_capture())
+    assert photo.mime_type == 'image/jpeg'
+    png = ScreenshotEncoder(image_format='png').encode(photo_capture())
+    assert len(photo.data) < len(png.data) / 3
+
+
+def test_webp_and_fixed_formats():
+    photo = photo_capture()
+    webp = ScreenshotEncoder(lossy_format='webp').encode(photo)
+    assert webp.mime_type == 'image/webp' and Image.open(io.BytesIO(webp.data)).format == 'WEBP'
+    jpeg = ScreenshotEncoder(image_format='jpeg', quality=50).encode(code_capture((640, 480)))
+    assert jpeg.mime_type == 'image/jpeg'
+    # RGBA captures are flattened for formats without alpha
+    assert ScreenshotEncoder(image_format='jpeg').encode(Image.new('RGBA', (64, 64))).mime_type == 'image/jpeg'
+
+
+def test_mime_type_reaches_the_request():
+    part, prompt = GeminiClient.screenshot_message(b"jpeg bytes", "describe", 'image/jpeg')
+    assert part.inline_data.mime_type == 'image/jpeg'
+    assert GeminiClient.screenshot_message(b"png", "describe")[0].inline_data.mime_type == 'image/png'
+
+
+def test_differ_skips_identical_frames_and_crops_changed_regions():
+    differ = ScreenshotDiffer()
+    first = code_capture((1920, 1080))
+    change = differ.compare(first)
+    assert change.kind == 'new'
+    differ.submitted(first, change, 300_000)
+
+    same = differ.compare(first.copy())
+    assert same.kind == 'same' and same.distance == 0
+    differ.submitted(first, same, 0)
+
+    edited = first.copy()
+    ImageDraw.Draw(edited).rectangle((900, 500, 1100, 560), fill=(200, 60, 60))
+    region = differ.compare(edited)
+    assert region.kind == 'region'
+    left, top, right, bottom = region.box
+    # The box covers the edit, padded by about a tile, and not much more
+    assert left <= 900 and top <= 500 and right >= 1100 and bottom >= 560
+    assert (right - left) * (bottom - top) < 0.1 * 1920 * 1080
+    differ.submitted(edited, region, 40_000)
+
+    assert differ.compare(photo_capture()).kind == 'new'
+    assert differ.compare(code_capture((1280, 720))).kind == 'new'
+    assert differ.stats() == {'frames': 3, 'skipped': 1, 'cropped': 1,
+                              'bytes_sent': 340_000, 'bytes_saved': 300_000 + 260_000}
+
+    differ.reset()
+    assert differ.compare(edited).kind == 'new'
+
+
+def test_differ_reference_waits_for_the_answer_and_repeats_force_a_resend():
+    differ = ScreenshotDiffer()
+    first = code_capture((1920, 1080))
+    commit = differ.pending(first, differ.compare(first), 300_000)
+    # Not answered yet (or cancelled): nothing to compare against
+    assert differ.compare(first).kind == 'new' and differ.stats()['frames'] == 0
+    commit()
+    assert differ.stats()['frames'] == 1
+
+    same = differ.compare(first.copy())
+    assert same.kind == 'same'
+    differ.submitted(first, same, 0)
+    # Asking again for the same screen sends all of it
+    assert differ.compare(first.copy()).kind == 'new'
+
+
+def test_dhash_tolerates_small_changes():
+    image = photo_capture()
+    brighter = image.point(lambda v: min(255, v + 6))
+    assert bin(dhash(image) ^ dhash(brighter)).count('1') <= 4
+    assert bin(dhash(image) ^ dhash(code_capture((1920, 1080)))).count('1') > 16
@@ -0,0 +1,144 @@
+import threading
+import time
+
+from src.core.speculation import SpeculativeDispatcher, looks_like_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.done = threading.Event()
+        # The dispatcher's lock, to check callbacks run without it
+        self.lock = None
+        self.called_locked = False
+
+    def commit(self, text):
+        self.called_locked |= bool(self.lock and self.lock.locked())
+        self.events.append(('commit', text))
+
+    def chunk(self, chunk):
+        self.called_locked |= bool(self.lock and self.lock.locked())
+        self.events.append(('chunk', chunk))
+
+    def finished(self):
+        self.events.append(('done',))
+        self.done.set()
+
+
+def _dispatcher(clock, recorder, adopt_result=True, gate=None):
+    streamed = threading.Event()
+    requests = []
+
+    def start_stream(text):
+        requests.append(text)
+
+        def chunks():
+            clock.now += 0.8  # time to first token
+            yield "A hash map "
+            if gate:
+                gate.wait(2)
+            yield "stores key-value pairs."
+            streamed.set()
+
+        return chunks(), lambda: adopt_result
+
+    dispatcher = SpeculativeDispatcher(start_stream, recorder.commit, recorder.chunk, recorder.finished,
+                                       stable_s=0.4, clock=clock)
+    return dispatcher, requests, streamed
+
+
+def test_matching_final_commits_buffered_answer():
+    clock, recorder = FakeClock(), Recorder()
+    dispatcher, requests, streamed = _dispatcher(clock, recorder)
+
+    dispatcher.on_partial("what is a")
+    dispatcher.on_partial("what is a hash map")
+    assert dispatcher.poll() is None  # not stable yet
+    clock.now += 0.5
+    assert dispatcher.poll() is not None
+    assert streamed.wait(2)
+
+    clock.now += 0.2
+    assert dispatcher.on_final("What is a hash map?")
+    assert recorder.done.wait(2)
+    assert requests == ["what is a hash map"]
+    assert recorder.events == [
+        ('commit', "What is a hash map?"),
+        ('chunk', "A hash map "),
+        ('chunk', "stores key-value pairs."),
+        ('done',),
+    ]
+    metrics = dispatcher.metrics()
+    assert metrics['hits'] == 1 and metrics['hit_rate'] == 1.0
+    # First token came 0.6 s before the final arrived, so the whole 0.8 s TTFT is saved
+    assert abs(metrics['avg_saved_s'] - 0.8) < 1e-9
+
+
+def test_chunks_after_commit_stream_through():
+    clock, recorder = FakeClock(), Recorder()
+    gate = threading.Event()
+    dispatcher, _, streamed = _dispatcher(clock, recorder, gate=gate)
+    recorder.lock = dispatcher._lock
+
+    dispatcher.on_partial("how does garbage collection work")
+    clock.now += 0.5
+    spec = dispatcher.poll()
+    while not spec.chunks:
+        time.sleep(0.01)
+
+    assert dispatcher.on_final("How does garbage collection work?")
+    gate.set()
+    assert recorder.done.wait(2)
+    assert recorder.events[1:] == [
+        ('chunk', "A hash map "),
+        ('chunk', "stores key-value pairs."),
+        ('done',),
+    ]
+    assert not recorder.called_locked
+
+
+def test_diverging_final_and_newer_partial_cancel():
+    clock, recorder = FakeClock(), Recorder()
+    dispatcher, _, streamed = _dispatcher(clock, recorder)
+
+    dispatcher.on_partial("what is a hash map")
+    clock.now += 0.5
+    dispatcher.poll()
+    assert not dispatcher.on_final("What is a hash map used for in caching?")
+
+    dispatcher.on_partial("why use python")
+    clock.now += 0.5
+    dispatcher.poll()
+    dispatcher.on_partial("why use python over java")
+
+    assert recorder.events == []
+    metrics = dispatcher.metrics()
+    assert metrics['started'] == 2 and metrics['misses'] == 2 and metrics['hit_rate'] == 0.0
+
+
+def test_stale_chat_is_not_adopted():
+    clock, recorder = FakeClock(), Recorder()
+    dispatcher, _, streamed = _dispatcher(clock, recorder, adopt_result=False)
+
+    dispatcher.on_partial("what is a hash map")
+    clock.now += 0.5
+    dispatcher.poll()
+    assert streamed.wait(2)
+    assert not dispatcher.on_final("What is a hash map?")
+    assert recorder.events == []
+
+
+def test_question_heuristic():
+    assert looks_like_question("Tell me about yourself")
+    assert looks_like_question("Okay. Can you explain closures")
+    assert looks_like_question("Right?")
+    assert not looks_like_question("thanks for joining today")
+    assert not looks_like_question("what is")
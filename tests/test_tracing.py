@@ -0,0 +1,50 @@
+import json
+
+from src.utils.tracing import Tracer
+
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    tracer = Tracer()
+    with tracer.span('render'):
+        pass
+    tracer.record('stt', 0.0, 1.0)
+
+    assert tracer.new_trace() == 0
+    assert tracer.summary() == {}
+
+
+def test_spans_are_written_and_summarized(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    tracer = Tracer(str(path), sample_every={'capture': 10})
+    trace = tracer.new_trace()
+
+    for i in range(100):
+        tracer.record('capture', 0.0, 0.001 * (i + 1))
+    tracer.record('stt', 1.0, 1.25, trace=trace, chars=12)
+    with tracer.span('render', trace=trace):
+        pass
+    tracer.close()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert sum(s['stage'] == 'capture' for s in spans) == 10
+    stt = next(s for s in spans if s['stage'] == 'stt')
+    assert stt['trace'] == trace and stt['ms'] == 250.0 and stt['chars'] == 12
+    assert any(s['stage'] == 'render' and s['trace'] == trace for s in spans)
+
+    summary = tracer.summary()
+    assert summary['capture']['count'] == 100
+    assert summary['capture']['p50_ms'] == 50.0
+    assert summary['capture']['p95_ms'] == 95.0
+
+
+def test_trace_file_is_opened_lazily_and_failures_are_tolerated(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    tracer = Tracer(str(path))
+    assert not path.exists()
+    tracer.record('stt', 0.0, 0.5)
+    tracer.close()
+    assert path.exists()
+
+    broken = Tracer(str(tmp_path / 'missing' / 'trace.jsonl'))
+    broken.record('stt', 0.0, 0.5)
+    assert broken.summary()['stt']['count'] == 1
@@ -0,0 +1,106 @@
+import json
+import os
+import time
+
+from google.genai import types
+
+from src.core.key_pool import KeyPool
+from src.core.usage import UsageTracker, usage_from
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_usage_metadata_is_split_into_counts():
+    metadata = types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=1200, candidates_token_count=300, cached_content_token_count=1000,
+        total_token_count=1500)
+    assert usage_from(metadata) == {'prompt': 1200, 'candidates': 300, 'cached': 1000, 'total': 1500}
+    assert usage_from(None) is None
+    assert usage_from(types.GenerateContentResponseUsageMetadata()) is None
+
+
+def test_rolling_windows_and_lifetime_totals():
+    clock = Clock()
+    usage = UsageTracker(clock=clock)
+    usage.record('key', {'prompt': 100, 'candidates': 20, 'total': 120})
+    clock.now += 120
+    usage.record('key', {'prompt': 200, 'candidates': 40, 'cached': 50, 'total': 240})
+    usage.record('other', {'total': 10})
+
+    assert usage.window('key', 60) == {'requests': 1, 'prompt': 200, 'candidates': 40, 'cached': 50, 'total': 240}
+    assert usage.window('key', 3600)['total'] == 360
+    clock.now += 86400
+    assert usage.window('key', 86400)['requests'] == 0
+    assert usage.totals('key')['requests'] == 2 and usage.totals('key')['total'] == 360
+
+
+def test_usage_persists_without_the_raw_key(tmp_path):
+    path = str(tmp_path / "usage.json")
+    clock = Clock()
+    usage = UsageTracker(path, save_every=60, clock=clock)
+    usage.record('secret-api-key', {'total': 42})
+    assert not os.path.exists(path)  # written later by the timer, not by record()
+    usage.flush()
+
+    assert 'secret-api-key' not in open(path).read()
+    assert json.load(open(path))['events']
+    reloaded = UsageTracker(path, clock=clock)
+    assert reloaded.window('secret-api-key', 60)['total'] == 42
+    assert reloaded.totals('secret-api-key')['requests'] == 1
+
+
+def test_usage_timer_saves_off_the_recording_thread(tmp_path):
+    path = str(tmp_path / "usage.json")
+    usage = UsageTracker(path, save_every=0.01)
+    for i in range(200):
+        usage.record(f'key-{i}', {'total': 1})
+    deadline = time.monotonic() + 5
+    while usage._save_timer is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    usage.flush()
+    assert len(json.load(open(path))['totals']) == 200
+
+
+def test_daily_forecast_shifts_load_before_the_limit():
+    clock = Clock()
+    usage = UsageTracker(clock=clock)
+    pool = KeyPool(['a', 'b'], rpm=1000, rpd=100, usage=usage, shift_before=600, clock=clock)
+    # Key a has used 95 of its 100 daily requests, the last 30 in the past five minutes
+    for i in range(95):
+        usage.record('a', {'total': 10}, at=clock.now - (3600 if i < 65 else 10 * (95 - i) - 5))
+
+    forecast = usage.forecast('a', rpd=100)
+    assert forecast['rpd_in'] == 5 / (30 / 300)
+    state = pool.acquire(prefer=0)
+    assert state.index == 1
+    assert pool.shifts == 1
+    pool.release(state)
+
+    for _ in range(5):
+        usage.record('a', {'total': 10})
+    # At the daily limit key a is not offered at all until requests age out
+    assert pool.acquire(prefer=0, exclude=(1,)) is None
+    assert pool.wait_time() == 0
+    clock.now += 82800
+    assert pool.acquire(prefer=0).index == 0
+
+
+def test_day_totals_are_kept_running_as_events_age_out():
+    clock = Clock()
+    usage = UsageTracker(clock=clock)
+    for _ in range(3):
+        usage.record('key', {'total': 10})
+        clock.now += 3600
+    usage.record('key', {'total': 5})
+
+    assert usage.window('key', 86400) == {'requests': 4, 'prompt': 0, 'candidates': 0, 'cached': 0, 'total': 35}
+    assert usage.day_reset_in('key', 4) == 86400 - 3 * 3600
+    clock.now += 86400 - 3 * 3600
+    assert usage.window('key', 86400)['total'] == 25
+    assert usage.day_reset_in('key', 4) == 0.0
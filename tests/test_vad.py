@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.core.vad import EnergyVAD, VoiceGate
+
+
+class ScriptedDetector:
+    """Marks frames as speech when their first sample is non-zero."""
+    frame_size = 320
+
+    def is_speech(self, frame):
+        return bool(frame[0])
+
+    def reset(self):
+        pass
+
+
+def _frames(pattern):
+    return np.concatenate([np.full(320, value, dtype=np.int16) for value in pattern])
+
+
+def test_gate_sends_preroll_and_hangover():
+    gate = VoiceGate(ScriptedDetector(), preroll_ms=40, hangover_ms=40)
+    # 5 silent frames, 2 speech frames, 5 silent frames
+    audio = _frames([0] * 5 + [1, 1] + [0] * 5)
+
+    sent = b''.join(gate.process(audio[i:i + 341]) for i in range(0, len(audio), 341))
+
+    # 2 pre-roll + 2 speech + 2 hangover frames
+    assert len(sent) == 6 * 320 * 2
+    assert gate.stats()['suppressed_frames'] == 6
+    assert gate.suppressed_ratio == 0.5
+
+
+def test_energy_vad_separates_tone_from_noise():
+    rng = np.random.default_rng(0)
+    vad = EnergyVAD()
+    noise = rng.normal(0, 100, 320 * 50).astype(np.int16)
+    assert not any(vad.is_speech(noise[i:i + 320]) for i in range(0, len(noise), 320))
+
+    t = np.arange(320) / 16000
+    tone = (8000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+    assert vad.is_speech(tone)